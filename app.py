@@ -3,61 +3,79 @@ import os
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QLineEdit, QPushButton, QTextEdit, QTabWidget,
-    QProgressBar, QMessageBox, QFrame, QScrollArea
+    QProgressBar, QMessageBox, QFrame, QScrollArea, QCheckBox
 )
-from PyQt5.QtGui import QFont, QIcon, QPixmap, QColor
 from PyQt5.QtCore import Qt, QThread, pyqtSignal
-import requests
-from bs4 import BeautifulSoup
-import json
 from datetime import datetime
-from modules import username_hunter, email_breach, image_search, darkweb_scanner, geo_locator, social_scraper, phone_search
-import asyncio
+from modules import investigation, cache, telemetry
+from modules.results import collect, count_by_type
+from modules.progress import ProgressReporter
+from modules.cancel import CancelToken
+from result_views import ResultView, ProfileView, result_error
+
+# Seconds between coalesced progress and hit signals from the search worker
+PROGRESS_INTERVAL = 0.1
+
+# Investigation step -> result tab
+RESULT_TABS = {
+    'Username Hunter': 'Usernames',
+    'Social Scraper': 'Social Media',
+    'Email Breach': 'Email Leaks',
+    'Image Search': 'Images',
+    'Dark Web': 'Dark Web',
+    'Phone Search': 'Phone'
+}
 
 class SearchWorker(QThread):
     progress = pyqtSignal(int)
+    hits = pyqtSignal(dict)
+    partial = pyqtSignal(str, object)
     result = pyqtSignal(dict)
+    profile = pyqtSignal(dict)
     error = pyqtSignal(str)
 
     def __init__(self, search_data):
         super().__init__()
         self.search_data = search_data
+        self.token = CancelToken()
+        self.recorder = telemetry.Recorder()
+
+    def cancel(self):
+        # Stops queued work, running module pools and open connections
+        self.token.cancel()
 
     def run(self):
         try:
-            results = {}
-            steps = [
-                ('Username Hunter', username_hunter.run, 'username'),
-                ('Email Breach', email_breach.run, 'email'),
-                ('Phone Search', phone_search.run, 'phone'),
-                ('Image Search', image_search.run, 'name'),
-                ('Dark Web', darkweb_scanner.run, 'email'),
-                ('Geo Locator', geo_locator.run, 'name'),
-                ('Social Scraper', social_scraper.run, 'username'),
-            ]
-            total = sum(1 for _, _, key in steps if self.search_data.get(key))
-            if total == 0:
+            # Repeat lookups are served from the on-disk cache unless bypassed
+            cache.set_bypass(self.search_data.get('no_cache'))
+            scheduler = investigation.build_scheduler()
+            labels = [task.label for task in scheduler.active_tasks(self.search_data)]
+            if not labels:
                 self.error.emit("No search parameters provided")
                 return
-            done = 0
-            for label, func, key in steps:
-                if self.search_data.get(key):
-                    try:
-                        if label == 'Social Scraper':
-                            # Create event loop for async functions
-                            loop = asyncio.new_event_loop()
-                            asyncio.set_event_loop(loop)
-                            results[label] = loop.run_until_complete(func(self.search_data))
-                            loop.close()
-                        else:
-                            results[label] = func(self.search_data)
-                        done += 1
-                        self.progress.emit(int(done / total * 100))
-                    except Exception as e:
-                        results[label] = f"Error: {str(e)}"
-                        done += 1
-                        self.progress.emit(int(done / total * 100))
+
+            # Modules report per-source progress and hits from their own threads;
+            # the reports are drained and emitted at most every PROGRESS_INTERVAL
+            reporter = ProgressReporter(labels)
+            last_percent = -1
+
+            def flush():
+                nonlocal last_percent
+                percent, hits, finished = reporter.drain()
+                if hits:
+                    self.hits.emit(hits)
+                for label, result in finished:
+                    self.partial.emit(label, result)
+                if percent != last_percent:
+                    last_percent = percent
+                    self.progress.emit(percent)
+
+            # Independent modules run concurrently; wall time tracks the slowest one
+            data = dict(self.search_data, reporter=reporter, cancel=self.token, telemetry=self.recorder)
+            results = scheduler.run(data, on_complete=reporter.finish, on_poll=flush, poll_interval=PROGRESS_INTERVAL)
+            flush()
             self.result.emit(results)
+            self.profile.emit(self.recorder.report())
         except Exception as e:
             self.error.emit(str(e))
         finally:
@@ -105,6 +123,20 @@ class PersonaXApp(QMainWindow):
                 border-radius: 4px;
                 font-size: 14px;
             }
+            QTableView {
+                background-color: #2d2d2d;
+                alternate-background-color: #333333;
+                color: #ffffff;
+                gridline-color: #3d3d3d;
+                border: 2px solid #3d3d3d;
+                font-size: 13px;
+            }
+            QHeaderView::section {
+                background-color: #3d3d3d;
+                color: #ffffff;
+                padding: 4px;
+                border: none;
+            }
             QTabWidget::pane {
                 border: 2px solid #3d3d3d;
                 border-radius: 4px;
@@ -186,10 +218,21 @@ class PersonaXApp(QMainWindow):
         username_layout.addWidget(self.username_input)
         input_layout.addLayout(username_layout)
 
-        # Search button
+        # Cache bypass
+        self.bypass_cache = QCheckBox('Bypass result cache')
+        self.bypass_cache.setStyleSheet('color: #ffffff;')
+        input_layout.addWidget(self.bypass_cache)
+
+        # Search and cancel buttons
+        button_layout = QHBoxLayout()
         self.search_button = QPushButton('Start Investigation')
         self.search_button.clicked.connect(self.start_search)
-        input_layout.addWidget(self.search_button)
+        button_layout.addWidget(self.search_button)
+        self.cancel_button = QPushButton('Cancel')
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel_search)
+        button_layout.addWidget(self.cancel_button)
+        input_layout.addLayout(button_layout)
 
         layout.addWidget(input_frame)
 
@@ -204,16 +247,17 @@ class PersonaXApp(QMainWindow):
         # Create tabs for different types of results
         self.result_tabs = {
             'Summary': QTextEdit(),
-            'Usernames': QTextEdit(),
-            'Social Media': QTextEdit(),
-            'Email Leaks': QTextEdit(),
-            'Images': QTextEdit(),
-            'Dark Web': QTextEdit(),
-            'Phone': QTextEdit()
+            'Usernames': ResultView(),
+            'Social Media': ResultView(),
+            'Email Leaks': ResultView(),
+            'Images': ResultView(),
+            'Dark Web': ResultView(),
+            'Phone': ResultView(),
+            'Profile': ProfileView()
         }
+        self.result_tabs['Summary'].setReadOnly(True)
 
         for tab_name, widget in self.result_tabs.items():
-            widget.setReadOnly(True)
             self.tabs.addTab(widget, tab_name)
 
         layout.addWidget(self.tabs)
@@ -231,6 +275,7 @@ class PersonaXApp(QMainWindow):
         if not any(search_data.values()):
             QMessageBox.warning(self, 'Input Error', 'Please enter at least one search parameter.')
             return
+        search_data['no_cache'] = self.bypass_cache.isChecked()
 
         # Clear previous results
         for widget in self.result_tabs.values():
@@ -240,145 +285,71 @@ class PersonaXApp(QMainWindow):
         self.progress_bar.setVisible(True)
         self.progress_bar.setValue(0)
 
-        # Disable search button
+        # Disable search button until the worker finishes
         self.search_button.setEnabled(False)
+        self.cancel_button.setEnabled(True)
 
         # Create and start worker thread
         self.worker = SearchWorker(search_data)
         self.worker.progress.connect(self.update_progress)
+        self.worker.hits.connect(self.add_hits)
+        self.worker.partial.connect(self.add_result)
         self.worker.result.connect(self.display_results)
+        self.worker.profile.connect(self.result_tabs['Profile'].set_profile)
         self.worker.error.connect(self.show_error)
+        self.worker.finished.connect(self.search_finished)
         self.worker.start()
 
+    def cancel_search(self):
+        self.cancel_button.setEnabled(False)
+        self.worker.cancel()
+
+    def search_finished(self):
+        self.search_button.setEnabled(True)
+        self.cancel_button.setEnabled(False)
+
     def update_progress(self, value):
         self.progress_bar.setValue(value)
 
+    def add_hits(self, hits):
+        # Hits stream in while their module is still running
+        for label, records in hits.items():
+            tab_name = RESULT_TABS.get(label)
+            if tab_name:
+                self.result_tabs[tab_name].add_records(records)
+
+    def add_result(self, label, result):
+        # Each module's rows are appended to its tab as soon as it finishes
+        tab_name = RESULT_TABS.get(label)
+        if tab_name:
+            self.result_tabs[tab_name].add_result(result)
+
     def display_results(self, results):
         try:
-            # Clear all tabs
-            for tab in self.result_tabs.values():
-                tab.clear()
-            
-            # Display results in appropriate tabs
-            if 'Username Hunter' in results:
-                username_text = "Username Search Results:\n\n"
-                if isinstance(results['Username Hunter'], dict):
-                    for site, status in results['Username Hunter'].items():
-                        username_text += f"{site}: {status}\n"
-                else:
-                    username_text += str(results['Username Hunter'])
-                self.result_tabs['Usernames'].setText(username_text)
-            
-            if 'Email Breach' in results:
-                email_text = "Email Breach Results:\n\n"
-                if isinstance(results['Email Breach'], dict):
-                    for source, data in results['Email Breach'].items():
-                        email_text += f"{source}:\n"
-                        if isinstance(data, dict):
-                            for key, value in data.items():
-                                email_text += f"  {key}: {value}\n"
-                        else:
-                            email_text += f"  {data}\n"
-                else:
-                    email_text += str(results['Email Breach'])
-                self.result_tabs['Email Leaks'].setText(email_text)
-            
-            if 'Phone Search' in results:
-                phone_text = "Phone Search Results:\n\n"
-                if isinstance(results['Phone Search'], dict):
-                    for source, data in results['Phone Search'].items():
-                        phone_text += f"{source}:\n"
-                        if isinstance(data, dict):
-                            for key, value in data.items():
-                                phone_text += f"  {key}: {value}\n"
-                        else:
-                            phone_text += f"  {data}\n"
-                else:
-                    phone_text += str(results['Phone Search'])
-                self.result_tabs['Phone'].setText(phone_text)
-            
-            if 'Image Search' in results:
-                image_text = "Image Search Results:\n\n"
-                if isinstance(results['Image Search'], dict):
-                    for source, data in results['Image Search'].items():
-                        image_text += f"{source}:\n"
-                        if isinstance(data, dict):
-                            for key, value in data.items():
-                                image_text += f"  {key}: {value}\n"
-                        else:
-                            image_text += f"  {data}\n"
-                else:
-                    image_text += str(results['Image Search'])
-                self.result_tabs['Images'].setText(image_text)
-            
-            if 'Dark Web' in results:
-                darkweb_text = "Dark Web Results:\n\n"
-                if isinstance(results['Dark Web'], dict):
-                    for source, data in results['Dark Web'].items():
-                        darkweb_text += f"{source}:\n"
-                        if isinstance(data, dict):
-                            for key, value in data.items():
-                                darkweb_text += f"  {key}: {value}\n"
-                        else:
-                            darkweb_text += f"  {data}\n"
-                else:
-                    darkweb_text += str(results['Dark Web'])
-                self.result_tabs['Dark Web'].setText(darkweb_text)
-            
-            if 'Social Scraper' in results:
-                social_text = "Social Media Results:\n\n"
-                if isinstance(results['Social Scraper'], dict):
-                    for platform in results['Social Scraper'].get('platforms', []):
-                        social_text += f"=== {platform['platform']} ===\n"
-                        if platform['status'] == 'Error':
-                            social_text += f"Error: {platform['message']}\n"
-                        else:
-                            profile = platform.get('profile', {})
-                            social_text += f"Profile:\n"
-                            social_text += f"  Name: {profile.get('name', 'Unknown')}\n"
-                            social_text += f"  Description: {profile.get('description', 'No description')}\n"
-                            social_text += f"  Location: {profile.get('location', 'Unknown')}\n"
-                            social_text += f"  Followers: {profile.get('followers', '0')}\n"
-                            social_text += f"  Following: {profile.get('following', '0')}\n\n"
-                            
-                            posts = platform.get('posts', [])
-                            if posts:
-                                social_text += f"Recent Posts:\n"
-                                for post in posts:
-                                    social_text += f"  - {post.get('text', 'No content')}\n"
-                                    social_text += f"    Date: {post.get('date', 'Unknown')}\n"
-                                    social_text += f"    Likes: {post.get('likes', '0')}\n"
-                        social_text += "\n"
-                else:
-                    social_text += str(results['Social Scraper'])
-                self.result_tabs['Social Media'].setText(social_text)
+            records = collect(results)
 
             # Create summary
-            summary = f"Investigation completed at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
-            summary += f"Parameters searched:\n"
-            summary += f"- Name: {self.name_input.text() or 'Not provided'}\n"
-            summary += f"- Email: {self.email_input.text() or 'Not provided'}\n"
-            summary += f"- Phone: {self.phone_input.text() or 'Not provided'}\n"
-            summary += f"- Username: {self.username_input.text() or 'Not provided'}\n\n"
-            summary += f"Results found:\n"
-            
-            if 'Username Hunter' in results:
-                summary += f"- Username matches: {results['Username Hunter'].get('found_count', 0)}\n"
-            if 'Email Breach' in results:
-                summary += f"- Email leaks: {results['Email Breach'].get('total_links', 0)}\n"
-            if 'Phone Search' in results:
-                if isinstance(results['Phone Search'], dict):
-                    summary += f"- Phone number matches: {len(results['Phone Search'].get('results', []))}\n"
-                else:
-                    summary += f"- Phone search error: {results['Phone Search']}\n"
-            if 'Social Scraper' in results:
-                if isinstance(results['Social Scraper'], dict):
-                    summary += f"- Social media profiles found: {len(results['Social Scraper'].get('platforms', []))}\n"
+            lines = [
+                f"Investigation completed at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+                "",
+                "Parameters searched:",
+                f"- Name: {self.name_input.text() or 'Not provided'}",
+                f"- Email: {self.email_input.text() or 'Not provided'}",
+                f"- Phone: {self.phone_input.text() or 'Not provided'}",
+                f"- Username: {self.username_input.text() or 'Not provided'}",
+                "",
+                "Results found:",
+            ]
+            for label, result in results.items():
+                counts = count_by_type(records[label])
+                if counts:
+                    found = ", ".join(f"{count} {kind.lower()}{'s' if count != 1 else ''}" for kind, count in counts.items())
+                    lines.append(f"- {label}: {found}")
                 else:
-                    summary += f"- Social media search error: {results['Social Scraper']}\n"
-            
-            self.result_tabs['Summary'].setText(summary)
-            
+                    lines.append(f"- {label}: {result_error(result) or 'nothing found'}")
+
+            self.result_tabs['Summary'].setPlainText("\n".join(lines))
+
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error displaying results: {str(e)}")
 
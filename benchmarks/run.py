@@ -0,0 +1,178 @@
+import argparse
+import asyncio
+import importlib
+import inspect
+import json
+import os
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from modules import fetch, dns_cache, cache, telemetry, replay, health
+from benchmarks.stub_server import StubServer, SCENARIOS, load_config
+
+# Offline benchmarks: every module's run() against the local stub server.
+#
+#   python -m benchmarks.run                       all modules, default scenario
+#   python -m benchmarks.run phone_search -n 50 -c 8 --scenario flaky
+#   python -m benchmarks.run --config slow-google.json --json results.json
+#   python -m benchmarks.run --record run.pxr.gz; python -m benchmarks.run --replay run.pxr.gz --replay-latency 0
+#
+# A config file maps host kinds (default, username, google, directory,
+# darkweb, social, breach, sitedata) to Distribution settings.
+
+# Module -> inputs for the i-th call; each call uses a fresh target
+BENCHMARKS = {
+    "username_hunter": lambda i: {"username": f"stubuser{i:04d}"},
+    "email_breach": lambda i: {"email": f"stubuser{i:04d}@example.com"},
+    "phone_search": lambda i: {"phone": f"98765{i:05d}"},
+    "social_scraper": lambda i: {"username": f"stubuser{i:04d}"},
+    "darkweb_scanner": lambda i: {"email": f"stubuser{i:04d}@example.com", "username": f"stubuser{i:04d}"},
+    "advanced_email_breach": lambda i: {"email": f"stubuser{i:04d}@example.com"},
+    "advanced_social_scraper": lambda i: {"username": f"stubuser{i:04d}"},
+    "advanced_dark_web_scanner": lambda i: {"query": f"stubuser{i:04d}"},
+    # Our sites plus the stub's synthetic Sherlock and Maigret databases
+    "advanced_username_hunter": lambda i: {"username": f"stubuser{i:04d}"},
+}
+
+
+def call(run, data):
+    result = run(data)
+    if inspect.isawaitable(result):
+        result = asyncio.run(result)
+    return result
+
+
+def timed_call(run, data, recorder):
+    started = time.perf_counter()
+    error = ""
+    try:
+        with telemetry.using(recorder):
+            error = telemetry.outcome(call(run, data))
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return time.perf_counter() - started, error
+
+
+def percentile(ordered, q):
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)] if ordered else None
+
+
+def peak_memory(run, data):
+    """Peak bytes allocated by Python during one call"""
+    tracemalloc.start()
+    try:
+        call(run, data)
+    except Exception:
+        pass
+    finally:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return peak
+
+
+def benchmark(name, iterations, concurrency, offset=0):
+    """Run name's run() iterations times, concurrency calls at once, and summarize"""
+    run = importlib.import_module(f"modules.{name}").run
+    inputs = BENCHMARKS[name]
+    # One untimed call warms imports, pools and connections
+    call(run, inputs(offset))
+
+    # Requests are counted from the fetch spans, so replayed runs are measured alike
+    recorder = telemetry.Recorder()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        samples = list(executor.map(lambda i: timed_call(run, inputs(offset + 1 + i), recorder), range(iterations)))
+    wall = time.perf_counter() - started
+
+    fetches = [span for span in recorder.spans() if span.kind == "fetch"]
+    latencies = sorted(latency for latency, _ in samples)
+    return {
+        "module": name,
+        "calls": iterations,
+        "concurrency": concurrency,
+        "errors": sum(1 for _, error in samples if error),
+        "wall_s": round(wall, 3),
+        "calls_per_s": round(iterations / wall, 2),
+        "requests": len(fetches),
+        "requests_per_s": round(len(fetches) / wall, 1),
+        "mb_served": round(sum(span.bytes for span in fetches) / 1024 / 1024, 2),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "peak_mb": round(peak_memory(run, inputs(offset + iterations + 1)) / 1024 / 1024, 2),
+        # Where the adaptive global limit settled
+        "limit": fetch.limit_stats()["total"]["limit"],
+    }
+
+
+COLUMNS = ("module", "calls", "errors", "calls_per_s", "requests_per_s", "p50_ms", "p95_ms", "peak_mb", "mb_served",
+           "limit")
+
+
+def print_table(rows, out=sys.stdout):
+    widths = [max(len(column), *(len(str(row[column])) for row in rows)) for column in COLUMNS]
+    print("  ".join(column.ljust(width) for column, width in zip(COLUMNS, widths)), file=out)
+    for row in rows:
+        print("  ".join(str(row[column]).ljust(width) for column, width in zip(COLUMNS, widths)), file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark PersonaX modules against a local stub HTTP server')
+    parser.add_argument('modules', nargs='*', help=f"modules to benchmark (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument('-n', '--iterations', type=int, default=10, help='timed calls per module (default: 10)')
+    parser.add_argument('-c', '--concurrency', type=int, default=1, help='calls running at once (default: 1)')
+    parser.add_argument('--scenario', choices=list(SCENARIOS), default='default',
+                        help='latency/error/size preset for the stub server')
+    parser.add_argument('--config', help='JSON file of per-kind distribution overrides')
+    parser.add_argument('--recordings', help='directory of recorded <host>.html/<host>.json bodies to serve')
+    parser.add_argument('--seed', type=int, default=0, help='seed for found profiles and sampled delays')
+    parser.add_argument('--cache', action='store_true', help='leave the result cache on (default: bypassed)')
+    parser.add_argument('--json', help='also write the results to this file')
+    archive = parser.add_mutually_exclusive_group()
+    archive.add_argument('--record', metavar='ARCHIVE', help="record the stub server's responses to this archive")
+    archive.add_argument('--replay', metavar='ARCHIVE', help='replay a recorded archive instead of the stub server')
+    parser.add_argument('--replay-latency', type=float, default=1.0, metavar='SCALE',
+                        help='scale recorded response times when replaying (default: 1, 0 for none)')
+    args = parser.parse_args(argv)
+
+    if args.iterations < 1 or args.concurrency < 1:
+        parser.error('--iterations and --concurrency must be at least 1')
+    unknown = [name for name in args.modules if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown module(s): {', '.join(unknown)}")
+    cache.set_bypass(not args.cache)
+    config = load_config(args.scenario, args.config)
+    # Stub hosts must not inherit (or leave behind) the health of the real ones
+    health.set_registry(health.Registry(":memory:"))
+    # The stub accepts any API key
+    for variable in ("PERSONAX_RAPIDAPI_KEY", "PERSONAX_LEAKCHECK_KEY"):
+        os.environ.setdefault(variable, "stub")
+
+    rows = []
+    with StubServer(config, seed=args.seed, recordings=args.recordings) as stub:
+        fetch.set_url_rewrite(stub.rewrite)
+        dns_cache.set_resolver(stub.resolve)
+        if args.record:
+            replay.start_recording(args.record)
+        elif args.replay:
+            replay.start_replay(args.replay, args.replay_latency)
+        try:
+            for offset, name in enumerate(args.modules or BENCHMARKS):
+                rows.append(benchmark(name, args.iterations, args.concurrency, offset * 10000))
+                print(f"{name}: {rows[-1]['calls_per_s']} calls/s, p95 {rows[-1]['p95_ms']} ms", file=sys.stderr)
+        finally:
+            fetch.set_url_rewrite(None)
+            dns_cache.set_resolver(None)
+            archive = replay.stop()
+        if archive is not None and archive.misses:
+            print(f"{archive.misses} request(s) were not in {archive.path}", file=sys.stderr)
+
+    print_table(rows)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"scenario": args.scenario, "config": args.config, "seed": args.seed, "results": rows}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
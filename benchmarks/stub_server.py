@@ -0,0 +1,358 @@
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, quote
+
+# Local stand-in for every host the modules talk to. fetch.set_url_rewrite()
+# turns https://www.google.com/search?q=x into
+# http://127.0.0.1:<port>/https/www.google.com/search?q=x, and the server
+# answers with a synthetic (or recorded) page for that host after a sampled
+# delay, so benchmarks never touch the internet.
+
+# Host -> kind of page served; hosts not listed are treated as username sites
+HOST_KINDS = {
+    "www.google.com": "google",
+    "www.truecaller.com": "directory",
+    "www.whitepages.com": "directory",
+    "www.411.com": "directory",
+    "ahmia.fi": "darkweb",
+    "darksearch.io": "darkweb",
+    "darknetlive.com": "darkweb",
+    "twitter.com": "social",
+    "www.instagram.com": "social",
+    "www.reddit.com": "social",
+    "www.facebook.com": "social",
+    "www.linkedin.com": "social",
+    "breachdirectory.p.rapidapi.com": "breach",
+    "leakcheck.io": "breach",
+    "raw.githubusercontent.com": "sitedata",
+}
+
+# Named behaviours; a JSON config with the same shape overrides them per kind
+SCENARIOS = {
+    "default": {"default": {}},
+    "slow": {"default": {"latency_ms": 400, "latency_sigma": 0.8}},
+    "flaky": {"default": {"error_rate": 0.15, "latency_sigma": 1.2}},
+    "large": {"default": {"size_kb": 600, "size_sigma": 1.0}},
+    "throttled": {"default": {"error_rate": 0.2, "error_status": 429, "retry_after": 1}},
+}
+
+
+class Distribution:
+    """Latency, error and size behaviour of one kind of host.
+
+    Latency and page size are log-normal around their medians; found_rate is the
+    share of profiles and searches that return something. Errors carry a
+    Retry-After of retry_after seconds when it is set.
+    """
+
+    def __init__(self, latency_ms=60, latency_sigma=0.5, error_rate=0.0, error_status=503, retry_after=None,
+                 size_kb=40, size_sigma=0.8, found_rate=0.3):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.size_kb = size_kb
+        self.size_sigma = size_sigma
+        self.found_rate = found_rate
+
+    def latency(self, rng):
+        return rng.lognormvariate(math.log(max(self.latency_ms, 0.1)), self.latency_sigma) / 1000
+
+    def size(self, rng):
+        return int(rng.lognormvariate(math.log(max(self.size_kb, 0.1) * 1024), self.size_sigma))
+
+
+def load_config(scenario="default", path=None):
+    """kind -> Distribution for a named scenario, updated from an optional JSON file"""
+    settings = {kind: dict(values) for kind, values in SCENARIOS[scenario].items()}
+    if path:
+        with open(path, encoding="utf-8") as f:
+            for kind, values in json.load(f).items():
+                settings.setdefault(kind, {}).update(values)
+    base = settings.pop("default", {})
+    config = {"default": Distribution(**base)}
+    for kind, values in settings.items():
+        config[kind] = Distribution(**dict(base, **values))
+    return config
+
+
+def host_kind(host):
+    if host in HOST_KINDS:
+        return HOST_KINDS[host]
+    if host.endswith(".onion"):
+        return "darkweb"
+    return "username"
+
+
+def _found(seed, url, rate):
+    # Stable per URL so repeated runs see the same profiles
+    digest = hashlib.blake2b(f"{seed}:{url}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2 ** 64 < rate
+
+
+def _padding(size):
+    line = "<p>lorem ipsum dolor sit amet consectetur adipiscing elit</p>\n"
+    return line * max(size // len(line), 0)
+
+
+SOCIAL_PAGES = {
+    "twitter.com": (
+        '<span data-testid="UserName">{name}</span><div data-testid="UserDescription">Bio of {name}</div>'
+        '<span data-testid="UserLocation">Pune</span><a href="/{name}/followers">120</a>'
+        '<a href="/{name}/following">80</a>',
+        '<article data-testid="tweet"><div data-testid="tweetText">Post {i} by {name}</div>'
+        '<time>2024-01-0{d}</time><div data-testid="like">{i}</div></article>',
+    ),
+    "www.instagram.com": (
+        '<h2>{name}</h2><h1>Bio of {name}</h1><span title="120 followers">120</span>'
+        '<span title="80 following">80</span>',
+        '<article><img alt="Post {i} by {name}"><time>2024-01-0{d}</time><span title="{i} likes">{i}</span></article>',
+    ),
+    "www.reddit.com": (
+        '<div data-test-id="user-profile-about">Bio of {name}</div><span data-test-id="user-karma">42</span>',
+        '<div data-test-id="post"><h3>Post {i} by {name}</h3><time>2024-01-0{d}</time>'
+        '<span data-test-id="post-score">{i}</span></div>',
+    ),
+    "www.facebook.com": (
+        '<h1>{name}</h1><div data-testid="bio">Bio of {name}</div><div data-testid="current_city">Pune</div>',
+        '<div data-testid="post_message">Post {i} by {name}<abbr>2024-01-0{d}</abbr>'
+        '<span data-testid="UFI2ReactionsCount">{i}</span></div>',
+    ),
+    "www.linkedin.com": (
+        '<h1>{name}</h1><div data-test-id="about">Bio of {name}</div><span data-test-id="location">Pune</span>'
+        '<div data-test-id="headline">Engineer</div>',
+        '<div data-test-id="feed-post"><div data-test-id="feed-post-content">Post {i} by {name}</div>'
+        '<time>2024-01-0{d}</time><span data-test-id="social-actions">{i}</span></div>',
+    ),
+}
+
+
+def _html(body, size):
+    return f"<html><head><title>stub</title></head><body>{body}\n{_padding(size)}</body></html>"
+
+
+def google_page(query, found, size, rng):
+    """A result page with links on the site: domains of a dork when found"""
+    links = []
+    if found:
+        for domain in [term.strip("()")[5:] for term in query.split() if term.strip("()").startswith("site:")]:
+            for _ in range(rng.randint(1, 2)):
+                links.append(f'<a href="/url?q=https://{domain}/{rng.getrandbits(32):08x}">paste</a>')
+    return _html("<div id=\"search\">" + "".join(links) + "</div><div id=\"foot\"></div>", size)
+
+
+def darkweb_page(host, query, found, size, rng):
+    count = rng.randint(1, 5) if found else 0
+    if host == "darksearch.io":
+        results = [{"link": f"http://{rng.getrandbits(64):016x}.onion/", "title": f"{query} {i}"} for i in range(count)]
+        return json.dumps({"results": results}), "application/json"
+    results = "".join(
+        f'<div class="result"><a href="http://{rng.getrandbits(64):016x}.onion/">{query} {i}</a></div>'
+        for i in range(count)
+    )
+    return _html(results, size), "text/html"
+
+
+# Sites in the synthetic Sherlock and Maigret databases; a few repeat ours to exercise deduplication
+SITE_DATABASE_SIZES = {"sherlock": 400, "maigret": 600}
+CHECK_TYPES = ("status_code", "message", "response_url")
+
+
+def site_database(path):
+    """A Sherlock- or Maigret-format data.json with synthetic sites on stub hosts"""
+    if "maigret" in path:
+        sites = {"GitHub": {"url": "https://github.com/{username}", "checkType": "status_code", "alexaRank": 1}}
+        for i in range(SITE_DATABASE_SIZES["maigret"]):
+            sites[f"StubMaigret{i}"] = {
+                "url": f"https://maigret{i}.example.org/users/{{username}}",
+                "urlMain": f"https://maigret{i}.example.org",
+                "checkType": CHECK_TYPES[i % 3],
+                "absenceStrs": ["Page not found"],
+                "alexaRank": i + 2,
+                "tags": ["stub"],
+            }
+        return json.dumps({"engines": {}, "sites": sites, "tags": ["stub"]})
+    sites = {"GitHub": {"url": "https://www.github.com/{}", "errorType": "status_code"}}
+    for i in range(SITE_DATABASE_SIZES["sherlock"]):
+        sites[f"StubSherlock{i}"] = {
+            "url": f"https://sherlock{i}.example.net/{{}}",
+            "urlMain": f"https://sherlock{i}.example.net/",
+            "errorType": CHECK_TYPES[i % 3],
+            "errorMsg": "Page not found",
+        }
+    return json.dumps(sites)
+
+
+def breach_page(host, found, rng):
+    count = rng.randint(1, 3) if found else 0
+    if host == "leakcheck.io":
+        breaches = [{"source": {"name": f"Breach {i}", "breach_date": "2021-05"}, "fields": ["email", "password"]}
+                    for i in range(count)]
+        return json.dumps({"success": True, "found": count, "result": breaches})
+    breaches = [{"source": f"Breach {i}", "date": "2021-05-01", "details": "email, password"} for i in range(count)]
+    return json.dumps({"result": breaches})
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients that stop reading at a size cap or marker hang up mid-body
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+
+class StubServer:
+    """Threaded HTTP server answering for every rewritten host; use as a context manager"""
+
+    def __init__(self, config=None, seed=0, recordings=None, port=0):
+        self.config = config or load_config()
+        self.seed = seed
+        self.recordings = recordings
+        self.requests = 0
+        self.bytes_sent = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        handler = type("StubHandler", (_Handler,), {"stub": self})
+        self.httpd = _Server(("127.0.0.1", port), handler)
+        self.base = f"http://127.0.0.1:{self.httpd.server_port}"
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="stub-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def rewrite(self, url):
+        """fetch.set_url_rewrite() hook: route url to this server"""
+        if url.startswith(self.base):
+            return url
+        parts = urlsplit(url)
+        target = f"{self.base}/{parts.scheme}/{parts.netloc}{quote(parts.path or '/', safe='/%:@')}"
+        return f"{target}?{parts.query}" if parts.query else target
+
+    def resolve(self, host):
+        """dns_cache.set_resolver() hook: every host exists, random wildcard probes do not"""
+        if host.startswith("personax-"):
+            return ()
+        return ("127.0.0.1",)
+
+    def distribution(self, kind):
+        return self.config.get(kind, self.config["default"])
+
+    def random(self):
+        with self._lock:
+            return random.Random(self._rng.getrandbits(64))
+
+    def recorded(self, host):
+        """Body recorded for host in the recordings directory, as (bytes, content type)"""
+        if not self.recordings:
+            return None
+        for extension, content_type in ((".html", "text/html"), (".json", "application/json")):
+            path = os.path.join(self.recordings, host + extension)
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    return f.read(), content_type
+        return None
+
+    def respond(self, method, path):
+        """Return (status, headers, body) for a rewritten request path"""
+        _, scheme, rest = path.split("/", 2)
+        host, _, rest = rest.partition("/")
+        url = f"{scheme}://{host}/{rest}"
+        parts = urlsplit(url)
+        query = " ".join(value for values in parse_qs(parts.query).values() for value in values)
+        kind = host_kind(host)
+        dist = self.distribution(kind)
+        rng = self.random()
+
+        time.sleep(dist.latency(rng))
+        if rng.random() < dist.error_rate:
+            headers = {"Content-Type": "text/html"}
+            if dist.retry_after is not None:
+                headers["Retry-After"] = str(dist.retry_after)
+            return dist.error_status, headers, _html("Service unavailable", 256).encode()
+
+        found = _found(self.seed, url, dist.found_rate)
+        recorded = self.recorded(host)
+        if recorded:
+            return 200, {"Content-Type": recorded[1]}, recorded[0]
+
+        size = dist.size(rng)
+        content_type = "text/html; charset=utf-8"
+        if kind == "google":
+            body = google_page(query, found, size, rng)
+        elif kind == "directory":
+            body = _html(
+                '<h1 class="profile-name">Stub Person</h1><div class="profile-location">Pune</div>'
+                '<div class="name">Stub Person</div><div class="address">1 Stub Road, Pune</div>'
+                if found else "No results", size)
+        elif kind == "darkweb":
+            body, content_type = darkweb_page(host, query, found, size, rng)
+        elif kind == "breach":
+            body, content_type = breach_page(host, found, rng), "application/json"
+        elif kind == "sitedata":
+            body, content_type = site_database(parts.path), "application/json"
+        elif not found:
+            return 404, {"Content-Type": content_type}, _html("Page not found", 1024).encode()
+        elif kind == "social":
+            profile, post = SOCIAL_PAGES[host]
+            name = parts.path.strip("/").split("/")[-1]
+            posts = "".join(post.format(name=name, i=i, d=i % 9 + 1) for i in range(rng.randint(1, 10)))
+            body = _html(profile.format(name=name) + posts, size)
+        else:
+            body = _html(f"<h1>{parts.path.strip('/')}</h1>", size)
+        return 200, {"Content-Type": content_type}, body.encode()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    stub = None
+
+    def _reply(self, send_body):
+        try:
+            status, headers, body = self.stub.respond(self.command, self.path)
+        except Exception as e:
+            status, headers, body = 500, {"Content-Type": "text/plain"}, str(e).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+        with self.stub._lock:
+            self.stub.requests += 1
+            self.stub.bytes_sent += len(body) if send_body else 0
+
+    def do_GET(self):
+        self._reply(True)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        self._reply(True)
+
+    def do_HEAD(self):
+        self._reply(False)
+
+    def log_message(self, format, *args):
+        pass
@@ -0,0 +1,162 @@
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+
+from modules import investigation, cache, results, telemetry, replay, cancel
+
+# Headless batch runner: no Qt import, one JSONL record per target
+
+TARGET_FIELDS = ('name', 'email', 'phone', 'username')
+
+
+def read_targets(handle, fmt):
+    """Yield target dicts from a CSV (with header) or JSONL stream"""
+    if fmt == 'csv':
+        for row in csv.DictReader(handle):
+            yield {field: (row.get(field) or '').strip() for field in TARGET_FIELDS}
+        return
+    for line_number, line in enumerate(handle, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"line {line_number}: {e}") from e
+        yield {field: str(row.get(field) or '').strip() for field in TARGET_FIELDS}
+
+
+def detect_format(path):
+    if path.lower().endswith('.csv'):
+        return 'csv'
+    return 'jsonl'
+
+
+def investigate(index, target, deadline, profile=False, token=None):
+    token = token or cancel.CancelToken()
+    started = time.monotonic()
+    record = {
+        'index': index,
+        'target': target,
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+    }
+    recorder = telemetry.Recorder() if profile else None
+    try:
+        record['results'] = investigation.run_investigation(
+            dict(target, telemetry=recorder, cancel=token), deadline=deadline
+        )
+    except Exception as e:
+        record['error'] = str(e)
+    finally:
+        # Past the deadline, modules still running are stopped rather than left fetching
+        token.cancel()
+    record['elapsed'] = round(time.monotonic() - started, 3)
+    if recorder is not None:
+        record['profile'] = recorder.report()
+    return record
+
+
+def run_batch(targets, out, concurrency=4, deadline=investigation.INVESTIGATION_DEADLINE, profile=False):
+    """Investigate targets concurrently and write each record as soon as it completes"""
+    written = 0
+    # Bounded window so huge target files are streamed rather than loaded up front
+    limit = concurrency * 2
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    tokens = {}  # future -> its target's CancelToken
+    in_flight = set()
+
+    def drain(futures):
+        nonlocal written
+        for future in futures:
+            tokens.pop(future)
+            out.write(json.dumps(future.result(), default=results.jsonable) + '\n')
+            written += 1
+        out.flush()
+
+    try:
+        for index, target in enumerate(targets):
+            if not any(target.values()):
+                continue
+            if len(in_flight) >= limit:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                drain(done)
+            token = cancel.CancelToken()
+            future = executor.submit(investigate, index, target, deadline, profile, token)
+            tokens[future] = token
+            in_flight.add(future)
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            drain(done)
+    except BaseException:
+        # Ctrl-C or a failed write: stop every investigation instead of waiting them out
+        for token in tokens.values():
+            token.cancel()
+        raise
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run PersonaX investigations headlessly over a file of targets')
+    parser.add_argument('input', help="CSV or JSONL file of targets with name/email/phone/username fields ('-' for stdin)")
+    parser.add_argument('-o', '--output', default='-', help="JSONL output file (default: stdout)")
+    parser.add_argument('-f', '--format', choices=('csv', 'jsonl'), help='input format (default: from file extension)')
+    parser.add_argument('-c', '--concurrency', type=int, default=4, help='targets investigated at once (default: 4)')
+    parser.add_argument('--deadline', type=float, default=investigation.INVESTIGATION_DEADLINE,
+                        help='per-target deadline in seconds')
+    parser.add_argument('--no-cache', action='store_true', help='bypass the result cache')
+    parser.add_argument('--parse-processes', action='store_true',
+                        help='parse scraped pages in worker processes instead of threads')
+    parser.add_argument('--profile', action='store_true',
+                        help="add each investigation's per-source latency profile to its record")
+    archive = parser.add_mutually_exclusive_group()
+    archive.add_argument('--record', metavar='ARCHIVE', help='record every HTTP exchange to this archive')
+    archive.add_argument('--replay', metavar='ARCHIVE', help='answer every HTTP request from this archive')
+    parser.add_argument('--replay-latency', type=float, default=1.0, metavar='SCALE',
+                        help='scale recorded response times when replaying (default: 1, 0 for none)')
+    args = parser.parse_args(argv)
+
+    if args.concurrency < 1:
+        parser.error('--concurrency must be at least 1')
+    cache.set_bypass(args.no_cache or cache.is_bypassed())
+    if args.parse_processes:
+        # Read by the social scraper when it is first imported
+        os.environ['PERSONAX_PARSE_PROCESSES'] = '1'
+
+    if args.record:
+        replay.start_recording(args.record)
+    elif args.replay:
+        replay.start_replay(args.replay, args.replay_latency)
+
+    fmt = args.format or ('jsonl' if args.input == '-' else detect_format(args.input))
+    source = sys.stdin if args.input == '-' else open(args.input, newline='', encoding='utf-8')
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    started = time.monotonic()
+    try:
+        written = run_batch(read_targets(source, fmt), out, args.concurrency, args.deadline, args.profile)
+    except ValueError as e:
+        parser.error(str(e))
+    except KeyboardInterrupt:
+        print("Interrupted", file=sys.stderr)
+        sys.exit(130)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+        archive = replay.stop()
+    print(f"Investigated {written} target(s) in {time.monotonic() - started:.1f}s", file=sys.stderr)
+    if archive is not None and archive.replaying:
+        print(f"Replayed from {archive.path}; {archive.misses} request(s) were not in the archive", file=sys.stderr)
+    elif archive is not None:
+        print(f"Recorded {len(archive)} exchange(s) to {archive.path}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,21 +1,19 @@
-import requests
+from modules import fetch, cache, cancel
+from modules.utils import fan_out
+from modules.results import hits_from
 from bs4 import BeautifulSoup
 import json
-from concurrent.futures import ThreadPoolExecutor
 import os
 import subprocess
 import re
 import time
 from urllib.parse import urljoin
 
+BODY_LIMIT = fetch.body_limit("advanced_dark_web_scanner")
+
 class AdvancedDarkWebScanner:
     def __init__(self):
         self.setup_tools()
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-        }
 
     def setup_tools(self):
         """Setup required tools if not already present"""
@@ -26,8 +24,9 @@ class AdvancedDarkWebScanner:
         """Search using Ahmia"""
         try:
             url = f"https://ahmia.fi/search/?q={query}"
-            response = requests.get(url, headers=self.headers, timeout=10)
-            soup = BeautifulSoup(response.text, 'lxml')
+            response, html, truncated = fetch.get_text(url, limit=BODY_LIMIT)
+            fetch.raise_for_status(response)
+            soup = BeautifulSoup(html, 'lxml')
             
             results = []
             for result in soup.find_all('div', class_='result'):
@@ -39,7 +38,7 @@ class AdvancedDarkWebScanner:
                         'source': 'Ahmia'
                     })
             
-            return {"source": "Ahmia", "results": results}
+            return {"source": "Ahmia", "results": results, "truncated": truncated}
         except Exception as e:
             return {"source": "Ahmia", "error": str(e)}
 
@@ -47,8 +46,11 @@ class AdvancedDarkWebScanner:
         """Search using DarkSearch"""
         try:
             url = f"https://darksearch.io/api/search?query={query}"
-            response = requests.get(url, headers=self.headers, timeout=10)
-            data = response.json()
+            response, body, truncated = fetch.get_text(url, limit=BODY_LIMIT)
+            fetch.raise_for_status(response)
+            if truncated:
+                return {"source": "DarkSearch", "error": f"Response larger than {BODY_LIMIT} bytes"}
+            data = json.loads(body)
             
             results = []
             for result in data.get('results', []):
@@ -66,8 +68,9 @@ class AdvancedDarkWebScanner:
         """Search using Torch"""
         try:
             url = f"http://xmh57jrzrnw6insl.onion/torrents.php?search={query}"
-            response = requests.get(url, headers=self.headers, timeout=10)
-            soup = BeautifulSoup(response.text, 'lxml')
+            response, html, truncated = fetch.get_text(url, limit=BODY_LIMIT)
+            fetch.raise_for_status(response)
+            soup = BeautifulSoup(html, 'lxml')
             
             results = []
             for result in soup.find_all('tr', class_='torrent'):
@@ -79,7 +82,7 @@ class AdvancedDarkWebScanner:
                         'source': 'Torch'
                     })
             
-            return {"source": "Torch", "results": results}
+            return {"source": "Torch", "results": results, "truncated": truncated}
         except Exception as e:
             return {"source": "Torch", "error": str(e)}
 
@@ -87,8 +90,9 @@ class AdvancedDarkWebScanner:
         """Search using DarkNetLive"""
         try:
             url = f"https://darknetlive.com/search/{query}"
-            response = requests.get(url, headers=self.headers, timeout=10)
-            soup = BeautifulSoup(response.text, 'lxml')
+            response, html, truncated = fetch.get_text(url, limit=BODY_LIMIT)
+            fetch.raise_for_status(response)
+            soup = BeautifulSoup(html, 'lxml')
             
             results = []
             for result in soup.find_all('article'):
@@ -100,7 +104,7 @@ class AdvancedDarkWebScanner:
                         'source': 'DarkNetLive'
                     })
             
-            return {"source": "DarkNetLive", "results": results}
+            return {"source": "DarkNetLive", "results": results, "truncated": truncated}
         except Exception as e:
             return {"source": "DarkNetLive", "error": str(e)}
 
@@ -108,8 +112,9 @@ class AdvancedDarkWebScanner:
         """Search using DarkFaucet"""
         try:
             url = f"https://darkfaucet.onion/search?q={query}"
-            response = requests.get(url, headers=self.headers, timeout=10)
-            soup = BeautifulSoup(response.text, 'lxml')
+            response, html, truncated = fetch.get_text(url, limit=BODY_LIMIT)
+            fetch.raise_for_status(response)
+            soup = BeautifulSoup(html, 'lxml')
             
             results = []
             for result in soup.find_all('div', class_='result'):
@@ -121,7 +126,7 @@ class AdvancedDarkWebScanner:
                         'source': 'DarkFaucet'
                     })
             
-            return {"source": "DarkFaucet", "results": results}
+            return {"source": "DarkFaucet", "results": results, "truncated": truncated}
         except Exception as e:
             return {"source": "DarkFaucet", "error": str(e)}
 
@@ -135,26 +140,34 @@ class AdvancedDarkWebScanner:
             "http://dreammarket.onion"
         ]
         
+        def search_marketplace(marketplace):
+            url = f"{marketplace}/search?q={query}"
+            response, html, _ = fetch.get_text(url, limit=BODY_LIMIT)
+            fetch.raise_for_status(response)
+            soup = BeautifulSoup(html, 'lxml')
+            
+            listings = []
+            for result in soup.find_all('div', class_='listing'):
+                link = result.find('a')
+                if link and 'href' in link.attrs:
+                    listings.append({
+                        'url': urljoin(url, link['href']),
+                        'title': link.text if link.text else 'No title',
+                        'source': f'Marketplace: {marketplace}'
+                    })
+            return listings
+        
+        # All marketplaces share one deadline; dead ones are reported, not waited on
+        completed, failed, timed_out = fan_out(
+            search_marketplace, {m: m for m in marketplaces}, deadline=fetch.DEFAULT_TIMEOUT
+        )
         results = []
         for marketplace in marketplaces:
-            try:
-                url = f"{marketplace}/search?q={query}"
-                response = requests.get(url, headers=self.headers, timeout=10)
-                soup = BeautifulSoup(response.text, 'lxml')
-                
-                for result in soup.find_all('div', class_='listing'):
-                    link = result.find('a')
-                    if link and 'href' in link.attrs:
-                        results.append({
-                            'url': urljoin(url, link['href']),
-                            'title': link.text if link.text else 'No title',
-                            'source': f'Marketplace: {marketplace}'
-                        })
-            except Exception as e:
-                continue
+            results.extend(completed.get(marketplace, []))
         
-        return {"source": "Marketplaces", "results": results}
+        return {"source": "Marketplaces", "results": results, "failed": failed, "timed_out": timed_out}
 
+@cache.cached_run("advanced_dark_web_scanner", "query")
 def run(data):
     query = data.get("query")
     if not query:
@@ -163,7 +176,7 @@ def run(data):
     scanner = AdvancedDarkWebScanner()
     
     # Run all searches in parallel
-    with ThreadPoolExecutor(max_workers=6) as executor:
+    with cancel.Executor(max_workers=6) as executor:
         ahmia_future = executor.submit(scanner.search_ahmia, query)
         darksearch_future = executor.submit(scanner.search_darksearch, query)
         torch_future = executor.submit(scanner.search_torch, query)
@@ -186,7 +199,8 @@ def run(data):
         "sources_checked": len(results),
         "results": results,
         "total_matches": sum(len(r.get("results", [])) for r in results if "results" in r),
-        "marketplace_matches": len(results[5].get("results", [])) if "results" in results[5] else 0
+        "marketplace_matches": len(results[5].get("results", [])) if "results" in results[5] else 0,
+        "records": [hit for r in results for hit in hits_from(r.get("results", []), query)]
     }
 
     return combined_results 
\ No newline at end of file
@@ -1,75 +1,49 @@
-import requests
-from bs4 import BeautifulSoup
+from modules import fetch, cache, email_breach, cancel
+from modules.results import Hit, Breach
 import re
-from concurrent.futures import ThreadPoolExecutor
 import json
 import os
 
-class AdvancedEmailBreach:
-    def __init__(self):
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-        }
+# Breach API keys come from the environment; a source without one is skipped
+RAPIDAPI_KEY = "PERSONAX_RAPIDAPI_KEY"
+LEAKCHECK_KEY = "PERSONAX_LEAKCHECK_KEY"
+
+def api_key(variable):
+    return os.environ.get(variable, "").strip()
+
+def missing_key(source, variable):
+    return {"source": source, "error": f"Source unavailable: set {variable} to search {source}"}
 
+class AdvancedEmailBreach:
     def search_pastebin(self, email):
         """Search for email on Pastebin"""
-        query = f"site:pastebin.com {email}"
-        url = f"https://www.google.com/search?q={query}"
-        try:
-            resp = requests.get(url, headers=self.headers, timeout=10)
-            soup = BeautifulSoup(resp.text, "lxml")
-            links = [a["href"] for a in soup.find_all("a", href=True) if "pastebin.com" in a["href"]]
-            return {"source": "Pastebin", "links": links}
-        except Exception as e:
-            return {"source": "Pastebin", "error": str(e)}
+        return email_breach.search_pastebin(email)
 
     def search_ghostbin(self, email):
         """Search for email on Ghostbin"""
-        query = f"site:ghostbin.co {email}"
-        url = f"https://www.google.com/search?q={query}"
-        try:
-            resp = requests.get(url, headers=self.headers, timeout=10)
-            soup = BeautifulSoup(resp.text, "lxml")
-            links = [a["href"] for a in soup.find_all("a", href=True) if "ghostbin.co" in a["href"]]
-            return {"source": "Ghostbin", "links": links}
-        except Exception as e:
-            return {"source": "Ghostbin", "error": str(e)}
+        return email_breach.search_ghostbin(email)
 
     def search_justpasteit(self, email):
         """Search for email on JustPaste.it"""
-        query = f"site:justpaste.it {email}"
-        url = f"https://www.google.com/search?q={query}"
-        try:
-            resp = requests.get(url, headers=self.headers, timeout=10)
-            soup = BeautifulSoup(resp.text, "lxml")
-            links = [a["href"] for a in soup.find_all("a", href=True) if "justpaste.it" in a["href"]]
-            return {"source": "JustPaste.it", "links": links}
-        except Exception as e:
-            return {"source": "JustPaste.it", "error": str(e)}
+        return email_breach.search_justpasteit(email)
 
     def search_rentry(self, email):
         """Search for email on Rentry"""
-        query = f"site:rentry.co {email}"
-        url = f"https://www.google.com/search?q={query}"
-        try:
-            resp = requests.get(url, headers=self.headers, timeout=10)
-            soup = BeautifulSoup(resp.text, "lxml")
-            links = [a["href"] for a in soup.find_all("a", href=True) if "rentry.co" in a["href"]]
-            return {"source": "Rentry", "links": links}
-        except Exception as e:
-            return {"source": "Rentry", "error": str(e)}
+        return email_breach.search_rentry(email)
 
     def search_breachdirectory(self, email):
         """Search for email on BreachDirectory"""
+        key = api_key(RAPIDAPI_KEY)
+        if not key:
+            return missing_key("BreachDirectory", RAPIDAPI_KEY)
         try:
             url = f"https://breachdirectory.p.rapidapi.com/?func=auto&term={email}"
             headers = {
                 'x-rapidapi-host': "breachdirectory.p.rapidapi.com",
-                'x-rapidapi-key': "YOUR_RAPIDAPI_KEY"
+                'x-rapidapi-key': key
             }
-            response = requests.get(url, headers=headers, timeout=10)
+            response = fetch.get(url, headers=headers)
+            fetch.raise_for_status(response)
             data = response.json()
             
             if data.get('result'):
@@ -87,24 +61,31 @@ class AdvancedEmailBreach:
 
     def search_leakcheck(self, email):
         """Search for email on LeakCheck"""
+        key = api_key(LEAKCHECK_KEY)
+        if not key:
+            return missing_key("LeakCheck", LEAKCHECK_KEY)
         try:
-            url = f"https://leakcheck.io/api/public?key=YOUR_API_KEY&check={email}&type=email"
-            response = requests.get(url, headers=self.headers, timeout=10)
+            # The key goes in a header: URLs end up in replay archives and telemetry
+            url = f"https://leakcheck.io/api/v2/query/{email}?type=email"
+            response = fetch.get(url, headers={'X-API-Key': key})
+            fetch.raise_for_status(response)
             data = response.json()
             
             if data.get('success'):
-                return {
-                    "source": "LeakCheck",
-                    "breaches": [{
-                        'source': breach.get('source', 'Unknown'),
-                        'date': breach.get('date', 'Unknown'),
-                        'details': breach.get('details', 'No details')
-                    } for breach in data.get('result', [])]
-                }
+                breaches = []
+                for breach in data.get('result', []):
+                    source = breach.get('source') or {}
+                    breaches.append({
+                        'source': source.get('name', 'Unknown'),
+                        'date': source.get('breach_date') or 'Unknown',
+                        'details': ', '.join(breach.get('fields', [])) or 'No details'
+                    })
+                return {"source": "LeakCheck", "breaches": breaches}
             return {"source": "LeakCheck", "breaches": []}
         except Exception as e:
             return {"source": "LeakCheck", "error": str(e)}
 
+@cache.cached_run("advanced_email_breach", "email")
 def run(data):
     email = data.get("email")
     if not email:
@@ -117,20 +98,18 @@ def run(data):
 
     hunter = AdvancedEmailBreach()
     
-    # Run all checks in parallel
-    with ThreadPoolExecutor(max_workers=6) as executor:
-        pastebin_future = executor.submit(hunter.search_pastebin, email)
-        ghostbin_future = executor.submit(hunter.search_ghostbin, email)
-        justpasteit_future = executor.submit(hunter.search_justpasteit, email)
-        rentry_future = executor.submit(hunter.search_rentry, email)
-        breachdirectory_future = executor.submit(hunter.search_breachdirectory, email)
-        leakcheck_future = executor.submit(hunter.search_leakcheck, email)
-        
-        results = [
-            pastebin_future.result(),
-            ghostbin_future.result(),
-            justpasteit_future.result(),
-            rentry_future.result(),
+    # Breach APIs are cached under email_breach next to the paste-site dorks
+    def lookup(search):
+        return cache.cached("email_breach", search.__name__, email, lambda: search(email))
+
+    # Run all checks in parallel; the paste sites share one combined query
+    with cancel.Executor(max_workers=3) as executor:
+        paste_future = executor.submit(email_breach.paste_site_results, email)
+        breachdirectory_future = executor.submit(lookup, hunter.search_breachdirectory)
+        leakcheck_future = executor.submit(lookup, hunter.search_leakcheck)
+
+        paste_results, queries = paste_future.result()
+        results = paste_results + [
             breachdirectory_future.result(),
             leakcheck_future.result()
         ]
@@ -140,8 +119,13 @@ def run(data):
         "email": email,
         "sources_checked": len(results),
         "results": results,
+        "queries": queries,
         "total_links": sum(len(r.get("links", [])) for r in results if "links" in r),
-        "total_breaches": sum(len(r.get("breaches", [])) for r in results if "breaches" in r)
+        "total_breaches": sum(len(r.get("breaches", [])) for r in results if "breaches" in r),
+        "records": [Hit(r["source"], link, query=email) for r in results for link in r.get("links", [])] + [
+            Breach(r["source"], breach['source'], breach['date'], breach['details'], email)
+            for r in results for breach in r.get("breaches", [])
+        ]
     }
 
     return combined_results 
\ No newline at end of file
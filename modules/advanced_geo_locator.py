@@ -1,7 +1,7 @@
-import requests
+from modules import fetch, cancel
+from modules.results import Location
 from bs4 import BeautifulSoup
 import json
-from concurrent.futures import ThreadPoolExecutor
 import os
 import re
 import time
@@ -15,11 +15,6 @@ import tempfile
 
 class AdvancedGeoLocator:
     def __init__(self):
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-        }
         self.geolocator = Nominatim(user_agent="PersonaX")
 
     def extract_exif_data(self, image_path):
@@ -61,7 +56,7 @@ class AdvancedGeoLocator:
         """Search location using Google Maps"""
         try:
             url = f"https://www.google.com/maps/search/{query}"
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = fetch.get(url)
             soup = BeautifulSoup(response.text, 'lxml')
             
             # Extract coordinates from the page
@@ -105,7 +100,7 @@ class AdvancedGeoLocator:
         """Search location using GeoNames"""
         try:
             url = f"http://api.geonames.org/searchJSON?q={query}&maxRows=1&username=demo"
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = fetch.get(url)
             data = response.json()
             
             if data.get('geonames'):
@@ -166,7 +161,7 @@ def run(data):
     results = []
     
     # Run all searches in parallel
-    with ThreadPoolExecutor(max_workers=4) as executor:
+    with cancel.Executor(max_workers=4) as executor:
         futures = []
         
         if image_path:
@@ -189,7 +184,11 @@ def run(data):
         "sources_checked": len(results),
         "results": results,
         "valid_locations": len([r for r in results if 'latitude' in r and 'longitude' in r]),
-        "map_path": map_path
+        "map_path": map_path,
+        "records": [
+            Location(r['source'], r.get('address', ''), r['latitude'], r['longitude'])
+            for r in results if 'latitude' in r and 'longitude' in r
+        ]
     }
 
     return combined_results 
\ No newline at end of file
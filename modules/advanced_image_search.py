@@ -1,8 +1,8 @@
-import requests
+from modules import fetch, cancel
+from modules.results import hits_from
 from bs4 import BeautifulSoup
 import base64
 import json
-from concurrent.futures import ThreadPoolExecutor
 import os
 import subprocess
 from PIL import Image
@@ -29,13 +29,8 @@ class AdvancedImageSearch:
                 'encoded_image': (image_path, open(image_path, 'rb')),
                 'image_content': ''
             }
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-            }
             
-            response = requests.post(url, files=files, headers=headers)
+            response = fetch.post(url, files=files)
             soup = BeautifulSoup(response.text, 'lxml')
             
             results = []
@@ -59,13 +54,8 @@ class AdvancedImageSearch:
             files = {
                 'image': (image_path, open(image_path, 'rb')),
             }
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-            }
             
-            response = requests.post(url, files=files, headers=headers)
+            response = fetch.post(url, files=files)
             soup = BeautifulSoup(response.text, 'lxml')
             
             results = []
@@ -89,13 +79,8 @@ class AdvancedImageSearch:
             files = {
                 'image': (image_path, open(image_path, 'rb')),
             }
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-            }
             
-            response = requests.post(url, files=files, headers=headers)
+            response = fetch.post(url, files=files)
             soup = BeautifulSoup(response.text, 'lxml')
             
             results = []
@@ -119,13 +104,8 @@ class AdvancedImageSearch:
             files = {
                 'upfile': (image_path, open(image_path, 'rb')),
             }
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-            }
             
-            response = requests.post(url, files=files, headers=headers)
+            response = fetch.post(url, files=files)
             soup = BeautifulSoup(response.text, 'lxml')
             
             results = []
@@ -167,7 +147,7 @@ def run(data):
     searcher = AdvancedImageSearch()
     
     # Run all searches in parallel
-    with ThreadPoolExecutor(max_workers=5) as executor:
+    with cancel.Executor(max_workers=5) as executor:
         google_future = executor.submit(searcher.search_google_images, image_path)
         tineye_future = executor.submit(searcher.search_tineye, image_path)
         bing_future = executor.submit(searcher.search_bing_images, image_path)
@@ -188,7 +168,8 @@ def run(data):
         "sources_checked": len(results),
         "results": results,
         "total_matches": sum(len(r.get("results", [])) for r in results if "results" in r),
-        "metadata": results[4].get("metadata", {}) if "metadata" in results[4] else {}
+        "metadata": results[4].get("metadata", {}) if "metadata" in results[4] else {},
+        "records": [hit for r in results for hit in hits_from(r.get("results", []))]
     }
 
     return combined_results 
\ No newline at end of file
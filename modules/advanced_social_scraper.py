@@ -1,197 +1,231 @@
 import asyncio
-import aiohttp
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import soupsieve
 from bs4 import BeautifulSoup
-import json
-import re
-from datetime import datetime
 
-class AdvancedSocialScraper:
-    def __init__(self):
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Cache-Control': 'max-age=0'
+from modules import fetch, utils, telemetry
+from modules.results import Profile, Post
+
+# Profile pages are parsed in a worker pool so a large page never blocks the event loop
+
+PARSE_WORKERS = 4
+# Process workers parse in parallel for bulk runs; threads are cheaper for a single search
+PARSE_IN_PROCESSES = os.environ.get('PERSONAX_PARSE_PROCESSES', '') not in ('', '0')
+MAX_POSTS = 5
+BODY_LIMIT = fetch.body_limit('social_scraper')
+
+# Per-platform selectors: profile fields, the post container, and fields inside each post.
+# A field selector of None takes the text of the post container itself.
+SELECTORS = {
+    'twitter': {
+        'profile': {
+            'name': 'span[data-testid="UserName"]',
+            'description': 'div[data-testid="UserDescription"]',
+            'location': 'span[data-testid="UserLocation"]',
+            'followers': 'a[href$="/followers"]',
+            'following': 'a[href$="/following"]'
+        },
+        'posts': 'article[data-testid="tweet"]',
+        'post': {
+            'text': 'div[data-testid="tweetText"]',
+            'date': 'time',
+            'likes': 'div[data-testid="like"]'
+        }
+    },
+    'instagram': {
+        'profile': {
+            'name': 'h2',
+            'description': 'h1',
+            'followers': 'span[title*="followers"]',
+            'following': 'span[title*="following"]'
+        },
+        'posts': 'article',
+        'post': {
+            'text': 'img[alt]',
+            'date': 'time',
+            'likes': 'span[title*="likes"]'
+        }
+    },
+    'reddit': {
+        'profile': {
+            'description': 'div[data-test-id="user-profile-about"]',
+            'karma': 'span[data-test-id="user-karma"]'
+        },
+        'posts': 'div[data-test-id="post"]',
+        'post': {
+            'text': 'h3',
+            'date': 'time',
+            'likes': 'span[data-test-id="post-score"]'
+        }
+    },
+    'facebook': {
+        'profile': {
+            'name': 'h1',
+            'description': 'div[data-testid="bio"]',
+            'location': 'div[data-testid="current_city"]'
+        },
+        'posts': 'div[data-testid="post_message"]',
+        'post': {
+            'text': None,
+            'date': 'abbr',
+            'likes': 'span[data-testid="UFI2ReactionsCount"]'
         }
+    },
+    'linkedin': {
+        'profile': {
+            'name': 'h1',
+            'description': 'div[data-test-id="about"]',
+            'location': 'span[data-test-id="location"]',
+            'title': 'div[data-test-id="headline"]'
+        },
+        'posts': 'div[data-test-id="feed-post"]',
+        'post': {
+            'text': 'div[data-test-id="feed-post-content"]',
+            'date': 'time',
+            'likes': 'span[data-test-id="social-actions"]'
+        }
+    }
+}
 
-    async def scrape_twitter(self, session, username):
+
+def _compile(selector):
+    return soupsieve.compile(selector) if selector else None
+
+
+# Compiled once per platform at import (and once per worker process)
+COMPILED = {
+    platform: {
+        'profile': {field: _compile(s) for field, s in spec['profile'].items()},
+        'posts': _compile(spec['posts']),
+        'post': {field: _compile(s) for field, s in spec['post'].items()}
+    }
+    for platform, spec in SELECTORS.items()
+}
+
+
+def platform_records(platform, username, result):
+    """Profile and Post records for one platform's scrape result"""
+    profile = result.get('profile')
+    if not profile:
+        return []
+    url = result.get('url', '')
+    records = [Profile(
+        platform, url=url, username=username,
+        name=profile.get('name', ''),
+        description=profile.get('description', ''),
+        location=profile.get('location', ''),
+        followers=profile.get('followers', ''),
+        following=profile.get('following', '')
+    )]
+    records.extend(
+        Post(platform, post.get('text', ''), post.get('date', ''), post.get('likes', ''), url)
+        for post in result.get('posts', [])
+    )
+    return records
+
+
+def _text(element, selector):
+    try:
+        found = selector.select_one(element) if selector is not None else element
+        return found.get_text(strip=True) if found else ''
+    except Exception:
+        return ''
+
+
+def parse_page(platform, html):
+    """Extract the profile and recent posts from a platform page; runs in the parse pool"""
+    selectors = COMPILED[platform]
+    soup = BeautifulSoup(html, 'html.parser')
+    profile = {field: _text(soup, selector) for field, selector in selectors['profile'].items()}
+    posts = [
+        {field: _text(post, selector) for field, selector in selectors['post'].items()}
+        for post in selectors['posts'].select(soup, limit=MAX_POSTS)
+    ]
+    return {
+        'profile': profile,
+        'posts': posts
+    }
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_parse_executor():
+    """Shared bounded parse pool, created on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            if PARSE_IN_PROCESSES:
+                # spawn avoids forking a process that already runs network threads
+                _executor = ProcessPoolExecutor(
+                    max_workers=PARSE_WORKERS, mp_context=multiprocessing.get_context('spawn')
+                )
+            else:
+                _executor = ThreadPoolExecutor(max_workers=PARSE_WORKERS, thread_name_prefix='html-parse')
+        return _executor
+
+
+def use_process_pool(enabled=True):
+    """Switch the shared parse pool between worker threads and worker processes"""
+    global _executor, PARSE_IN_PROCESSES
+    with _executor_lock:
+        if PARSE_IN_PROCESSES == enabled:
+            return
+        PARSE_IN_PROCESSES = enabled
+        previous, _executor = _executor, None
+    if previous is not None:
+        previous.shutdown(wait=False)
+
+
+class AdvancedSocialScraper:
+    def __init__(self, executor=None):
+        self.executor = executor
+
+    async def parse(self, platform, html):
+        loop = asyncio.get_running_loop()
+        with telemetry.span("parse", bytes=len(html)):
+            return await loop.run_in_executor(self.executor or get_parse_executor(), parse_page, platform, html)
+
+    async def _scrape(self, session, platform, url):
         try:
-            url = f'https://twitter.com/{username}'
-            async with session.get(url, headers=self.headers, allow_redirects=True) as response:
+            async with session.get(url, allow_redirects=True) as response:
                 if response.status == 404:
                     return {'error': 'User not found'}
-                html = await response.text()
-                soup = BeautifulSoup(html, 'html.parser')
-                
-                # Extract profile info
-                profile = {
-                    'name': self._get_text(soup, 'span[data-testid="UserName"]'),
-                    'description': self._get_text(soup, 'div[data-testid="UserDescription"]'),
-                    'location': self._get_text(soup, 'span[data-testid="UserLocation"]'),
-                    'followers': self._get_text(soup, 'a[href$="/followers"]'),
-                    'following': self._get_text(soup, 'a[href$="/following"]')
-                }
-                
-                # Extract recent tweets
-                posts = []
-                tweet_elements = soup.find_all('article', {'data-testid': 'tweet'})
-                for tweet in tweet_elements[:5]:  # Get first 5 tweets
-                    posts.append({
-                        'text': self._get_text(tweet, 'div[data-testid="tweetText"]'),
-                        'date': self._get_text(tweet, 'time'),
-                        'likes': self._get_text(tweet, 'div[data-testid="like"]')
-                    })
-                
-                return {
-                    'profile': profile,
-                    'posts': posts
-                }
+                # Rate limits and login walls are failures, not empty profiles
+                if response.status >= 400:
+                    return {'error': f'HTTP {response.status}'}
+                # Profile pages are read up to the size cap and parsed from what arrived
+                html, truncated = await fetch.read_text_async(response, BODY_LIMIT)
+            result = await self.parse(platform, html)
+            result['url'] = url
+            result['truncated'] = truncated
+            return result
         except Exception as e:
             return {'error': str(e)}
 
+    async def scrape_twitter(self, session, username):
+        return await self._scrape(session, 'twitter', f'https://twitter.com/{username}')
+
     async def scrape_instagram(self, session, username):
-        try:
-            url = f'https://www.instagram.com/{username}/'
-            async with session.get(url, headers=self.headers, allow_redirects=True) as response:
-                if response.status == 404:
-                    return {'error': 'User not found'}
-                html = await response.text()
-                soup = BeautifulSoup(html, 'html.parser')
-                
-                # Extract profile info
-                profile = {
-                    'name': self._get_text(soup, 'h2'),
-                    'description': self._get_text(soup, 'h1'),
-                    'followers': self._get_text(soup, 'span[title*="followers"]'),
-                    'following': self._get_text(soup, 'span[title*="following"]')
-                }
-                
-                # Extract recent posts
-                posts = []
-                post_elements = soup.find_all('article')
-                for post in post_elements[:5]:  # Get first 5 posts
-                    posts.append({
-                        'text': self._get_text(post, 'img[alt]'),
-                        'date': self._get_text(post, 'time'),
-                        'likes': self._get_text(post, 'span[title*="likes"]')
-                    })
-                
-                return {
-                    'profile': profile,
-                    'posts': posts
-                }
-        except Exception as e:
-            return {'error': str(e)}
+        return await self._scrape(session, 'instagram', f'https://www.instagram.com/{username}/')
 
     async def scrape_reddit(self, session, username):
-        try:
-            url = f'https://www.reddit.com/user/{username}/'
-            async with session.get(url, headers=self.headers, allow_redirects=True) as response:
-                if response.status == 404:
-                    return {'error': 'User not found'}
-                html = await response.text()
-                soup = BeautifulSoup(html, 'html.parser')
-                
-                # Extract profile info
-                profile = {
-                    'name': username,
-                    'description': self._get_text(soup, 'div[data-test-id="user-profile-about"]'),
-                    'karma': self._get_text(soup, 'span[data-test-id="user-karma"]')
-                }
-                
-                # Extract recent posts
-                posts = []
-                post_elements = soup.find_all('div[data-test-id="post"]')
-                for post in post_elements[:5]:  # Get first 5 posts
-                    posts.append({
-                        'text': self._get_text(post, 'h3'),
-                        'date': self._get_text(post, 'time'),
-                        'likes': self._get_text(post, 'span[data-test-id="post-score"]')
-                    })
-                
-                return {
-                    'profile': profile,
-                    'posts': posts
-                }
-        except Exception as e:
-            return {'error': str(e)}
+        result = await self._scrape(session, 'reddit', f'https://www.reddit.com/user/{username}/')
+        if 'profile' in result:
+            result['profile'] = {'name': username, **result['profile']}
+        return result
 
     async def scrape_facebook(self, session, username):
-        try:
-            url = f'https://www.facebook.com/{username}'
-            async with session.get(url, headers=self.headers, allow_redirects=True) as response:
-                if response.status == 404:
-                    return {'error': 'User not found'}
-                html = await response.text()
-                soup = BeautifulSoup(html, 'html.parser')
-                
-                # Extract profile info
-                profile = {
-                    'name': self._get_text(soup, 'h1'),
-                    'description': self._get_text(soup, 'div[data-testid="bio"]'),
-                    'location': self._get_text(soup, 'div[data-testid="current_city"]')
-                }
-                
-                # Extract recent posts
-                posts = []
-                post_elements = soup.find_all('div[data-testid="post_message"]')
-                for post in post_elements[:5]:  # Get first 5 posts
-                    posts.append({
-                        'text': self._get_text(post, 'div[data-testid="post_message"]'),
-                        'date': self._get_text(post, 'abbr'),
-                        'likes': self._get_text(post, 'span[data-testid="UFI2ReactionsCount"]')
-                    })
-                
-                return {
-                    'profile': profile,
-                    'posts': posts
-                }
-        except Exception as e:
-            return {'error': str(e)}
+        return await self._scrape(session, 'facebook', f'https://www.facebook.com/{username}')
 
     async def scrape_linkedin(self, session, username):
-        try:
-            url = f'https://www.linkedin.com/in/{username}'
-            async with session.get(url, headers=self.headers, allow_redirects=True) as response:
-                if response.status == 404:
-                    return {'error': 'User not found'}
-                html = await response.text()
-                soup = BeautifulSoup(html, 'html.parser')
-                
-                # Extract profile info
-                profile = {
-                    'name': self._get_text(soup, 'h1'),
-                    'description': self._get_text(soup, 'div[data-test-id="about"]'),
-                    'location': self._get_text(soup, 'span[data-test-id="location"]'),
-                    'title': self._get_text(soup, 'div[data-test-id="headline"]')
-                }
-                
-                # Extract recent posts
-                posts = []
-                post_elements = soup.find_all('div[data-test-id="feed-post"]')
-                for post in post_elements[:5]:  # Get first 5 posts
-                    posts.append({
-                        'text': self._get_text(post, 'div[data-test-id="feed-post-content"]'),
-                        'date': self._get_text(post, 'time'),
-                        'likes': self._get_text(post, 'span[data-test-id="social-actions"]')
-                    })
-                
-                return {
-                    'profile': profile,
-                    'posts': posts
-                }
-        except Exception as e:
-            return {'error': str(e)}
+        return await self._scrape(session, 'linkedin', f'https://www.linkedin.com/in/{username}')
 
-    def _get_text(self, element, selector):
-        try:
-            found = element.select_one(selector)
-            return found.get_text(strip=True) if found else ''
-        except:
-            return ''
 
 async def run(data):
     username = data.get("username")
@@ -199,28 +233,32 @@ async def run(data):
         return "No username provided."
 
     scraper = AdvancedSocialScraper()
-    
-    # Run all scrapers in parallel
-    tasks = [
-        scraper.scrape_twitter(username),
-        scraper.scrape_instagram(username),
-        scraper.scrape_reddit(username),
-        scraper.scrape_facebook(username),
-        scraper.scrape_linkedin(username)
-    ]
-    
-    results = await asyncio.gather(*tasks)
+
+    async with utils.LoopLagMonitor() as lag:
+        async with fetch.create_async_session(timeout=30) as session:
+            # Run all scrapers in parallel
+            tasks = [
+                scraper.scrape_twitter(session, username),
+                scraper.scrape_instagram(session, username),
+                scraper.scrape_reddit(session, username),
+                scraper.scrape_facebook(session, username),
+                scraper.scrape_linkedin(session, username)
+            ]
+
+            results = await asyncio.gather(*tasks)
 
     # Combine results
+    platforms = ['Twitter', 'Instagram', 'Reddit', 'Facebook', 'LinkedIn']
     combined_results = {
         "username": username,
         "sources_checked": len(results),
         "results": results,
-        "total_posts": sum(
-            len(r.get("results", {}).get("posts", [])) 
-            for r in results 
-            if "results" in r and "posts" in r["results"]
-        )
+        "total_posts": sum(len(r.get("posts", [])) for r in results),
+        "loop_lag": lag.stats(),
+        "records": [
+            record for platform, result in zip(platforms, results)
+            for record in platform_records(platform, username, result)
+        ]
     }
 
-    return combined_results 
\ No newline at end of file
+    return combined_results
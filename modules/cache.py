@@ -0,0 +1,266 @@
+import functools
+import inspect
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from modules import telemetry
+
+# Persistent result cache keyed by (module, source, normalized query)
+
+CACHE_DIR = os.environ.get("PERSONAX_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".personax"))
+CACHE_FILE = os.path.join(CACHE_DIR, "cache.sqlite3")
+
+# Seconds a positive result stays fresh, per module; (module, source) entries take precedence
+SOURCE_TTLS = {
+    "username_hunter": 24 * 3600,
+    "email_breach": 12 * 3600,
+    "phone_search": 7 * 24 * 3600,
+    "darkweb_scanner": 6 * 3600,
+    "social_scraper": 6 * 3600,
+    "dns_cache": 24 * 3600,
+    "site_databases": 7 * 24 * 3600,
+}
+DEFAULT_TTL = 12 * 3600
+# "Not found" and failed lookups expire sooner so they are retried
+NEGATIVE_TTL = 3600
+ERROR_TTL = 300
+
+MAX_ENTRIES = 50000
+# Expired and least recently used rows are pruned every this many writes
+PRUNE_EVERY = 500
+
+OK = "ok"
+NEGATIVE = "negative"
+ERROR = "error"
+
+_PAYLOAD_KEYS = ("links", "results", "breaches", "found_profiles", "platforms", "posts")
+_COUNT_KEYS = ("found_count", "total_links", "total_matches", "total_breaches")
+# Per-source entries of a module result, and the keys a failed source reports itself with
+_SOURCE_KEYS = ("results", "platforms")
+_FAILURE_KEYS = ("error", "failed", "timed_out")
+
+_bypass = os.environ.get("PERSONAX_NO_CACHE", "").lower() in ("1", "true", "yes")
+
+
+def set_bypass(flag):
+    """Skip the cache for reads and writes until switched back"""
+    global _bypass
+    _bypass = bool(flag)
+
+
+def is_bypassed():
+    return _bypass
+
+
+def normalize_query(query):
+    if isinstance(query, (list, tuple)):
+        return "\x1f".join(normalize_query(q) for q in query)
+    return " ".join(str(query).split()).lower()
+
+
+def ttl_for(module, source, status):
+    if status == ERROR:
+        return ERROR_TTL
+    if status == NEGATIVE:
+        return NEGATIVE_TTL
+    return SOURCE_TTLS.get((module, source), SOURCE_TTLS.get(module, DEFAULT_TTL))
+
+
+def failed_sources(value):
+    """Per-source entries of a module result that failed, in part or in full"""
+    return [
+        entry for key in _SOURCE_KEYS if isinstance(value.get(key), list)
+        for entry in value[key] if isinstance(entry, dict) and any(entry.get(k) for k in _FAILURE_KEYS)
+    ]
+
+
+def classify(value):
+    """Sort a module result into OK, NEGATIVE or ERROR for TTL purposes"""
+    if value is None:
+        return ERROR
+    if isinstance(value, str):
+        return ERROR if value.startswith("Error") else NEGATIVE
+    if isinstance(value, dict):
+        # Results missing sources that failed expire as soon as errors do
+        if "error" in value or value.get("unchecked") or failed_sources(value):
+            return ERROR
+        counts = [value[key] for key in _COUNT_KEYS if key in value]
+        if counts:
+            return OK if any(counts) else NEGATIVE
+        payloads = [value[key] for key in _PAYLOAD_KEYS if key in value]
+        if payloads and not any(payloads):
+            return NEGATIVE
+        return OK
+    return OK if value else NEGATIVE
+
+
+class ResultCache:
+    """SQLite-backed TTL cache with size-bounded LRU eviction"""
+
+    def __init__(self, path=CACHE_FILE, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "module TEXT, source TEXT, query TEXT, status TEXT, value BLOB, "
+            "expires_at REAL, accessed_at REAL, PRIMARY KEY (module, source, query))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed_at)")
+
+    def get(self, module, source, query):
+        """Return (hit, value) for a fresh entry"""
+        key = (module, source, normalize_query(query))
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM results WHERE module=? AND source=? AND query=?", key
+            ).fetchone()
+            if row is None:
+                return False, None
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM results WHERE module=? AND source=? AND query=?", key)
+                return False, None
+            self._conn.execute(
+                "UPDATE results SET accessed_at=? WHERE module=? AND source=? AND query=?", (now,) + key
+            )
+        try:
+            return True, pickle.loads(row[0])
+        except Exception:
+            return False, None
+
+    def put(self, module, source, query, value, status=None):
+        status = status or classify(value)
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (module, source, normalize_query(query), status, blob, now + ttl_for(module, source, status), now),
+            )
+            self._writes += 1
+            if self._writes % PRUNE_EVERY == 0:
+                self._prune(now)
+
+    def _prune(self, now):
+        self._conn.execute("DELETE FROM results WHERE expires_at <= ?", (now,))
+        excess = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0] - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM results WHERE rowid IN (SELECT rowid FROM results ORDER BY accessed_at LIMIT ?)",
+                (excess,),
+            )
+
+    def clear(self, module=None):
+        with self._lock:
+            if module:
+                self._conn.execute("DELETE FROM results WHERE module=?", (module,))
+            else:
+                self._conn.execute("DELETE FROM results")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache()
+    return _cache
+
+
+@contextmanager
+def _lookup_span(source):
+    """Time one cached lookup; spans inside it are attributed to source (a whole run keeps its step's name)"""
+    if source == "run":
+        with telemetry.span("lookup") as span:
+            yield span
+        return
+    with telemetry.attributed(source), telemetry.span("lookup") as span:
+        yield span
+
+
+def cached(module, source, query, compute, classify_result=classify):
+    """Return the cached result for (module, source, query), computing and storing it on a miss"""
+    with _lookup_span(source) as span:
+        if _bypass or not query:
+            value = compute()
+            span.error = telemetry.outcome(value)
+            return value
+        hit, value = get_cache().get(module, source, query)
+        span.cache_hit = hit
+        if not hit:
+            value = compute()
+            get_cache().put(module, source, query, value, classify_result(value))
+        span.error = telemetry.outcome(value)
+        return value
+
+
+async def cached_async(module, source, query, compute, classify_result=classify):
+    """Coroutine version of cached(); compute returns an awaitable"""
+    with _lookup_span(source) as span:
+        if _bypass or not query:
+            value = await compute()
+            span.error = telemetry.outcome(value)
+            return value
+        hit, value = get_cache().get(module, source, query)
+        span.cache_hit = hit
+        if not hit:
+            value = await compute()
+            get_cache().put(module, source, query, value, classify_result(value))
+        span.error = telemetry.outcome(value)
+        return value
+
+
+def lookup(module, source, query):
+    """Return (hit, value) without computing anything on a miss"""
+    if _bypass or not query:
+        return False, None
+    with _lookup_span(source) as span:
+        span.cache_hit, value = get_cache().get(module, source, query)
+        return span.cache_hit, value
+
+
+def store(module, source, query, value, classify_result=classify):
+    if _bypass or not query:
+        return
+    get_cache().put(module, source, query, value, classify_result(value))
+
+
+def _run_query(data, key):
+    if isinstance(key, tuple):
+        values = tuple(data.get(k) or "" for k in key)
+        return values if any(values) else None
+    return data.get(key)
+
+
+def cached_run(module, key):
+    """Cache a module's run(data) on data[key] (or on several keys given as a tuple)"""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(data):
+                return await cached_async(module, "run", _run_query(data, key), lambda: func(data))
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(data):
+            return cached(module, "run", _run_query(data, key), lambda: func(data))
+        return wrapper
+    return decorator
@@ -0,0 +1,177 @@
+import asyncio
+import contextvars
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+# Cooperative cancellation. An investigation carries a CancelToken in
+# data["cancel"]; the scheduler makes it the current token of each module's
+# context, and Executor, fetch and cancellable() pick it up from there.
+
+
+class Cancelled(Exception):
+    def __init__(self, message="Cancelled"):
+        super().__init__(message)
+
+
+class CancelToken:
+    """Set once to ask every part of an investigation to stop"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = {}
+        self._next_id = 0
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = list(self._callbacks.values()), {}
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise Cancelled()
+
+    def wait(self, timeout=None):
+        """Sleep up to timeout seconds; returns True if cancelled meanwhile"""
+        return self._event.wait(timeout)
+
+    def on_cancel(self, callback):
+        """Call callback when cancelled (at once if already); returns a function that unregisters it"""
+        with self._lock:
+            if not self._event.is_set():
+                callback_id = self._next_id
+                self._next_id += 1
+                self._callbacks[callback_id] = callback
+                return lambda: self._callbacks.pop(callback_id, None)
+        callback()
+        return lambda: None
+
+
+_current = contextvars.ContextVar("cancel_token", default=None)
+
+
+def current():
+    """The token of the investigation running in this context, if any"""
+    return _current.get()
+
+
+@contextmanager
+def using(token):
+    """Make token the current token for the duration of the block"""
+    reset = _current.set(token)
+    try:
+        yield token
+    finally:
+        _current.reset(reset)
+
+
+def check():
+    token = current()
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+def sleep(seconds):
+    """time.sleep() that wakes up and raises Cancelled when the current token is cancelled"""
+    token = current()
+    if token is None:
+        time.sleep(seconds)
+    elif token.wait(seconds):
+        raise Cancelled()
+
+
+@contextmanager
+def closing_on_cancel(resource):
+    """Close resource (a response, a socket) from the cancelling thread if cancelled meanwhile"""
+    token = current()
+    if token is None:
+        yield resource
+        return
+    unregister = token.on_cancel(resource.close)
+    try:
+        yield resource
+    finally:
+        unregister()
+
+
+def _call_checked(token, fn, args, kwargs):
+    token.raise_if_cancelled()
+    return fn(*args, **kwargs)
+
+
+class Executor(ThreadPoolExecutor):
+    """ThreadPoolExecutor that runs work in a copy of the submitting context.
+
+    Context variables such as the cancel token and the telemetry recorder
+    follow the work into the pool. Cancelling the token drops queued work,
+    and leaving the with-block does not wait for calls that are still running.
+    """
+
+    def __init__(self, max_workers=None, token=None, **kwargs):
+        super().__init__(max_workers=max_workers, **kwargs)
+        self.token = token or current()
+        self._futures = weakref.WeakSet()
+        self._futures_lock = threading.Lock()
+        self._unregister = self.token.on_cancel(self._cancel) if self.token else None
+
+    def submit(self, fn, *args, **kwargs):
+        context = contextvars.copy_context()
+        if self.token is None:
+            return super().submit(context.run, fn, *args, **kwargs)
+        self.token.raise_if_cancelled()
+        future = super().submit(context.run, _call_checked, self.token, fn, args, kwargs)
+        with self._futures_lock:
+            self._futures.add(future)
+        return future
+
+    def _cancel(self):
+        super().shutdown(wait=False, cancel_futures=True)
+        # Queued futures are only marked cancelled; wake wait() and as_completed() callers blocked on them
+        with self._futures_lock:
+            futures = list(self._futures)
+        for future in futures:
+            if future.cancelled():
+                try:
+                    future.set_running_or_notify_cancel()
+                except RuntimeError:
+                    pass  # already notified
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        if self._unregister:
+            self._unregister()
+        if self.token is not None and self.token.cancelled:
+            wait, cancel_futures = False, True
+        super().shutdown(wait=wait, cancel_futures=cancel_futures)
+
+
+async def cancellable(awaitable, token=None):
+    """Await awaitable, cancelling it as an asyncio task when the token is cancelled"""
+    token = token or current()
+    if token is None:
+        return await awaitable
+    token.raise_if_cancelled()
+    loop = asyncio.get_running_loop()
+    task = asyncio.ensure_future(awaitable)
+    unregister = token.on_cancel(lambda: loop.call_soon_threadsafe(task.cancel))
+    try:
+        return await task
+    except asyncio.CancelledError:
+        if token.cancelled:
+            raise Cancelled() from None
+        raise
+    finally:
+        unregister()
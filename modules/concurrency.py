@@ -0,0 +1,206 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import requests
+
+from modules import cancel, retry
+
+# Adaptive limits on requests in flight, globally and per host (AIMD).
+# Every success raises a limit by about one per round trip. Any failure
+# halves that host's limit; the global limit is halved only by a timeout or by
+# connection failures from several hosts at once, since one dead or refusing
+# host says nothing about the network. A host answering much slower than its
+# own baseline backs off more gently. Worker pools are sized to the ceiling and the limits decide how
+# many of their requests are really in flight.
+
+# Ceiling on requests in flight across all hosts
+MAX_IN_FLIGHT = int(os.environ.get("PERSONAX_MAX_IN_FLIGHT", "64"))
+# Limits the global and per-host controllers start from
+INITIAL_IN_FLIGHT = 16
+INITIAL_PER_HOST = 2
+MIN_IN_FLIGHT = 1
+# A response this many times slower than the host's baseline counts as congestion
+LATENCY_TOLERANCE = 3.0
+# Multiplicative decrease after a failure and after an inflated response time
+FAILURE_BACKOFF = 0.5
+LATENCY_BACKOFF = 0.8
+# The baseline creeps up by this fraction per response so it follows a slower network
+BASELINE_DRIFT = 0.02
+# Statuses a host sends when it is shedding load
+OVERLOAD_STATUSES = (429, 502, 503, 504)
+# Connection failures count against the global limit once this many hosts failed within the window
+NETWORK_FAILURE_HOSTS = 3
+NETWORK_FAILURE_WINDOW = 5.0
+# Seconds between cancellation checks while waiting for a slot
+WAIT_POLL = 0.1
+
+
+class AIMDLimit:
+    """A limit on concurrent requests that grows additively and shrinks multiplicatively"""
+
+    def __init__(self, initial, maximum, minimum=MIN_IN_FLIGHT, latency_signal=True):
+        self.maximum = maximum
+        self.minimum = minimum
+        self.limit = float(min(initial, maximum))
+        self.latency_signal = latency_signal
+        self.in_flight = 0
+        self.baseline = None
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    @property
+    def allowed(self):
+        return max(self.minimum, int(self.limit))
+
+    def try_acquire(self):
+        with self._cond:
+            if self.in_flight < self.allowed:
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= self.allowed:
+                cancel.check()
+                self._cond.wait(WAIT_POLL)
+            self.in_flight += 1
+
+    def release(self, latency=None, failed=False):
+        """Free a slot and adjust the limit from how the request went; latency None means no signal"""
+        with self._cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if failed:
+                self._decrease(FAILURE_BACKOFF, now, latency)
+            elif latency is not None:
+                if self.latency_signal and self.baseline and latency > self.baseline * LATENCY_TOLERANCE:
+                    self._decrease(LATENCY_BACKOFF, now, latency)
+                else:
+                    self.limit = min(self.maximum, self.limit + 1 / max(self.limit, 1))
+                if self.latency_signal:
+                    self.baseline = latency if self.baseline is None else min(latency, self.baseline * (1 + BASELINE_DRIFT))
+            self._cond.notify_all()
+
+    def _decrease(self, factor, now, latency):
+        # At most once per round trip, so a burst of failures counts as one signal
+        if now - self._last_decrease < (latency or self.baseline or 0):
+            return
+        self.limit = max(self.minimum, self.limit * factor)
+        self._last_decrease = now
+
+    def stats(self):
+        with self._cond:
+            return {"limit": round(self.limit, 1), "in_flight": self.in_flight,
+                    "baseline_ms": None if self.baseline is None else round(self.baseline * 1000, 1)}
+
+
+class Permit:
+    """A held slot; the request reports its outcome through it"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.status = None
+
+    def failure(self, error):
+        """How the request failed: "timeout", "network" (in transit), "unresolved" (no such host),
+        "overload" (the host shed it), or None"""
+        if error is not None:
+            if isinstance(error, (requests.Timeout, TimeoutError, asyncio.TimeoutError)):
+                return "timeout"
+            if retry.name_not_resolved(error):
+                return "unresolved"
+            # Only network trouble says anything about load; cancellations and bugs do not
+            if isinstance(error, OSError) or type(error).__module__.startswith(("requests", "aiohttp", "urllib3")):
+                return "network"
+            return None
+        return "overload" if self.status in OVERLOAD_STATUSES else None
+
+
+class Controller:
+    """The global limit plus one limit per host"""
+
+    def __init__(self, maximum=MAX_IN_FLIGHT, per_host=6):
+        self.per_host = per_host
+        self.total = AIMDLimit(INITIAL_IN_FLIGHT, maximum, latency_signal=False)
+        self._hosts = {}
+        self._network_failures = deque()  # (time, host) of recent connection failures
+        self._lock = threading.Lock()
+
+    def host(self, host):
+        with self._lock:
+            limit = self._hosts.get(host)
+            if limit is None:
+                limit = self._hosts[host] = AIMDLimit(INITIAL_PER_HOST, self.per_host)
+            return limit
+
+    def _release(self, host, host_limit, permit, error):
+        if isinstance(error, cancel.Cancelled):
+            host_limit.release()
+            self.total.release()
+            return
+        latency, failure = time.monotonic() - permit.started, permit.failure(error)
+        host_limit.release(latency, failure is not None)
+        # One busy, dead or refusing host says nothing about the network as a whole
+        congested = failure == "timeout" or (failure == "network" and self._widespread(host))
+        self.total.release(latency, congested)
+
+    def _widespread(self, host):
+        """Record a connection failure; True once several hosts failed within the window"""
+        with self._lock:
+            now = time.monotonic()
+            failures = self._network_failures
+            failures.append((now, host))
+            while failures[0][0] <= now - NETWORK_FAILURE_WINDOW:
+                failures.popleft()
+            return len({failed for _, failed in failures}) >= NETWORK_FAILURE_HOSTS
+
+    @contextmanager
+    def slot(self, host):
+        """Hold a request slot for host; set permit.status before leaving"""
+        # The host slot comes first so requests queued behind one host hold no global slot
+        host_limit = self.host(host)
+        host_limit.acquire()
+        try:
+            self.total.acquire()
+        except BaseException:
+            host_limit.release()
+            raise
+        permit, error = Permit(), None
+        try:
+            yield permit
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._release(host, host_limit, permit, error)
+
+    async def acquire_async(self, host):
+        """Coroutine version of entering slot(); pair it with release_async()"""
+        host_limit = self.host(host)
+        while not host_limit.try_acquire():
+            await asyncio.sleep(WAIT_POLL / 10)
+        try:
+            while not self.total.try_acquire():
+                await asyncio.sleep(WAIT_POLL / 10)
+        except BaseException:
+            host_limit.release()
+            raise
+        return Permit()
+
+    def release_async(self, host, permit, error=None):
+        self._release(host, self.host(host), permit, error)
+
+    def stats(self):
+        with self._lock:
+            hosts = dict(self._hosts)
+        return {"total": self.total.stats(), "hosts": {host: limit.stats() for host, limit in sorted(hosts.items())}}
+
+
+def workers(tasks):
+    """Threads for a pool of tasks that each make requests: up to the global ceiling"""
+    return max(1, min(tasks, MAX_IN_FLIGHT))
@@ -1,24 +1,35 @@
-import requests
-import socks
-import socket
+from modules import fetch, cache, progress
+from modules.results import Hit
 
+@cache.cached_run("darkweb_scanner", ("email", "username"))
 def run(data):
     email = data.get("email")
     username = data.get("username")
     if not (email or username):
         return "No email or username provided."
-    # Set up Tor proxy
-    socks.set_default_proxy(socks.SOCKS5, "127.0.0.1", 9050)
-    socket.socket = socks.socksocket
     onion_sites = [
         "http://msydqstlz2kzerdg.onion"  # Example: Ahmia
     ]
-    found = []
+    report = progress.reporter_for(data)
+    report.expect(len(onion_sites))
+    found, results = [], []
     for site in onion_sites:
         try:
-            r = requests.get(site, timeout=10)
-            if r.status_code == 200 and ((email and email in r.text) or (username and username in r.text)):
+            # Stop reading as soon as either identifier appears, or at the size cap
+            r, text, _ = fetch.get_text(site, limit=fetch.body_limit("darkweb_scanner"), markers=(email, username))
+            if r.status_code == 200 and ((email and email in text) or (username and username in text)):
                 found.append(site)
+                report.hit(Hit("Dark Web", site, query=email or username))
+            results.append({"source": site, "found": site in found})
         except Exception as e:
-            continue
-    return found or "No dark web results found." 
\ No newline at end of file
+            # An unreachable site is not a "not found"; the error keeps the result short-lived
+            results.append({"source": site, "error": str(e)})
+        report.advance()
+    if not found and not any("error" in result for result in results):
+        return "No dark web results found."
+    return {
+        "results": results,
+        "links": found,
+        "total_links": len(found),
+        "records": [Hit("Dark Web", site, query=email or username) for site in found]
+    } 
\ No newline at end of file
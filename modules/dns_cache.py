@@ -0,0 +1,208 @@
+import asyncio
+import ipaddress
+import socket
+import threading
+import time
+import uuid
+
+from modules import cache, replay
+
+# Process-wide DNS cache with negative caching of names that do not exist.
+# fetch's connections (requests and aiohttp alike) resolve hosts through it,
+# so a host is looked up once per TTL and a missing one fails without a lookup.
+
+POSITIVE_TTL = 300
+NXDOMAIN_TTL = 600
+# Hosts kept in the cache; expired answers are swept, then the oldest dropped, once it is full
+MAX_ENTRIES = 10000
+# Concurrent lookups allowed in resolve_many
+MAX_CONCURRENT_LOOKUPS = 32
+
+_NXDOMAIN_ERRORS = {socket.EAI_NONAME}
+if hasattr(socket, "EAI_NODATA"):
+    _NXDOMAIN_ERRORS.add(socket.EAI_NODATA)
+
+_entries = {}  # host -> (expires_at, addresses)
+_wildcards = {}  # domain -> bool
+_lock = threading.Lock()
+# Benchmarks answer lookups themselves to stay offline; None uses the system resolver
+_resolver = None
+
+
+def set_resolver(resolver):
+    """Answer lookups with resolver(host) -> addresses (() for a missing name) and forget cached answers"""
+    global _resolver
+    _resolver = resolver
+    with _lock:
+        _entries.clear()
+        _wildcards.clear()
+
+
+def _lookup(host):
+    with _lock:
+        entry = _entries.get(host)
+    if entry and entry[0] > time.monotonic():
+        return True, entry[1]
+    return False, None
+
+
+def _store(host, addresses):
+    ttl = POSITIVE_TTL if addresses else NXDOMAIN_TTL
+    now = time.monotonic()
+    with _lock:
+        if host not in _entries and len(_entries) >= MAX_ENTRIES:
+            for expired in [name for name, (expires_at, _) in _entries.items() if expires_at <= now]:
+                del _entries[expired]
+            if len(_entries) >= MAX_ENTRIES:
+                del _entries[next(iter(_entries))]
+        _entries[host] = (now + ttl, addresses)
+
+
+def _addresses(infos):
+    return tuple(sorted({info[4][0] for info in infos}))
+
+
+def resolve(host):
+    """Return the host's addresses, () if it does not exist, or None if the lookup failed"""
+    hit, addresses = _lookup(host)
+    if hit:
+        return addresses
+    if _resolver is not None:
+        return _resolver(host)
+    archive = replay.current()
+    if archive is not None and archive.replaying:
+        return archive.resolved(host)
+    try:
+        addresses = _addresses(socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP))
+    except socket.gaierror as e:
+        if e.errno not in _NXDOMAIN_ERRORS:
+            return None
+        addresses = ()
+    _store(host, addresses)
+    if archive is not None:
+        archive.add_resolved(host, addresses)
+    return addresses
+
+
+async def resolve_async(host):
+    """Coroutine version of resolve()"""
+    hit, addresses = _lookup(host)
+    if hit:
+        return addresses
+    if _resolver is not None:
+        return _resolver(host)
+    archive = replay.current()
+    if archive is not None and archive.replaying:
+        return archive.resolved(host)
+    loop = asyncio.get_running_loop()
+    try:
+        addresses = _addresses(await loop.getaddrinfo(host, None, proto=socket.IPPROTO_TCP))
+    except socket.gaierror as e:
+        if e.errno not in _NXDOMAIN_ERRORS:
+            return None
+        addresses = ()
+    _store(host, addresses)
+    if archive is not None:
+        archive.add_resolved(host, addresses)
+    return addresses
+
+
+def _is_address(host):
+    try:
+        ipaddress.ip_address(host.strip("[]"))
+        return True
+    except ValueError:
+        return False
+
+
+def _connect_order(addresses):
+    # IPv4 first: IPv6 routes are the likelier to be missing
+    return None if addresses is None else tuple(sorted(addresses, key=lambda address: ":" in address))
+
+
+def connect_addresses(host):
+    """Addresses to connect to host on, IPv4 first: () when it does not exist, None to resolve it as usual"""
+    if _is_address(host):
+        return None
+    return _connect_order(resolve(host))
+
+
+class AsyncResolver:
+    """aiohttp resolver answering from the cache: TCPConnector(resolver=AsyncResolver())"""
+
+    async def resolve(self, host, port=0, family=socket.AF_UNSPEC):
+        addresses = None if _is_address(host) else _connect_order(await resolve_async(host))
+        if addresses is None:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, port, family=family, type=socket.SOCK_STREAM)
+            addresses = _connect_order(_addresses(infos))
+        found = []
+        for address in addresses:
+            address_family = socket.AF_INET6 if ":" in address else socket.AF_INET
+            if family in (socket.AF_UNSPEC, address_family):
+                found.append({"hostname": host, "host": address, "port": port, "family": address_family,
+                              "proto": socket.IPPROTO_TCP, "flags": socket.AI_NUMERICHOST})
+        if not found:
+            raise socket.gaierror(socket.EAI_NONAME, f"Name or service not known: {host}")
+        return found
+
+    async def close(self):
+        pass
+
+
+async def resolve_many(hosts):
+    """Resolve hosts concurrently and return host -> addresses"""
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_LOOKUPS)
+    hosts = list(dict.fromkeys(hosts))
+
+    async def bounded(host):
+        async with semaphore:
+            return await resolve_async(host)
+
+    results = await asyncio.gather(*(bounded(host) for host in hosts))
+    return dict(zip(hosts, results))
+
+
+def prefetch(hosts):
+    """Warm the cache for many hosts at once from synchronous code"""
+    hosts = [host for host in hosts if not _lookup(host)[0]]
+    if not hosts:
+        return
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        asyncio.run(resolve_many(hosts))
+
+
+def _probe_wildcard(domain):
+    # If the platform itself does not resolve, DNS is unusable and nothing can be ruled out
+    if not resolve(domain):
+        return None
+    addresses = resolve(f"personax-{uuid.uuid4().hex[:16]}.{domain}")
+    if addresses is None:
+        return None
+    return bool(addresses)
+
+
+def is_wildcard(domain):
+    """Whether every subdomain of domain resolves; None when it could not be determined"""
+    with _lock:
+        if domain in _wildcards:
+            return _wildcards[domain]
+    wildcard = cache.cached(
+        "dns_cache", "wildcard", domain, lambda: _probe_wildcard(domain),
+        classify_result=lambda result: cache.ERROR if result is None else cache.OK,
+    )
+    if wildcard is not None:
+        with _lock:
+            _wildcards[domain] = wildcard
+    return wildcard
+
+
+def subdomain_missing(host, domain):
+    """True when host, a subdomain of the platform's domain, is known not to exist there.
+
+    Platforms with wildcard DNS resolve every subdomain, so nothing is ruled out on them.
+    """
+    if not host.lower().endswith("." + domain) or is_wildcard(domain) is not False:
+        return False
+    return resolve(host) == ()
@@ -1,100 +1,224 @@
-import requests
-from bs4 import BeautifulSoup
+from modules import fetch, cache, serp, progress, cancel, concurrency
+from modules.results import Hit
 import re
-from concurrent.futures import ThreadPoolExecutor
+import sys
+import argparse
 
-def search_pastebin(email):
-    query = f"site:pastebin.com {email}"
-    url = f"https://www.google.com/search?q={query}"
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.5',
-    }
+GOOGLE_SEARCH = "https://www.google.com/search"
+EMAIL_PATTERN = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+# Organic results on one Google page; a full page may have crowded out some sites
+RESULTS_PER_PAGE = 10
+# Google ignores query words beyond this many
+MAX_QUERY_TERMS = 32
+
+def paste_query(domains, emails):
+    """Build one dork covering every domain and email: (site:a OR site:b) ("x" OR "y")"""
+    sites = " OR ".join(f"site:{domain}" for domain in domains)
+    terms = " OR ".join(f'"{email}"' for email in emails)
+    if len(domains) > 1:
+        sites = f"({sites})"
+    if len(emails) > 1:
+        terms = f"({terms})"
+    return f"{sites} {terms}"
+
+def search_links(domains, emails):
+    """Run one Google query and return the result links on any of domains"""
+    resp = fetch.get(GOOGLE_SEARCH, params={"q": paste_query(domains, emails)}, stream=True)
+    # A throttled or blocked search is an error, not a page without results
+    fetch.raise_for_status(resp)
+    # Stream-parse the result page and keep only links on the paste sites
+    return serp.extract_links(resp, domains)
+
+def search_paste_site(source, domain, email):
+    """Search Google for the email on one paste site"""
     try:
-        resp = requests.get(url, headers=headers, timeout=10)
-        soup = BeautifulSoup(resp.text, "lxml")
-        links = [a["href"] for a in soup.find_all("a", href=True) if "pastebin.com" in a["href"]]
-        return {"source": "Pastebin", "links": links}
+        return {"source": source, "links": search_links([domain], [email])}
     except Exception as e:
-        return {"source": "Pastebin", "error": str(e)}
+        return {"source": source, "error": str(e)}
+
+def search_pastebin(email):
+    return search_paste_site("Pastebin", "pastebin.com", email)
 
 def search_ghostbin(email):
-    query = f"site:ghostbin.co {email}"
-    url = f"https://www.google.com/search?q={query}"
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.5',
-    }
-    try:
-        resp = requests.get(url, headers=headers, timeout=10)
-        soup = BeautifulSoup(resp.text, "lxml")
-        links = [a["href"] for a in soup.find_all("a", href=True) if "ghostbin.co" in a["href"]]
-        return {"source": "Ghostbin", "links": links}
-    except Exception as e:
-        return {"source": "Ghostbin", "error": str(e)}
+    return search_paste_site("Ghostbin", "ghostbin.co", email)
 
 def search_justpasteit(email):
-    query = f"site:justpaste.it {email}"
-    url = f"https://www.google.com/search?q={query}"
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.5',
-    }
+    return search_paste_site("JustPaste.it", "justpaste.it", email)
+
+def search_rentry(email):
+    return search_paste_site("Rentry", "rentry.co", email)
+
+# (single-site search, source, domain); the search's name is its cache source
+PASTE_SITES = [
+    (search_pastebin, "Pastebin", "pastebin.com"),
+    (search_ghostbin, "Ghostbin", "ghostbin.co"),
+    (search_justpasteit, "JustPaste.it", "justpaste.it"),
+    (search_rentry, "Rentry", "rentry.co")
+]
+
+def split_links(links, sites):
+    """Bucket merged result links back into one result per paste site"""
+    return [
+        {"source": source, "links": [link for link in links if serp.host_matches(link, domain)]}
+        for _, source, domain in sites
+    ]
+
+def search_paste_sites(email, sites=PASTE_SITES):
+    """Search every site with one OR'd query; returns (results, queries sent)"""
+    if len(sites) == 1:
+        return [sites[0][0](email)], 1
     try:
-        resp = requests.get(url, headers=headers, timeout=10)
-        soup = BeautifulSoup(resp.text, "lxml")
-        links = [a["href"] for a in soup.find_all("a", href=True) if "justpaste.it" in a["href"]]
-        return {"source": "JustPaste.it", "links": links}
+        links = search_links([domain for _, _, domain in sites], [email])
     except Exception as e:
-        return {"source": "JustPaste.it", "error": str(e)}
+        return [{"source": source, "error": str(e)} for _, source, _ in sites], 1
+    if len(links) < RESULTS_PER_PAGE:
+        return split_links(links, sites), 1
 
-def search_rentry(email):
-    query = f"site:rentry.co {email}"
-    url = f"https://www.google.com/search?q={query}"
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.5',
-    }
+    # The merged page is full, so fall back to one query per site
+    with cancel.Executor(max_workers=len(sites)) as executor:
+        results = list(executor.map(lambda site: site[0](email), sites))
+    return results, 1 + len(sites)
+
+def pack_size(sites=PASTE_SITES):
+    """Emails that fit in one query next to the site filters"""
+    site_terms = 2 * len(sites) - 1
+    return max(1, (MAX_QUERY_TERMS - site_terms + 1) // 2)
+
+def search_pack(emails, sites=PASTE_SITES):
+    """Group-test a pack of emails with one query and split only packs that return hits.
+
+    Result links do not say which email matched, so a pack with hits is halved
+    until each hit is attributed to a single email. Returns (email -> results, queries sent).
+    """
+    if len(emails) == 1:
+        results, queries = search_paste_sites(emails[0], sites)
+        return {emails[0]: results}, queries
     try:
-        resp = requests.get(url, headers=headers, timeout=10)
-        soup = BeautifulSoup(resp.text, "lxml")
-        links = [a["href"] for a in soup.find_all("a", href=True) if "rentry.co" in a["href"]]
-        return {"source": "Rentry", "links": links}
+        links = search_links([domain for _, _, domain in sites], emails)
     except Exception as e:
-        return {"source": "Rentry", "error": str(e)}
+        return {email: [{"source": source, "error": str(e)} for _, source, _ in sites] for email in emails}, 1
+    if not links:
+        return {email: split_links([], sites) for email in emails}, 1
+
+    middle = len(emails) // 2
+    left, left_queries = search_pack(emails[:middle], sites)
+    right, right_queries = search_pack(emails[middle:], sites)
+    return {**left, **right}, 1 + left_queries + right_queries
+
+def cached_paste_results(email):
+    """Return (cached results by search, sites still to search) for one email"""
+    fresh, pending = {}, []
+    for site in PASTE_SITES:
+        hit, value = cache.lookup("email_breach", site[0].__name__, email)
+        if hit:
+            fresh[site[0]] = value
+        else:
+            pending.append(site)
+    return fresh, pending
+
+def store_paste_results(email, sites, results, fresh):
+    for site, result in zip(sites, results):
+        cache.store("email_breach", site[0].__name__, email, result)
+        fresh[site[0]] = result
+    return [fresh[site[0]] for site in PASTE_SITES]
+
+def paste_site_results(email):
+    """Per-site results for one email, searching only the sites not cached; returns (results, queries)"""
+    fresh, pending = cached_paste_results(email)
+    if not pending:
+        return [fresh[site[0]] for site in PASTE_SITES], 0
+    results, queries = search_paste_sites(email, pending)
+    return store_paste_results(email, pending, results, fresh), queries
+
+def combine(email, results, queries):
+    return {
+        "email": email,
+        "sources_checked": len(results),
+        "results": results,
+        "queries": queries,
+        "total_links": sum(len(r.get("links", [])) for r in results if "links" in r),
+        "records": [Hit(r["source"], link, query=email) for r in results for link in r.get("links", [])]
+    }
 
+@cache.cached_run("email_breach", "email")
 def run(data):
     email = data.get("email")
     if not email:
         return "No email provided."
 
     # Validate email format
-    email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    if not re.match(email_pattern, email):
+    if not re.match(EMAIL_PATTERN, email):
         return {"error": "Invalid email format"}
 
-    # List of search functions
-    search_functions = [
-        search_pastebin,
-        search_ghostbin,
-        search_justpasteit,
-        search_rentry
-    ]
+    report = progress.reporter_for(data)
+    report.expect(len(PASTE_SITES))
+    results, queries = paste_site_results(email)
+    report.advance(len(results))
+    return combine(email, results, queries)
 
-    # Run searches in parallel
-    with ThreadPoolExecutor(max_workers=4) as executor:
-        results = list(executor.map(lambda f: f(email), search_functions))
+def run_bulk(data):
+    emails = data.get("emails")
+    if not emails:
+        return "No emails provided."
 
-    # Combine results
-    combined_results = {
-        "email": email,
-        "sources_checked": len(search_functions),
-        "results": results,
-        "total_links": sum(len(r.get("links", [])) for r in results if "links" in r)
+    emails = list(dict.fromkeys(email.strip() for email in emails if email and email.strip()))
+    invalid = [email for email in emails if not re.match(EMAIL_PATTERN, email)]
+    emails = [email for email in emails if email not in invalid]
+
+    # Fully cached emails cost nothing; the rest are packed into shared queries
+    fresh = {email: cached_paste_results(email) for email in emails}
+    pending = [email for email in emails if fresh[email][1]]
+    size = pack_size()
+    packs = [pending[i:i + size] for i in range(0, len(pending), size)]
+
+    found, queries = {}, 0
+    # Packs all go to Google, so the per-host limit in fetch paces them
+    with cancel.Executor(max_workers=concurrency.workers(len(packs))) as executor:
+        for pack_results, pack_queries in executor.map(search_pack, packs):
+            found.update(pack_results)
+            queries += pack_queries
+
+    results = {}
+    for email in emails:
+        cached, missing = fresh[email]
+        if email in found:
+            # Packs search every site, so keep only the ones that were not cached
+            searched = [result for site, result in zip(PASTE_SITES, found[email]) if site in missing]
+            site_results = store_paste_results(email, missing, searched, cached)
+        else:
+            site_results = [cached[site[0]] for site in PASTE_SITES]
+        results[email] = combine(email, site_results, 0)
+
+    return {
+        "emails": results,
+        "invalid": invalid,
+        "queries": queries,
+        "total_links": sum(r["total_links"] for r in results.values())
     }
 
-    return combined_results 
\ No newline at end of file
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search paste sites for many emails, packing several into each Google query")
+    parser.add_argument("emails", nargs="*", help="emails to search for")
+    parser.add_argument("-f", "--file", help="file with one email per line ('-' for stdin)")
+    args = parser.parse_args(argv)
+
+    emails = list(args.emails)
+    if args.file:
+        handle = sys.stdin if args.file == "-" else open(args.file, encoding="utf-8")
+        with handle:
+            emails.extend(line.strip() for line in handle)
+    if not emails:
+        parser.error("no emails given")
+
+    results = run_bulk({"emails": emails})
+    for email, result in results["emails"].items():
+        links = [link for r in result["results"] for link in r.get("links", [])]
+        failed = [r["source"] for r in result["results"] if "error" in r]
+        line = f"{email}: {', '.join(links) or 'no links found'}"
+        print(f"{line} (could not search {', '.join(failed)})" if failed else line)
+    if results["invalid"]:
+        print(f"Skipped invalid emails: {', '.join(results['invalid'])}")
+    print(f"\nFound {results['total_links']} links with {results['queries']} queries")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,579 @@
+import asyncio
+import codecs
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import connection, connectionpool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+from modules import cancel, telemetry, replay, concurrency, ratelimit, retry, health, dns_cache
+
+# Shared HTTP layer: one pooled keep-alive session for every module
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+}
+
+# Seconds; profile probes use the shorter timeout
+DEFAULT_TIMEOUT = 10
+PROBE_TIMEOUT = 5
+
+# Number of distinct hosts kept in the pool, and the ceiling on connections per host;
+# how many are used at a time adapts to each host (see concurrency)
+POOL_HOSTS = 200
+MAX_CONNECTIONS_PER_HOST = 6
+
+# Largest response body read by default; sources with their own cap are listed below
+MAX_BODY_BYTES = 2 * 1024 * 1024
+BODY_LIMITS = {
+    "phone_search": 1024 * 1024,
+    "darkweb_scanner": 1024 * 1024,
+    "advanced_dark_web_scanner": 2 * 1024 * 1024,
+    "social_scraper": 3 * 1024 * 1024,
+}
+READ_CHUNK_SIZE = 16 * 1024
+# Content types worth decoding; anything else is treated as an empty body
+TEXT_TYPES = ("text/", "html", "xml", "json", "javascript")
+
+# .onion hosts are always routed through the local Tor SOCKS proxy
+TOR_PROXIES = {
+    "http": "socks5h://127.0.0.1:9050",
+    "https": "socks5h://127.0.0.1:9050",
+}
+
+_session = None
+_session_lock = threading.Lock()
+# Benchmarks point every request at a local stub server; None sends requests as addressed
+_url_rewrite = None
+_limits = concurrency.Controller(per_host=MAX_CONNECTIONS_PER_HOST)
+_rates = ratelimit.Limiter()
+
+
+class TransientHTTPError(requests.HTTPError):
+    """A host still answered 429 or 5xx after the retries"""
+
+
+class _CachedDNSConnection:
+    """urllib3 connection that takes its host's addresses from dns_cache"""
+
+    def _new_conn(self):
+        host = self._dns_host
+        addresses = dns_cache.connect_addresses(host)
+        if addresses is None:
+            return super()._new_conn()
+        if not addresses:
+            error = socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+            raise NewConnectionError(self, f"Failed to resolve {host!r} ({error})") from error
+        for i, address in enumerate(addresses):
+            # TLS still checks the certificate against the name; only the socket goes to the address
+            self._dns_host = address
+            try:
+                return super()._new_conn()
+            except (NewConnectionError, ConnectTimeoutError):
+                if i == len(addresses) - 1:
+                    raise
+            finally:
+                self._dns_host = host
+
+
+# Named like urllib3's own classes, which error messages quote
+class HTTPConnection(_CachedDNSConnection, connection.HTTPConnection):
+    pass
+
+
+class HTTPSConnection(_CachedDNSConnection, connection.HTTPSConnection):
+    pass
+
+
+class HTTPConnectionPool(connectionpool.HTTPConnectionPool):
+    ConnectionCls = HTTPConnection
+
+
+class HTTPSConnectionPool(connectionpool.HTTPSConnectionPool):
+    ConnectionCls = HTTPSConnection
+
+
+class CachedDNSAdapter(HTTPAdapter):
+    """HTTPAdapter whose direct connections resolve hosts through dns_cache"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": HTTPConnectionPool, "https": HTTPSConnectionPool}
+
+
+def get_session():
+    """Return the process-wide pooled session, creating it on first use"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = CachedDNSAdapter(pool_connections=POOL_HOSTS, pool_maxsize=MAX_CONNECTIONS_PER_HOST)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update(DEFAULT_HEADERS)
+                _session = session
+    return _session
+
+
+def set_url_rewrite(rewrite):
+    """Send each request to rewrite(url) instead of url; None restores direct requests.
+
+    rewrite must return URLs it produced unchanged, since redirects are followed from them.
+    """
+    global _url_rewrite
+    _url_rewrite = rewrite
+
+
+def host_slot(host):
+    """Hold one of the adaptive request slots for host; yields a permit to set the status on"""
+    return _limits.slot(host)
+
+
+def limit_stats():
+    """Current global and per-host concurrency limits"""
+    return _limits.stats()
+
+
+def set_rate(host, rate, burst):
+    """Allow host rate requests per second with bursts of up to burst"""
+    _rates.set_rate(host, rate, burst)
+
+
+def rate_stats():
+    return _rates.stats()
+
+
+def _live():
+    """Whether requests reach real hosts; replayed ones skip rate limits and health checks"""
+    archive = replay.current()
+    return archive is None or not archive.replaying
+
+
+def _healthy(host):
+    """Raise health.SourceUnavailable at once while host's circuit is open"""
+    if _live():
+        health.get_registry().check(host)
+
+
+def _record_health(host, url, status=None, error=None):
+    if not _live() or isinstance(error, (health.SourceUnavailable, cancel.Cancelled)):
+        return
+    if error is not None or status >= 500:
+        health.get_registry().failure(host, url, error or f"HTTP {status}")
+    else:
+        health.get_registry().success(host)
+
+
+def _before_retry(host, delay, status):
+    """The seconds to sleep before a retry; after a 429 everything bound for host waits as long"""
+    archive = replay.current()
+    if archive is not None and archive.replaying:
+        return delay * archive.latency_scale
+    if status == 429:
+        _rates.pause(host, delay)
+    return delay
+
+
+def _route(url, host, kwargs):
+    """The URL a request for url is sent to, adding a Tor proxy to kwargs for .onion hosts"""
+    if _url_rewrite is not None:
+        return _url_rewrite(url)
+    if host.endswith(".onion"):
+        kwargs.setdefault("proxies", TOR_PROXIES)
+    return url
+
+
+def request(method, url, headers=None, timeout=DEFAULT_TIMEOUT, **kwargs):
+    """Send a request through the shared session, rate limited and capped per host.
+
+    429/5xx answers and failed connections of idempotent requests are retried
+    (see retry); the caller gets the last answer or error. Hosts that keep
+    failing are cut off for a while (see health).
+    """
+    host = urlsplit(url).hostname or ""
+    _healthy(host)
+    target = _route(url, host, kwargs)
+    try:
+        response = _with_retries(method, url, target, host, headers=headers, timeout=timeout, **kwargs)
+    except requests.RequestException as e:
+        _record_health(host, url, error=e)
+        raise
+    _record_health(host, url, response.status_code)
+    return response
+
+
+def _probe(url):
+    """Health probe: True when the host sends any answer below 500"""
+    host = urlsplit(url).hostname or ""
+    kwargs = {}
+    target = _route(url, host, kwargs)
+    response = _send("GET", url, target, host, 0, timeout=PROBE_TIMEOUT, stream=True, **kwargs)
+    response.close()
+    return response.status_code < 500
+
+
+health.set_prober(_probe)
+
+
+def _with_retries(method, url, target, host, **kwargs):
+    source = telemetry.current_source()
+    retry.budget(source).add_request()
+    attempt = 0
+    while True:
+        try:
+            response = _send(method, url, target, host, attempt, **kwargs)
+        except replay.ReplayMiss:
+            raise
+        except requests.RequestException as e:
+            delay = retry.next_delay(method, attempt, source, error=e, connection_errors=(requests.ConnectionError,))
+            if delay is None:
+                raise
+            status = None
+        else:
+            delay = retry.next_delay(method, attempt, source, response.status_code, response.headers)
+            if delay is None:
+                return response
+            status = response.status_code
+            response.close()
+        cancel.sleep(_before_retry(host, delay, status))
+        attempt += 1
+
+
+def _send(method, url, target, host, attempt, headers=None, timeout=DEFAULT_TIMEOUT, **kwargs):
+    """One attempt of request(): wait for the host's rate, hold a slot, send"""
+    # Cancelled investigations send nothing new
+    cancel.check()
+    if _live():
+        _rates.wait(host)
+    with telemetry.span("fetch", host=host, retries=attempt) as span, host_slot(host) as permit:
+        cancel.check()
+        archive = replay.current()
+        if archive is not None:
+            # Archives file exchanges under the URL as addressed, whatever it was sent to
+            response = replay.request(archive, get_session(), method, url, target,
+                                      limit=body_limit(telemetry.current_source()),
+                                      headers=headers, timeout=timeout, **kwargs)
+        else:
+            response = get_session().request(method, target, headers=headers, timeout=timeout, **kwargs)
+        span.status = permit.status = response.status_code
+        span.bytes = response_bytes(response, kwargs.get("stream"))
+        if response.status_code >= 500:
+            span.error = f"HTTP {response.status_code}"
+        return response
+
+
+def raise_for_transient(response):
+    """Raise TransientHTTPError for a 429/5xx answer, so it is not taken for "not found".
+
+    The response is closed first.
+    """
+    if response.status_code in retry.RETRY_STATUSES:
+        response.close()
+        raise TransientHTTPError(f"HTTP {response.status_code} from {urlsplit(response.url or '').hostname}",
+                                 response=response)
+
+
+def raise_for_status(response):
+    """Raise for any 4xx/5xx answer (TransientHTTPError for 429/5xx), closing the response first.
+
+    For searches and APIs, where an error page parsed as a page without results
+    would be cached as "nothing found".
+    """
+    raise_for_transient(response)
+    if response.status_code >= 400:
+        response.close()
+        raise requests.HTTPError(f"HTTP {response.status_code} from {urlsplit(response.url or '').hostname}",
+                                 response=response)
+
+
+def response_bytes(response, streamed=False):
+    """Body size as sent, without reading a streamed body"""
+    length = response.headers.get("Content-Length")
+    if length and length.isdigit():
+        return int(length)
+    return 0 if streamed else len(response.content)
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def head(url, **kwargs):
+    return request("HEAD", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def body_limit(source):
+    return BODY_LIMITS.get(source, MAX_BODY_BYTES)
+
+
+def is_text(content_type):
+    content_type = (content_type or "").lower()
+    return not content_type or any(kind in content_type for kind in TEXT_TYPES)
+
+
+class TextReader:
+    """Incrementally decode a body up to a byte cap, watching for marker strings"""
+
+    def __init__(self, encoding, limit, markers=()):
+        self.decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+        self.limit = limit
+        self.markers = [marker for marker in markers if marker]
+        self._overlap = max((len(marker) for marker in self.markers), default=1) - 1
+        self.parts = []
+        self.read = 0
+        self.truncated = False
+        self.matched = False
+
+    def feed(self, chunk):
+        """Add a chunk; returns True once reading should stop"""
+        if self.read + len(chunk) > self.limit:
+            chunk = chunk[:self.limit - self.read]
+            self.truncated = True
+        self.read += len(chunk)
+        text = self.decoder.decode(chunk, final=self.truncated)
+        if self.markers and text:
+            # Only the new text plus a marker-length overlap needs scanning
+            window = (self.parts[-1][-self._overlap:] if self.parts and self._overlap else "") + text
+            self.matched = any(marker in window for marker in self.markers)
+        self.parts.append(text)
+        return self.truncated or self.matched
+
+    def text(self):
+        if not self.truncated:
+            self.parts.append(self.decoder.decode(b"", final=True))
+        return "".join(self.parts)
+
+
+def read_text(response, limit=MAX_BODY_BYTES, markers=(), chunk_size=READ_CHUNK_SIZE):
+    """Read a streamed response body as text, stopping at limit bytes or the first marker.
+
+    Returns (text, truncated); truncated is True when the cap cut the body short
+    or the body was not text at all. The response is closed.
+    """
+    host = urlsplit(response.url or "").hostname or ""
+    try:
+        if not is_text(response.headers.get("Content-Type")):
+            return "", True
+        reader = TextReader(response.encoding, limit, markers)
+        # Cancelling closes the connection under a blocked read
+        with telemetry.span("read", host=host, status=response.status_code) as span, \
+                cancel.closing_on_cancel(response):
+            for chunk in response.iter_content(chunk_size):
+                cancel.check()
+                span.bytes += len(chunk)
+                if reader.feed(chunk):
+                    break
+        return reader.text(), reader.truncated
+    finally:
+        response.close()
+
+
+def get_text(url, limit=MAX_BODY_BYTES, markers=(), **kwargs):
+    """GET url and return (response, text, truncated) without reading past the cap"""
+    response = get(url, stream=True, **kwargs)
+    text, truncated = read_text(response, limit, markers)
+    return response, text, truncated
+
+
+async def read_text_async(response, limit=MAX_BODY_BYTES, markers=(), chunk_size=READ_CHUNK_SIZE):
+    """Coroutine version of read_text() for aiohttp responses"""
+    try:
+        if not is_text(response.headers.get("Content-Type")):
+            return "", True
+        reader = TextReader(response.charset, limit, markers)
+        with telemetry.span("read", host=response.url.host or "", status=response.status) as span:
+            async for chunk in response.content.iter_chunked(chunk_size):
+                span.bytes += len(chunk)
+                if reader.feed(chunk):
+                    break
+        return reader.text(), reader.truncated
+    finally:
+        response.release()
+
+
+def create_async_session(timeout=30):
+    """Create an aiohttp session with the shared headers, per-host limits and retries.
+
+    While an archive is recorded or replayed the session wraps a replay.ArchiveSession,
+    which records its own fetch spans.
+    """
+    import aiohttp
+
+    archive = replay.current()
+    if archive is not None and archive.replaying:
+        return RetryingSession(replay.ArchiveSession(archive))
+    # Hosts resolve through dns_cache, which also remembers names that do not exist
+    connector = aiohttp.TCPConnector(limit_per_host=MAX_CONNECTIONS_PER_HOST, use_dns_cache=False,
+                                     resolver=dns_cache.AsyncResolver(), ssl=False)
+    session = aiohttp.ClientSession(
+        timeout=aiohttp.ClientTimeout(total=timeout),
+        connector=connector,
+        headers=DEFAULT_HEADERS,
+        # Recording sessions record their own spans
+        trace_configs=[limit_trace_config()] + ([] if archive is not None else [telemetry_trace_config()]),
+        request_class=rewriting_request_class(_url_rewrite) if _url_rewrite else aiohttp.ClientRequest,
+    )
+    if archive is not None:
+        session = replay.ArchiveSession(archive, session, body_limit(telemetry.current_source()))
+    return RetryingSession(session)
+
+
+class _RetryingRequest:
+    def __init__(self, session, method, url, kwargs):
+        self._session = session
+        self._args = (method, url, kwargs)
+        self._request = None
+
+    async def __aenter__(self):
+        self._request, response = await self._session._send(*self._args)
+        return response
+
+    async def __aexit__(self, *exc):
+        return await self._request.__aexit__(*exc)
+
+
+class RetryingSession:
+    """Wraps an aiohttp session so requests are rate limited, retried and health checked like request()'s"""
+
+    def __init__(self, session):
+        self.session = session
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        await self.session.close()
+
+    def request(self, method, url, **kwargs):
+        return _RetryingRequest(self, method, url, kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.request("HEAD", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    async def _send(self, method, url, kwargs):
+        """Returns the entered request context of the last attempt and its response"""
+        host = urlsplit(str(url)).hostname or ""
+        _healthy(host)
+        try:
+            request, response = await self._with_retries(method, url, host, kwargs)
+        except Exception as e:
+            _record_health(host, str(url), error=e)
+            raise
+        _record_health(host, str(url), response.status)
+        return request, response
+
+    async def _with_retries(self, method, url, host, kwargs):
+        import aiohttp
+
+        source = telemetry.current_source()
+        retry.budget(source).add_request()
+        attempt = 0
+        while True:
+            cancel.check()
+            if _live():
+                await _rates.wait_async(host)
+            # The attempt number reaches the fetch span through the context
+            with retry.attempt(attempt):
+                request = self.session.request(method, url, **kwargs)
+                try:
+                    response = await request.__aenter__()
+                except replay.ReplayMiss:
+                    raise
+                except Exception as e:
+                    delay = retry.next_delay(method, attempt, source, error=e,
+                                             connection_errors=(aiohttp.ClientConnectionError, ConnectionError))
+                    if delay is None:
+                        raise
+                    status = None
+                else:
+                    delay = retry.next_delay(method, attempt, source, response.status, response.headers)
+                    if delay is None:
+                        return request, response
+                    status = response.status
+                    await request.__aexit__(None, None, None)
+            await asyncio.sleep(_before_retry(host, delay, status))
+            attempt += 1
+
+
+def rewriting_request_class(rewrite):
+    """aiohttp request class that sends every request to rewrite(url), like request() does"""
+    import aiohttp
+    import yarl
+
+    class RewrittenRequest(aiohttp.ClientRequest):
+        def __init__(self, method, url, *args, **kwargs):
+            super().__init__(method, yarl.URL(rewrite(str(url)), encoded=True), *args, **kwargs)
+
+    return RewrittenRequest
+
+
+def limit_trace_config():
+    """aiohttp hooks that hold an adaptive request slot per request, like request() does"""
+    import aiohttp
+
+    async def on_start(session, context, params):
+        context.host = params.url.host or ""
+        context.permit = await _limits.acquire_async(context.host)
+
+    async def on_end(session, context, params):
+        context.permit.status = params.response.status
+        _limits.release_async(context.host, context.permit)
+
+    async def on_exception(session, context, params):
+        _limits.release_async(context.host, context.permit, params.exception)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_start)
+    trace_config.on_request_end.append(on_end)
+    trace_config.on_request_exception.append(on_exception)
+    return trace_config
+
+
+def telemetry_trace_config():
+    """aiohttp hooks that record a fetch span per request, like request() does"""
+    import aiohttp
+
+    async def on_start(session, context, params):
+        context.span = telemetry.Span("fetch", source=telemetry.current_source(), host=params.url.host or "",
+                                      retries=retry.current_attempt(), started=time.perf_counter())
+
+    async def on_end(session, context, params):
+        context.span.status = params.response.status
+        context.span.bytes = params.response.content_length or 0
+        if params.response.status >= 500:
+            context.span.error = f"HTTP {params.response.status}"
+        finish(context.span)
+
+    async def on_exception(session, context, params):
+        context.span.error = f"{type(params.exception).__name__}: {params.exception}"
+        finish(context.span)
+
+    def finish(span):
+        span.duration = time.perf_counter() - span.started
+        telemetry.record(span)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_start)
+    trace_config.on_request_end.append(on_end)
+    trace_config.on_request_exception.append(on_exception)
+    return trace_config
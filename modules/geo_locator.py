@@ -1,3 +1,18 @@
+from modules.results import Location, Profile, records_of
+
 def run(data):
-    # Placeholder: extract geo-location from metadata or social posts
-    return "Geo-location not implemented yet." 
\ No newline at end of file
+    # Collect locations from the profiles the social scraper found upstream
+    social = data.get("upstream", {}).get("Social Scraper")
+    records = [
+        Location(record.source, record.location)
+        for record in records_of(social)
+        if isinstance(record, Profile) and record.location
+    ]
+    if not records:
+        # Placeholder: extract geo-location from metadata or social posts
+        return "Geo-location not implemented yet."
+    return {
+        "locations": [{"platform": record.source, "location": record.location} for record in records],
+        "total_locations": len(records),
+        "records": records
+    }
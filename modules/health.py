@@ -0,0 +1,240 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+from modules import cache
+
+# Health of every host the modules talk to, kept across runs. A host whose
+# requests fail FAILURE_THRESHOLD times in a row gets an open circuit, and
+# requests to it fail at once with SourceUnavailable instead of waiting out a
+# timeout. Once its cool-down has passed, the next request turned away starts
+# a probe in the background: any answer closes the circuit, a failure keeps
+# it open for twice as long. Closed circuits are forgotten, so only hosts that
+# are failing are stored.
+
+HEALTH_FILE = os.path.join(cache.CACHE_DIR, "health.sqlite3")
+# Failed requests in a row (after retries) that open a circuit
+FAILURE_THRESHOLD = 3
+# Seconds a circuit stays open after it first opens; doubled by every failed probe
+COOLDOWN = 60
+MAX_COOLDOWN = 3600
+# Open circuits not asked about for this many seconds past their retry time are dropped on load
+STALE_AFTER = MAX_COOLDOWN
+PROBE_WORKERS = 4
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class SourceUnavailable(requests.ConnectionError):
+    """A request was turned away because its host's circuit is open"""
+
+
+class Circuit:
+    """Breaker state of one host"""
+
+    def __init__(self, host, state=CLOSED, failures=0, trips=0, opened_at=0.0, retry_at=0.0,
+                 last_error="", probe_url=""):
+        self.host = host
+        self.state = state
+        self.failures = failures
+        self.trips = trips
+        self.opened_at = opened_at
+        self.retry_at = retry_at
+        self.last_error = last_error
+        self.probe_url = probe_url
+
+    def row(self):
+        return (self.host, self.state, self.failures, self.trips, self.opened_at, self.retry_at,
+                self.last_error, self.probe_url)
+
+    def to_dict(self):
+        return {
+            "host": self.host,
+            "state": self.state,
+            "failures": self.failures,
+            "trips": self.trips,
+            "opened_at": self.opened_at or None,
+            "retry_in_s": round(max(self.retry_at - time.time(), 0)) if self.state != CLOSED else None,
+            "last_error": self.last_error,
+        }
+
+
+def probe_url(url):
+    """The root of url's host, which probes ask for"""
+    scheme, _, rest = url.partition("://")
+    return f"{scheme}://{rest.split('/', 1)[0]}/"
+
+
+class Registry:
+    """Circuits by host, stored in SQLite; safe to use from any thread"""
+
+    def __init__(self, path=HEALTH_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._executor = None
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS circuits ("
+            "host TEXT PRIMARY KEY, state TEXT, failures INTEGER, trips INTEGER, "
+            "opened_at REAL, retry_at REAL, last_error TEXT, probe_url TEXT)"
+        )
+        self._prune(time.time())
+        self._circuits = {}
+        for row in self._conn.execute("SELECT * FROM circuits"):
+            circuit = Circuit(*row)
+            # A probe cut short by the last exit is started again when due
+            if circuit.state == HALF_OPEN:
+                circuit.state = OPEN
+            self._circuits[circuit.host] = circuit
+
+    def _save(self, circuit):
+        self._conn.execute("INSERT OR REPLACE INTO circuits VALUES (?, ?, ?, ?, ?, ?, ?, ?)", circuit.row())
+
+    def _prune(self, now):
+        # Failure streaks that never opened a circuit do not outlive the run
+        self._conn.execute("DELETE FROM circuits WHERE state=? OR retry_at <= ?", (CLOSED, now - STALE_AFTER))
+
+    def check(self, host):
+        """Raise SourceUnavailable while host's circuit is open, starting a probe once one is due"""
+        with self._lock:
+            circuit = self._circuits.get(host)
+            if circuit is None or circuit.state == CLOSED:
+                return
+            due = circuit.state == OPEN and time.time() >= circuit.retry_at and _prober is not None
+            if due:
+                circuit.state = HALF_OPEN
+            retry = "checking it now" if due else f"checking again in {max(circuit.retry_at - time.time(), 0):.0f}s"
+            message = f"{host} is unavailable after {circuit.failures} failed requests ({circuit.last_error}); {retry}"
+        if due:
+            self._start_probe(circuit.host, circuit.probe_url)
+        raise SourceUnavailable(message)
+
+    def success(self, host):
+        with self._lock:
+            circuit = self._circuits.get(host)
+            if circuit is not None and (circuit.failures or circuit.state != CLOSED):
+                self._close(circuit)
+
+    def failure(self, host, url, error):
+        with self._lock:
+            circuit = self._circuits.get(host)
+            if circuit is None:
+                circuit = self._circuits[host] = Circuit(host)
+            circuit.failures += 1
+            circuit.last_error = error if isinstance(error, str) else type(error).__name__
+            circuit.probe_url = probe_url(url)
+            if circuit.state == CLOSED and circuit.failures >= FAILURE_THRESHOLD:
+                self._trip(circuit)
+            self._save(circuit)
+
+    def _close(self, circuit):
+        circuit.state, circuit.failures, circuit.trips, circuit.last_error = CLOSED, 0, 0, ""
+        circuit.opened_at = circuit.retry_at = 0.0
+        # A healthy host needs no row; one is made again on its next failure
+        del self._circuits[circuit.host]
+        self._conn.execute("DELETE FROM circuits WHERE host=?", (circuit.host,))
+
+    def _trip(self, circuit):
+        circuit.trips += 1
+        circuit.state = OPEN
+        circuit.opened_at = time.time()
+        circuit.retry_at = circuit.opened_at + min(MAX_COOLDOWN, COOLDOWN * 2 ** (circuit.trips - 1))
+
+    def _start_probe(self, host, url):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=PROBE_WORKERS, thread_name_prefix="health-probe")
+            executor = self._executor
+        executor.submit(self._probe, host, url)
+
+    def _probe(self, host, url):
+        try:
+            answered = _prober(url)
+        except Exception:
+            answered = False
+        with self._lock:
+            circuit = self._circuits.get(host)
+            if circuit is None or circuit.state != HALF_OPEN:
+                return
+            if answered:
+                self._close(circuit)
+            else:
+                self._trip(circuit)
+                self._save(circuit)
+
+    def circuits(self):
+        with self._lock:
+            return [circuit.to_dict() for _, circuit in sorted(self._circuits.items())]
+
+    def reset(self, hosts=None):
+        """Forget the health of hosts (all hosts when None)"""
+        with self._lock:
+            if hosts is None:
+                self._circuits.clear()
+                self._conn.execute("DELETE FROM circuits")
+                return
+            for host in hosts:
+                self._circuits.pop(host, None)
+                self._conn.execute("DELETE FROM circuits WHERE host=?", (host,))
+
+
+_registry = None
+_registry_lock = threading.Lock()
+# url -> True when the host answered; set by fetch so probes go out like any request
+_prober = None
+
+
+def get_registry():
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = Registry()
+    return _registry
+
+
+def set_registry(registry):
+    """Use registry from now on (benchmarks keep theirs in memory); returns the previous one"""
+    global _registry
+    with _registry_lock:
+        previous, _registry = _registry, registry
+    return previous
+
+
+def set_prober(prober):
+    global _prober
+    _prober = prober
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List or reset the health of the hosts PersonaX queries")
+    parser.add_argument("--all", action="store_true", help="also list hosts whose circuit is closed")
+    parser.add_argument("--reset", nargs="*", metavar="HOST", help="forget these hosts (all when none are given)")
+    args = parser.parse_args(argv)
+
+    registry = get_registry()
+    if args.reset is not None:
+        registry.reset(args.reset or None)
+        print(f"Reset {', '.join(args.reset) or 'every host'}")
+        return
+    circuits = [c for c in registry.circuits() if args.all or c["state"] != CLOSED]
+    if not circuits:
+        print("No open circuits")
+    for c in circuits:
+        since = datetime.fromtimestamp(c["opened_at"]).isoformat(timespec="seconds") if c["opened_at"] else "-"
+        retry = f"retry in {c['retry_in_s']}s" if c["retry_in_s"] is not None else ""
+        print(f"{c['host']}: {c['state']}, {c['failures']} failures, open since {since} {retry}  {c['last_error']}")
+
+
+if __name__ == "__main__":
+    main()
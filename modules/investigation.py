@@ -0,0 +1,27 @@
+from modules import registry
+from modules.scheduler import Task, InvestigationScheduler
+
+# Overall wall-clock budget for one investigation, in seconds
+INVESTIGATION_DEADLINE = 180
+
+# Modules run concurrently; Social Scraper skips the platforms Username Hunter found
+# no profile on, and Geo Locator waits for the locations scraped by Social Scraper
+# Plugins are imported the first time their task runs
+INVESTIGATION_STEPS = [
+    Task('Username Hunter', registry.get('username_hunter'), 'username', timeout=90),
+    Task('Email Breach', registry.get('email_breach'), 'email', timeout=60),
+    Task('Phone Search', registry.get('phone_search'), 'phone', timeout=60),
+    Task('Image Search', registry.get('image_search'), 'name', timeout=60),
+    Task('Dark Web', registry.get('darkweb_scanner'), 'email', timeout=60),
+    Task('Social Scraper', registry.get('social_scraper'), 'username', depends_on=['Username Hunter'], timeout=90),
+    Task('Geo Locator', registry.get('geo_locator'), 'username', depends_on=['Social Scraper'], timeout=60),
+]
+
+
+def build_scheduler(deadline=INVESTIGATION_DEADLINE):
+    return InvestigationScheduler(INVESTIGATION_STEPS, deadline=deadline)
+
+
+def run_investigation(search_data, on_complete=None, deadline=INVESTIGATION_DEADLINE):
+    """Run every module that has input in search_data and return label -> result"""
+    return build_scheduler(deadline).run(search_data, on_complete=on_complete)
@@ -1,7 +1,9 @@
-import requests
+from modules import fetch, cache, progress, cancel, concurrency
+from modules.utils import fan_out
+from modules.results import Hit, Profile
 from bs4 import BeautifulSoup
 import re
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
 
 def validate_phone(phone):
     # Remove any non-digit characters except '+' at the start
@@ -36,18 +38,38 @@ def format_phone_for_search(phone):
         }
     return {'without_country': phone}
 
+BODY_LIMIT = fetch.body_limit("phone_search")
+
+def url_responds(url):
+    # Only the status matters, so the body is never read
+    with fetch.get(url, stream=True) as response:
+        fetch.raise_for_transient(response)
+        return response.status_code == 200
+
+def check_sites(source, sites):
+    """Probe all sites at once; slow hosts are reported instead of holding up the rest"""
+    completed, failed, timed_out = fan_out(url_responds, sites, deadline=fetch.DEFAULT_TIMEOUT)
+    results = {site: sites[site] for site in sites if completed.get(site)}
+    records = [Hit(site, url) for site, url in results.items()]
+    return {"source": source, "results": results, "failed": failed, "timed_out": timed_out, "records": records}
+
+def directory_records(source, url, name, place):
+    """Profile record for a directory listing, or none when the page had no entry"""
+    if not (name or place):
+        return []
+    return [Profile(
+        source, url=url,
+        name=name.get_text(strip=True) if name else "",
+        location=place.get_text(strip=True) if place else ""
+    )]
+
 def search_truecaller(phone):
     formats = format_phone_for_search(phone)
     url = f"https://www.truecaller.com/search/{formats['with_country']}"
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.5',
-    }
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response, html, truncated = fetch.get_text(url, limit=BODY_LIMIT)
         if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'lxml')
+            soup = BeautifulSoup(html, 'lxml')
             # Look for name and location information
             name = soup.find('h1', class_='profile-name')
             location = soup.find('div', class_='profile-location')
@@ -55,23 +77,21 @@ def search_truecaller(phone):
                 "source": "Truecaller",
                 "name": name.text if name else "Not found",
                 "location": location.text if location else "Not found",
-                "url": url
+                "url": url,
+                "truncated": truncated,
+                "records": directory_records("Truecaller", url, name, location)
             }
+        return {"source": "Truecaller", "error": f"HTTP {response.status_code}", "url": url}
     except Exception as e:
         return {"source": "Truecaller", "error": str(e)}
 
 def search_whitepages(phone):
     formats = format_phone_for_search(phone)
     url = f"https://www.whitepages.com/phone/{formats['with_country']}"
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.5',
-    }
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response, html, truncated = fetch.get_text(url, limit=BODY_LIMIT)
         if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'lxml')
+            soup = BeautifulSoup(html, 'lxml')
             # Look for name and address information
             name = soup.find('div', class_='name')
             address = soup.find('div', class_='address')
@@ -79,23 +99,21 @@ def search_whitepages(phone):
                 "source": "Whitepages",
                 "name": name.text if name else "Not found",
                 "address": address.text if address else "Not found",
-                "url": url
+                "url": url,
+                "truncated": truncated,
+                "records": directory_records("Whitepages", url, name, address)
             }
+        return {"source": "Whitepages", "error": f"HTTP {response.status_code}", "url": url}
     except Exception as e:
         return {"source": "Whitepages", "error": str(e)}
 
 def search_411(phone):
     formats = format_phone_for_search(phone)
     url = f"https://www.411.com/phone/{formats['with_country']}"
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.5',
-    }
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response, html, truncated = fetch.get_text(url, limit=BODY_LIMIT)
         if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'lxml')
+            soup = BeautifulSoup(html, 'lxml')
             # Look for name and address information
             name = soup.find('div', class_='name')
             address = soup.find('div', class_='address')
@@ -103,8 +121,11 @@ def search_411(phone):
                 "source": "411",
                 "name": name.text if name else "Not found",
                 "address": address.text if address else "Not found",
-                "url": url
+                "url": url,
+                "truncated": truncated,
+                "records": directory_records("411", url, name, address)
             }
+        return {"source": "411", "error": f"HTTP {response.status_code}", "url": url}
     except Exception as e:
         return {"source": "411", "error": str(e)}
 
@@ -118,22 +139,7 @@ def search_social_media(phone):
         "Instagram": f"https://www.instagram.com/explore/tags/{formats['with_country']}/"
     }
     
-    results = {}
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.5',
-    }
-    
-    for site, url in sites.items():
-        try:
-            response = requests.get(url, headers=headers, timeout=10)
-            if response.status_code == 200:
-                results[site] = url
-        except Exception as e:
-            continue
-    
-    return {"source": "Social Media", "results": results}
+    return check_sites("Social Media", sites)
 
 def search_business_listings(phone):
     formats = format_phone_for_search(phone)
@@ -144,23 +150,9 @@ def search_business_listings(phone):
         "Google Business": f"https://www.google.com/search?q={formats['with_country']}"
     }
     
-    results = {}
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.5',
-    }
-    
-    for site, url in sites.items():
-        try:
-            response = requests.get(url, headers=headers, timeout=10)
-            if response.status_code == 200:
-                results[site] = url
-        except Exception as e:
-            continue
-    
-    return {"source": "Business Listings", "results": results}
+    return check_sites("Business Listings", sites)
 
+@cache.cached_run("phone_search", "phone")
 def run(data):
     phone = data.get("phone")
     if not phone:
@@ -180,15 +172,26 @@ def run(data):
         search_business_listings
     ]
 
-    # Run searches in parallel
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        results = list(executor.map(lambda f: f(formatted_phone), search_functions))
+    report = progress.reporter_for(data)
+    report.expect(len(search_functions))
+
+    # Run searches in parallel, passing each source's findings on as it finishes
+    with cancel.Executor(max_workers=concurrency.workers(len(search_functions))) as executor:
+        futures = [
+            executor.submit(cache.cached, "phone_search", f.__name__, formatted_phone, lambda f=f: f(formatted_phone))
+            for f in search_functions
+        ]
+        for future in as_completed(futures):
+            report.advance()
+            report.hit(*future.result().get("records", []))
+        results = [future.result() for future in futures]
 
     # Combine results
     combined_results = {
         "phone": formatted_phone,
         "sources_checked": len(search_functions),
-        "results": results
+        "results": results,
+        "records": [record for r in results for record in r.get("records", [])]
     }
 
     return combined_results 
\ No newline at end of file
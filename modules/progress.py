@@ -0,0 +1,102 @@
+import threading
+from collections import Counter
+
+# Fine-grained progress from inside modules. Modules report through the
+# reporter found in data["reporter"]; the GUI drains it on a timer instead
+# of receiving one signal per report.
+
+
+class TaskReporter:
+    """Reports for one investigation step; safe to call from any thread"""
+
+    def __init__(self, parent, label):
+        self._parent = parent
+        self.label = label
+
+    def expect(self, total):
+        """Announce how many sources this step will check"""
+        self._parent._expect(self.label, total)
+
+    def advance(self, count=1):
+        """Mark count sources as checked"""
+        self._parent._advance(self.label, count)
+
+    def hit(self, *records):
+        """Pass on records as soon as they are found"""
+        self._parent._hit(self.label, records)
+
+
+class _NullReporter:
+    label = None
+
+    def expect(self, total):
+        pass
+
+    def advance(self, count=1):
+        pass
+
+    def hit(self, *records):
+        pass
+
+
+NULL_REPORTER = _NullReporter()
+
+
+def reporter_for(data):
+    """The step's reporter, or one that discards reports when nobody is listening"""
+    reporter = data.get("reporter")
+    return reporter if isinstance(reporter, TaskReporter) else NULL_REPORTER
+
+
+class ProgressReporter:
+    """Collects step reports until drained"""
+
+    def __init__(self, labels):
+        self.labels = list(labels)
+        self._lock = threading.Lock()
+        self._totals = Counter()
+        self._done = Counter()
+        self._finished = set()
+        self._hits = {}
+        self._results = []
+
+    def for_task(self, label):
+        return TaskReporter(self, label)
+
+    def _expect(self, label, total):
+        with self._lock:
+            self._totals[label] += total
+
+    def _advance(self, label, count):
+        with self._lock:
+            self._done[label] += count
+
+    def _hit(self, label, records):
+        with self._lock:
+            self._hits.setdefault(label, []).extend(records)
+
+    def finish(self, label, result):
+        """Record a step's final result"""
+        with self._lock:
+            self._finished.add(label)
+            self._results.append((label, result))
+
+    def percent(self):
+        if not self.labels:
+            return 100
+        with self._lock:
+            fractions = [
+                1.0 if label in self._finished
+                else min(self._done[label] / self._totals[label], 1.0) if self._totals[label]
+                else 0.0
+                for label in self.labels
+            ]
+        return int(sum(fractions) / len(fractions) * 100)
+
+    def drain(self):
+        """Return (percent, label -> new records, finished (label, result) pairs) since the last drain"""
+        percent = self.percent()
+        with self._lock:
+            hits, self._hits = self._hits, {}
+            results, self._results = self._results, []
+        return percent, hits, results
@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import time
+
+from modules import cancel
+
+# Per-host request rates (token buckets), shared by every module and both HTTP
+# clients. A bucket holds up to burst tokens and refills at rate per second;
+# each request takes one, waiting for it when the bucket is empty. A host that
+# asks for a pause with Retry-After gets no requests until the pause is over.
+
+# Requests per second and burst size for hosts not listed below
+DEFAULT_RATE = 20.0
+DEFAULT_BURST = 40
+# Hosts that throttle or block clients well below the default
+HOST_RATES = {
+    "www.google.com": (2.0, 10),
+    "github.com": (5.0, 10),
+}
+
+
+class TokenBucket:
+    """Tokens refilled at rate per second up to burst"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.paused_until = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self):
+        """Take a token and return the seconds to wait before using it.
+
+        The bucket goes into debt rather than blocking, so callers wait outside
+        the lock and in the order they reserved.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            debt = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(debt, self.paused_until - now)
+
+    def pause(self, seconds):
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def stats(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            return {"rate": self.rate, "burst": self.burst, "tokens": round(self.tokens, 1),
+                    "paused_s": round(max(self.paused_until - time.monotonic(), 0), 1)}
+
+
+class Limiter:
+    """One token bucket per host"""
+
+    def __init__(self, rates=None, default=(DEFAULT_RATE, DEFAULT_BURST)):
+        self.rates = dict(HOST_RATES if rates is None else rates)
+        self.default = default
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, host):
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(*self.rates.get(host, self.default))
+            return bucket
+
+    def set_rate(self, host, rate, burst):
+        """Change host's rate; takes effect with a full bucket"""
+        with self._lock:
+            self.rates[host] = (rate, burst)
+            self._buckets.pop(host, None)
+
+    def wait(self, host):
+        delay = self.bucket(host).reserve()
+        if delay > 0:
+            cancel.sleep(delay)
+
+    async def wait_async(self, host):
+        delay = self.bucket(host).reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, host, seconds):
+        """Send nothing to host for seconds, as a Retry-After asks"""
+        self.bucket(host).pause(seconds)
+
+    def stats(self):
+        with self._lock:
+            buckets = dict(self._buckets)
+        return {host: bucket.stats() for host, bucket in sorted(buckets.items())}
@@ -0,0 +1,131 @@
+import importlib
+import subprocess
+import sys
+import threading
+import time
+import argparse
+import os
+
+# Investigation modules are described here and imported only when first used
+
+
+class Plugin:
+    """A lazily imported investigation module"""
+
+    def __init__(self, name, label, inputs, capabilities=(), entry="run"):
+        self.name = name
+        self.label = label
+        self.module_path = f"modules.{name}"
+        self.inputs = tuple(inputs)
+        self.capabilities = frozenset(capabilities)
+        self.entry = entry
+        self.import_seconds = None
+        self._module = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    started = time.perf_counter()
+                    module = importlib.import_module(self.module_path)
+                    self.import_seconds = time.perf_counter() - started
+                    self._module = module
+        return self._module
+
+    def function(self, entry=None):
+        return getattr(self.load(), entry or self.entry)
+
+    def __call__(self, data):
+        return self.function()(data)
+
+    def __repr__(self):
+        return f"Plugin({self.name!r})"
+
+
+PLUGINS = [
+    Plugin("username_hunter", "Username Hunter", ["username"], ["profiles", "bulk"]),
+    Plugin("email_breach", "Email Breach", ["email"], ["leaks", "bulk"]),
+    Plugin("phone_search", "Phone Search", ["phone"], ["directories"]),
+    Plugin("image_search", "Image Search", ["name"], ["images"]),
+    Plugin("darkweb_scanner", "Dark Web", ["email", "username"], ["darkweb"]),
+    Plugin("social_scraper", "Social Scraper", ["username"], ["profiles", "posts"]),
+    Plugin("geo_locator", "Geo Locator", ["username"], ["locations"]),
+    Plugin("advanced_username_hunter", "Advanced Username Hunter", ["username"], ["profiles", "bulk"]),
+    Plugin("advanced_email_breach", "Advanced Email Breach", ["email"], ["leaks", "breaches"]),
+    Plugin("advanced_dark_web_scanner", "Advanced Dark Web", ["query"], ["darkweb"]),
+    Plugin("advanced_social_scraper", "Advanced Social Scraper", ["username"], ["profiles", "posts"]),
+    Plugin("advanced_image_search", "Advanced Image Search", ["image_path"], ["images", "metadata"]),
+    Plugin("advanced_geo_locator", "Advanced Geo Locator", ["query", "image_path"], ["locations", "map"]),
+]
+PLUGINS_BY_NAME = {plugin.name: plugin for plugin in PLUGINS}
+
+
+def get(name):
+    try:
+        return PLUGINS_BY_NAME[name]
+    except KeyError:
+        raise KeyError(f"Unknown module: {name}") from None
+
+
+def for_input(field):
+    """Plugins that consume the given search field"""
+    return [plugin for plugin in PLUGINS if field in plugin.inputs]
+
+
+def with_capability(capability):
+    return [plugin for plugin in PLUGINS if capability in plugin.capabilities]
+
+
+def import_report():
+    """Import cost of every plugin loaded so far in this process"""
+    return [
+        {"module": plugin.name, "loaded": plugin.loaded, "seconds": plugin.import_seconds}
+        for plugin in PLUGINS
+    ]
+
+
+def measure_cold_import(module_path):
+    """Seconds to import module_path in a fresh interpreter"""
+    code = (
+        "import time; started = time.perf_counter(); "
+        f"import {module_path}; print(time.perf_counter() - started)"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import failed")
+    return float(result.stdout.strip())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report cold-start import cost of PersonaX modules")
+    parser.add_argument("modules", nargs="*", help="plugin names (default: all, plus the startup path)")
+    parser.add_argument("--budget-ms", type=float, help="exit non-zero if any import exceeds this many milliseconds")
+    args = parser.parse_args(argv)
+
+    targets = [get(name).module_path for name in args.modules] or (
+        ["modules.investigation"] + [plugin.module_path for plugin in PLUGINS]
+    )
+    over_budget = False
+    for module_path in targets:
+        try:
+            ms = measure_cold_import(module_path) * 1000
+        except RuntimeError as e:
+            print(f"{module_path:<40} failed: {e}")
+            over_budget = True
+            continue
+        flag = ""
+        if args.budget_ms is not None and ms > args.budget_ms:
+            flag = "  OVER BUDGET"
+            over_budget = True
+        print(f"{module_path:<40} {ms:8.1f} ms{flag}")
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
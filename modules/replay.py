@@ -0,0 +1,398 @@
+import asyncio
+import base64
+import gzip
+import hashlib
+import json
+import threading
+import time
+from email.message import Message
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from modules import cancel, telemetry, retry
+
+# Record/replay of HTTP traffic. While recording, every request that goes
+# through fetch (requests or aiohttp) is sent for real and its response is
+# kept; replaying serves the same responses back from the archive, after the
+# recorded delay scaled by latency_scale (0 for no delay). Archives are gzipped
+# JSON lines: one header line, then one line per exchange or DNS answer.
+
+ARCHIVE_VERSION = 1
+# Bodies beyond this many bytes are cut short in the archive
+MAX_RECORDED_BYTES = 8 * 1024 * 1024
+RECORD_CHUNK_SIZE = 64 * 1024
+
+
+class ReplayMiss(requests.ConnectionError):
+    """The archive holds no response for a request"""
+
+
+def request_key(method, url, params=None, data=None, json=None, files=None):
+    """The method and full URL a request is filed under, plus a digest of any body it sends"""
+    if params:
+        url = requests.Request(method, url, params=params).prepare().url
+    key = f"{method.upper()} {url}"
+    if data is not None or json is not None or files:
+        # POSTs to one endpoint differ only by body, so each body is filed apart
+        digest = hashlib.sha256()
+        for part in (data, json, files):
+            _digest_body(digest, part)
+        key += f" #{digest.hexdigest()[:16]}"
+    return key
+
+
+def _key_for(method, url, kwargs):
+    return request_key(method, url, kwargs.get("params"), kwargs.get("data"), kwargs.get("json"), kwargs.get("files"))
+
+
+def _digest_body(digest, value):
+    if isinstance(value, dict):
+        value = sorted(value.items(), key=lambda item: str(item[0]))
+    if isinstance(value, (list, tuple)):
+        for item in value:
+            _digest_body(digest, item)
+    elif hasattr(value, "read") and hasattr(value, "seek"):
+        # Uploaded files are hashed by content and rewound for the real send
+        position = value.tell()
+        content = value.read()
+        value.seek(position)
+        digest.update(content.encode("utf-8") if isinstance(content, str) else content)
+    elif isinstance(value, (bytes, bytearray)):
+        digest.update(value)
+    else:
+        digest.update(repr(value).encode("utf-8"))
+    digest.update(b"\0")
+
+
+class Archive:
+    """Recorded exchanges keyed by request; safe to use from any thread"""
+
+    def __init__(self, path, replaying, latency_scale=1.0):
+        self.path = path
+        self.replaying = replaying
+        self.latency_scale = latency_scale
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = {}   # key -> recorded exchanges, in order
+        self._served = {}    # key -> exchanges already replayed
+        self._recorded = []
+        self._resolved = {}  # host -> addresses, () for a name that does not exist
+        if replaying:
+            self._load()
+
+    def _load(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            if header.get("version") != ARCHIVE_VERSION:
+                raise ValueError(f"{self.path}: unsupported archive version {header.get('version')}")
+            for line in f:
+                entry = json.loads(line)
+                if "addresses" in entry:
+                    self._resolved[entry["host"]] = tuple(entry["addresses"])
+                else:
+                    self._entries.setdefault(entry["key"], []).append(entry)
+
+    def add(self, key, status, reason, url, headers, body, elapsed, history=()):
+        entry = {
+            "key": key,
+            "status": status,
+            "reason": reason,
+            "url": url,
+            "headers": list(headers),
+            "body": base64.b64encode(body[:MAX_RECORDED_BYTES]).decode("ascii"),
+            "elapsed": round(elapsed, 4),
+            "history": [list(step) for step in history],
+        }
+        with self._lock:
+            self._recorded.append(entry)
+        return entry
+
+    def add_error(self, key, error, elapsed, message=None):
+        """Record a request that failed, so replay fails it after the same delay"""
+        entry = {"key": key, "error": message or str(error), "elapsed": round(elapsed, 4)}
+        if retry.name_not_resolved(error):
+            entry["unresolved"] = True
+        with self._lock:
+            self._recorded.append(entry)
+
+    def add_resolved(self, host, addresses):
+        with self._lock:
+            if host not in self._resolved:
+                self._resolved[host] = addresses
+                self._recorded.append({"host": host, "addresses": list(addresses)})
+
+    def resolved(self, host):
+        """Recorded DNS answer for host; None (a failed lookup) when there is none"""
+        with self._lock:
+            return self._resolved.get(host)
+
+    def take(self, key):
+        """The next recorded exchange for key; the last one repeats once they run out"""
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.misses += 1
+                raise ReplayMiss(f"No recorded response for {key}")
+            served = self._served.get(key, 0)
+            self._served[key] = served + 1
+            return entries[min(served, len(entries) - 1)]
+
+    def delay(self, entry):
+        return entry["elapsed"] * self.latency_scale
+
+    def save(self):
+        if self.replaying:
+            return
+        with self._lock:
+            entries = list(self._recorded)
+        with gzip.open(self.path, "wt", encoding="utf-8") as f:
+            f.write(json.dumps({"version": ARCHIVE_VERSION, "created": time.time(), "exchanges": len(entries)}) + "\n")
+            for entry in entries:
+                f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+    def __len__(self):
+        with self._lock:
+            return len(self._recorded) if not self.replaying else sum(map(len, self._entries.values()))
+
+
+_archive = None
+
+
+def current():
+    """The archive being recorded or replayed, if any"""
+    return _archive
+
+
+def start_recording(path):
+    global _archive
+    _archive = Archive(path, replaying=False)
+    return _archive
+
+
+def start_replay(path, latency_scale=1.0):
+    global _archive
+    _archive = Archive(path, replaying=True, latency_scale=latency_scale)
+    return _archive
+
+
+def stop():
+    """Stop recording or replaying; a recording is written out"""
+    global _archive
+    archive, _archive = _archive, None
+    if archive is not None:
+        archive.save()
+    return archive
+
+
+def _body(entry):
+    return base64.b64decode(entry["body"])
+
+
+def build_response(entry, request=None):
+    """A requests.Response carrying a recorded exchange, body already loaded"""
+    response = requests.Response()
+    response.status_code = entry["status"]
+    response.reason = entry["reason"]
+    response.url = entry["url"]
+    response.headers = CaseInsensitiveDict(entry["headers"])
+    response.encoding = get_encoding_from_headers(response.headers)
+    response._content = _body(entry)
+    response._content_consumed = True
+    response.request = request
+    for status, url, location in entry["history"]:
+        step = requests.Response()
+        step.status_code, step.url = status, url
+        step.headers = CaseInsensitiveDict({"Location": location} if location else {})
+        step._content, step._content_consumed = b"", True
+        response.history.append(step)
+    return response
+
+
+def replayed_error(entry, error_class=requests.ConnectionError):
+    """The error a recorded failure is replayed as; failed name lookups keep their kind so they are not retried"""
+    if entry.get("unresolved"):
+        return retry.NameNotResolved(entry["error"])
+    return error_class(entry["error"])
+
+
+def request(archive, session, method, url, target=None, limit=MAX_RECORDED_BYTES, **kwargs):
+    """Record or replay one requests call; target is the URL actually sent when recording.
+
+    Streamed bodies are recorded up to limit bytes, the most a reader is allowed to take.
+    """
+    key = _key_for(method, url, kwargs)
+    if archive.replaying:
+        entry = archive.take(key)
+        cancel.sleep(archive.delay(entry))
+        if "error" in entry:
+            raise replayed_error(entry)
+        return build_response(entry)
+
+    started = time.perf_counter()
+    try:
+        response = session.request(method, target or url, **kwargs)
+        # The body is read so it can be stored; later reads come from memory
+        if kwargs.get("stream"):
+            # One byte past the limit, so a replayed reader still sees the body was cut
+            body = _take(response.iter_content(RECORD_CHUNK_SIZE), limit + 1)
+            response.close()
+            response._content, response._content_consumed = body, True
+        else:
+            response.content
+    except requests.RequestException as e:
+        archive.add_error(key, e, time.perf_counter() - started)
+        raise
+    archive.add(
+        key, response.status_code, response.reason, response.url, response.headers.items(), response.content,
+        time.perf_counter() - started,
+        [(step.status_code, step.url, step.headers.get("Location", "")) for step in response.history],
+    )
+    return response
+
+
+class _Content:
+    """The parts of aiohttp's StreamReader the modules use"""
+
+    def __init__(self, body):
+        self._body = body
+
+    async def iter_chunked(self, size):
+        for start in range(0, len(self._body), size):
+            yield self._body[start:start + size]
+
+    async def read(self):
+        return self._body
+
+
+class ArchiveResponse:
+    """Stand-in for aiohttp.ClientResponse built from a recorded exchange"""
+
+    def __init__(self, entry):
+        import yarl
+        from multidict import CIMultiDict, CIMultiDictProxy
+
+        self.status = entry["status"]
+        self.reason = entry["reason"]
+        self.url = yarl.URL(entry["url"], encoded=True)
+        self.headers = CIMultiDictProxy(CIMultiDict(entry["headers"]))
+        self._body = _body(entry)
+        self.content = _Content(self._body)
+        length = self.headers.get("Content-Length")
+        self.content_length = int(length) if length and length.isdigit() else None
+
+    @property
+    def charset(self):
+        message = Message()
+        message["Content-Type"] = self.headers.get("Content-Type", "")
+        return message.get_param("charset")
+
+    async def read(self):
+        return self._body
+
+    async def text(self, encoding=None):
+        return self._body.decode(encoding or self.charset or "utf-8", errors="replace")
+
+    async def json(self, **kwargs):
+        return json.loads(await self.text())
+
+    def release(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _ArchiveRequest:
+    def __init__(self, session, method, url, kwargs):
+        self._session = session
+        self._args = (method, url, kwargs)
+
+    async def __aenter__(self):
+        return await self._session._exchange(*self._args)
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class ArchiveSession:
+    """Stand-in for aiohttp.ClientSession that records through session, or replays when it is None"""
+
+    def __init__(self, archive, session=None, limit=MAX_RECORDED_BYTES):
+        self.archive = archive
+        self.session = session
+        # Bodies are recorded up to this many bytes, the most a reader is allowed to take
+        self.limit = limit
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+
+    def request(self, method, url, **kwargs):
+        return _ArchiveRequest(self, method, str(url), kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.request("HEAD", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    async def _exchange(self, method, url, kwargs):
+        key = _key_for(method, url, kwargs)
+        host = url.split("://", 1)[-1].split("/", 1)[0].split(":")[0]
+        with telemetry.span("fetch", host=host, retries=retry.current_attempt()) as span:
+            if self.archive.replaying:
+                entry = self.archive.take(key)
+                await asyncio.sleep(self.archive.delay(entry))
+                if "error" in entry:
+                    raise replayed_error(entry, ConnectionError)
+            else:
+                entry = await self._record(key, method, url, kwargs)
+            response = ArchiveResponse(entry)
+            span.status = response.status
+            span.bytes = len(response._body)
+        return response
+
+    async def _record(self, key, method, url, kwargs):
+        started = time.perf_counter()
+        try:
+            async with self.session.request(method, url, **kwargs) as response:
+                body = await _read_up_to(response, self.limit + 1)
+        except Exception as e:
+            self.archive.add_error(key, e, time.perf_counter() - started, f"{type(e).__name__}: {e}")
+            raise
+        history = [(step.status, str(step.url), step.headers.get("Location", "")) for step in response.history]
+        return self.archive.add(key, response.status, response.reason, str(response.url),
+                                response.headers.items(), body, time.perf_counter() - started, history)
+
+
+def _take(chunks, limit):
+    parts = []
+    size = 0
+    for chunk in chunks:
+        parts.append(chunk[:limit - size])
+        size += len(parts[-1])
+        if size >= limit:
+            break
+    return b"".join(parts)
+
+
+async def _read_up_to(response, limit):
+    parts = []
+    size = 0
+    async for chunk in response.content.iter_chunked(RECORD_CHUNK_SIZE):
+        parts.append(chunk[:limit - size])
+        size += len(parts[-1])
+        if size >= limit:
+            break
+    return b"".join(parts)
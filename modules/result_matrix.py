@@ -0,0 +1,82 @@
+class ResultMatrix:
+    """Site x username scan results packed into one bit per cell.
+
+    Each site owns a row of ceil(len(usernames) / 8) bytes, so memory grows by
+    one bit per check and whole-row queries run on Python ints. A cell is
+    checked once its site answered, and unchecked when the check failed.
+    """
+
+    def __init__(self, site_names, usernames):
+        self.site_names = list(site_names)
+        self.usernames = list(usernames)
+        self._row_bytes = (len(self.usernames) + 7) // 8
+        self._found = bytearray(len(self.site_names) * self._row_bytes)
+        self._checked = bytearray(len(self.site_names) * self._row_bytes)
+        self._unchecked = bytearray(len(self.site_names) * self._row_bytes)
+        self._site_index = {name: i for i, name in enumerate(self.site_names)}
+        self._user_index = {name: j for j, name in enumerate(self.usernames)}
+
+    def set(self, site_index, user_index, found):
+        """Record a check; found None means the site could not be checked"""
+        offset = site_index * self._row_bytes + (user_index >> 3)
+        bit = 1 << (user_index & 7)
+        if found is None:
+            self._unchecked[offset] |= bit
+            return
+        self._checked[offset] |= bit
+        if found:
+            self._found[offset] |= bit
+
+    def is_found(self, site_name, username):
+        user_index = self._user_index[username]
+        offset = self._site_index[site_name] * self._row_bytes + (user_index >> 3)
+        return bool(self._found[offset] & (1 << (user_index & 7)))
+
+    def _row(self, bits, site_index):
+        start = site_index * self._row_bytes
+        return int.from_bytes(bits[start:start + self._row_bytes], "little")
+
+    def _usernames_in(self, mask):
+        return [name for j, name in enumerate(self.usernames) if mask >> j & 1]
+
+    def sites_hit_any(self):
+        """Sites where at least one username was found"""
+        return [name for i, name in enumerate(self.site_names) if self._row(self._found, i)]
+
+    def usernames_hit_all(self):
+        """Usernames found on every site"""
+        mask = (1 << len(self.usernames)) - 1
+        for i in range(len(self.site_names)):
+            mask &= self._row(self._found, i)
+            if not mask:
+                return []
+        return self._usernames_in(mask)
+
+    def usernames_for(self, site_name):
+        return self._usernames_in(self._row(self._found, self._site_index[site_name]))
+
+    def sites_for(self, username):
+        return [name for name in self.site_names if self.is_found(name, username)]
+
+    def hit_counts(self):
+        """Number of sites each username was found on"""
+        counts = [0] * len(self.usernames)
+        for i in range(len(self.site_names)):
+            row = self._row(self._found, i)
+            while row:
+                low = row & -row
+                counts[low.bit_length() - 1] += 1
+                row ^= low
+        return dict(zip(self.usernames, counts))
+
+    def found_count(self):
+        return sum(bin(byte).count("1") for byte in self._found)
+
+    def checked_count(self):
+        return sum(bin(byte).count("1") for byte in self._checked)
+
+    def unchecked_count(self):
+        return sum(bin(byte).count("1") for byte in self._unchecked)
+
+    def nbytes(self):
+        return len(self._found) + len(self._checked) + len(self._unchecked)
@@ -0,0 +1,129 @@
+from collections import Counter
+from dataclasses import dataclass, fields
+
+# Typed result records shared by every module. Module results keep their
+# summary keys and carry the records under "records".
+
+
+@dataclass(slots=True)
+class Hit:
+    """A link or listing that mentions the target"""
+    source: str
+    url: str
+    title: str = ""
+    query: str = ""
+
+
+@dataclass(slots=True)
+class Profile:
+    """An account or directory entry that belongs to the target"""
+    source: str
+    url: str = ""
+    username: str = ""
+    name: str = ""
+    description: str = ""
+    location: str = ""
+    followers: str = ""
+    following: str = ""
+
+
+@dataclass(slots=True)
+class Post:
+    source: str
+    text: str = ""
+    date: str = ""
+    likes: str = ""
+    url: str = ""
+
+
+@dataclass(slots=True)
+class Location:
+    source: str
+    location: str = ""
+    latitude: float = None
+    longitude: float = None
+
+
+@dataclass(slots=True)
+class Breach:
+    """A breach-database entry for the target"""
+    source: str
+    name: str
+    date: str = ""
+    details: str = ""
+    query: str = ""
+
+
+RECORD_TYPES = (Hit, Profile, Post, Location, Breach)
+RECORD_TYPES_BY_NAME = {kind.__name__: kind for kind in RECORD_TYPES}
+FIELDS = {kind: tuple(field.name for field in fields(kind)) for kind in RECORD_TYPES}
+
+
+def hits_from(items, query=""):
+    """Hits from the {'url', 'title', 'source'} dicts the search modules collect"""
+    return [
+        Hit(item.get('source', ''), item['url'], item.get('title', ''), query)
+        for item in items if item.get('url')
+    ]
+
+
+def records_of(result):
+    """Records carried by one module result; anything else has none"""
+    if isinstance(result, dict):
+        return result.get("records") or []
+    return []
+
+
+def collect(results):
+    """All records from an investigation's label -> result mapping, keyed by label"""
+    return {label: records_of(result) for label, result in results.items()}
+
+
+def count_by_type(records):
+    return Counter(type(record).__name__ for record in records)
+
+
+def to_dict(record):
+    row = {"type": type(record).__name__}
+    row.update((name, getattr(record, name)) for name in FIELDS[type(record)])
+    return row
+
+
+def record_key(record):
+    """Hashable identity of a record, for spotting ones already seen"""
+    return (type(record).__name__,) + tuple(getattr(record, name) for name in FIELDS[type(record)])
+
+
+def jsonable(value):
+    """json.dumps default= hook that writes records as plain objects"""
+    if type(value) in FIELDS:
+        return to_dict(value)
+    return str(value)
+
+
+def to_columns(records):
+    """Pack records into one column list per field, grouped by record type.
+
+    {"Hit": {"source": [...], "url": [...], ...}, "Profile": {...}} keeps each
+    field's values contiguous, which is cheaper to store and to aggregate than
+    a list of per-row dicts.
+    """
+    columns = {}
+    for record in records:
+        kind = type(record)
+        table = columns.get(kind.__name__)
+        if table is None:
+            table = columns[kind.__name__] = {name: [] for name in FIELDS[kind]}
+        for name in FIELDS[kind]:
+            table[name].append(getattr(record, name))
+    return columns
+
+
+def from_columns(columns):
+    """Rebuild records from to_columns() output"""
+    records = []
+    for kind_name, table in columns.items():
+        kind = RECORD_TYPES_BY_NAME[kind_name]
+        names = FIELDS[kind]
+        records.extend(kind(*row) for row in zip(*(table[name] for name in names)))
+    return records
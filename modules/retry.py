@@ -0,0 +1,183 @@
+import asyncio
+import contextvars
+import random
+import socket
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+
+import requests
+
+# Retries of transient failures. A 429 or 5xx answer, or a connection that
+# failed before anything came back, is retried after a jittered exponential
+# backoff, or after as long as a Retry-After header asks. A host name that
+# does not resolve is not retried; the health circuits deal with dead hosts.
+# Each source draws
+# its retries from a budget that grows with its requests, so a host that keeps
+# failing costs a few retries rather than stalling the investigation.
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Only requests that are safe to send twice are retried
+RETRY_METHODS = ("GET", "HEAD", "OPTIONS")
+# Attempts per request, the first one included
+MAX_ATTEMPTS = 3
+# The wait before retry n is uniform in [0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** n)]
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+# A longer Retry-After is not waited out; the answer is returned as it is
+MAX_RETRY_AFTER = 30.0
+# Per source: retries allowed in a window are BUDGET_RATIO of its requests plus BUDGET_MIN
+BUDGET_RATIO = 0.2
+BUDGET_MIN = 10
+BUDGET_WINDOW = 10.0
+
+
+def retry_after(headers):
+    """Seconds a Retry-After header asks to wait, or None"""
+    value = (headers or {}).get("Retry-After")
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class NameNotResolved(requests.ConnectionError):
+    """A replayed request whose host name could not be resolved when it was recorded"""
+
+
+def name_not_resolved(error):
+    """Whether error, or an error it wraps, is a failed host name lookup"""
+    pending, seen = [error], set()
+    while pending:
+        error = pending.pop()
+        if not isinstance(error, BaseException) or id(error) in seen:
+            continue
+        seen.add(id(error))
+        if isinstance(error, (socket.gaierror, NameNotResolved)):
+            return True
+        # requests wraps urllib3's errors in args and .reason, aiohttp keeps the OSError in .os_error
+        pending += [getattr(error, "reason", None), getattr(error, "os_error", None),
+                    error.__cause__, error.__context__, *error.args]
+    return False
+
+
+def backoff(attempt):
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+def retryable_error(error, connection_errors):
+    """Whether error is a failed connection rather than a timeout or anything else"""
+    if isinstance(error, (requests.Timeout, TimeoutError, asyncio.TimeoutError)):
+        # The host was reached and is slow; waiting for it again would double the delay
+        return False
+    if name_not_resolved(error):
+        # The resolver has already retried; a missing name stays missing
+        return False
+    return isinstance(error, connection_errors)
+
+
+class Budget:
+    """Retries one source may spend: a share of its recent requests plus a floor"""
+
+    def __init__(self, ratio=BUDGET_RATIO, minimum=BUDGET_MIN, window=BUDGET_WINDOW):
+        self.ratio = ratio
+        self.minimum = minimum
+        self.window = window
+        self.exhausted = 0
+        self._requests = deque()
+        self._retries = deque()
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        for times in (self._requests, self._retries):
+            while times and times[0] <= now - self.window:
+                times.popleft()
+
+    def add_request(self):
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            self._requests.append(now)
+
+    def try_spend(self):
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            if len(self._retries) >= self.minimum + self.ratio * len(self._requests):
+                self.exhausted += 1
+                return False
+            self._retries.append(now)
+            return True
+
+    def stats(self):
+        with self._lock:
+            self._expire(time.monotonic())
+            return {"requests": len(self._requests), "retries": len(self._retries), "exhausted": self.exhausted}
+
+
+_budgets = {}
+_budgets_lock = threading.Lock()
+
+
+def budget(source):
+    """The retry budget of source (a telemetry source name)"""
+    with _budgets_lock:
+        found = _budgets.get(source)
+        if found is None:
+            found = _budgets[source] = Budget()
+        return found
+
+
+def budget_stats():
+    with _budgets_lock:
+        budgets = dict(_budgets)
+    return {source: found.stats() for source, found in sorted(budgets.items())}
+
+
+def next_delay(method, attempt, source, status=None, headers=None, error=None, connection_errors=()):
+    """Seconds to wait before retrying attempt (counted from 0), or None to give up.
+
+    Pass the answer's status and headers, or the error the attempt raised.
+    """
+    if method.upper() not in RETRY_METHODS or attempt + 1 >= MAX_ATTEMPTS:
+        return None
+    if error is not None:
+        if not retryable_error(error, connection_errors):
+            return None
+        delay = backoff(attempt)
+    elif status in RETRY_STATUSES:
+        delay = retry_after(headers)
+        if delay is None:
+            delay = backoff(attempt)
+        elif delay > MAX_RETRY_AFTER:
+            return None
+        else:
+            # Clients told the same Retry-After should not all come back at once
+            delay += random.uniform(0, BACKOFF_BASE)
+    else:
+        return None
+    return delay if budget(source).try_spend() else None
+
+
+_attempt = contextvars.ContextVar("retry_attempt", default=0)
+
+
+def current_attempt():
+    """Retries before the request being sent in this context: 0 for a first attempt"""
+    return _attempt.get()
+
+
+@contextmanager
+def attempt(number):
+    reset = _attempt.set(number)
+    try:
+        yield number
+    finally:
+        _attempt.reset(reset)
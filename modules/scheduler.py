@@ -0,0 +1,160 @@
+import inspect
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from modules import cancel, telemetry
+
+
+class Task:
+    """A module run scheduled as part of an investigation"""
+
+    def __init__(self, label, func, key, depends_on=(), timeout=60):
+        self.label = label
+        self.func = func
+        self.key = key
+        self.depends_on = tuple(depends_on)
+        self.timeout = timeout
+
+    def is_active(self, data):
+        return bool(data.get(self.key))
+
+
+class InvestigationScheduler:
+    """Run independent modules concurrently and dependent modules once their inputs are ready.
+
+    Every task gets its own deadline and the investigation as a whole gets an
+    overall deadline. A task that overruns is reported as an error, its
+    CancelToken is cancelled so its requests and pools stop, and its dependents
+    are started with whatever upstream results are available.
+    """
+
+    def __init__(self, tasks, deadline=180, max_workers=None):
+        self.tasks = list(tasks)
+        self.deadline = deadline
+        self.max_workers = max_workers or max(len(self.tasks), 1)
+        labels = {task.label for task in self.tasks}
+        for task in self.tasks:
+            missing = [dep for dep in task.depends_on if dep not in labels]
+            if missing:
+                raise ValueError(f"{task.label} depends on unknown task(s): {', '.join(missing)}")
+
+    def active_tasks(self, data):
+        return [task for task in self.tasks if task.is_active(data)]
+
+    def run(self, data, on_complete=None, on_poll=None, poll_interval=0.1):
+        """Run all active tasks and return a dict of label -> result.
+
+        on_complete(label, result) is called as each task finishes; on_poll() is
+        called from the scheduling thread at least every poll_interval seconds.
+        A CancelToken in data["cancel"] stops the run within poll_interval and
+        reports every unfinished task as cancelled; each task runs under its own
+        token, cancelled with the investigation's or when the task overruns. A telemetry.Recorder in
+        data["telemetry"] receives a span per task and for everything it fetches.
+        """
+        token = data.get("cancel")
+        tasks = self.active_tasks(data)
+        active = {task.label for task in tasks}
+        results = {}
+        pending = {}  # future -> (task, started_at)
+        tokens = {}  # label -> the task's CancelToken
+        unregister = []
+        waiting = list(tasks)
+        started = time.monotonic()
+        overall_deadline = started + self.deadline
+
+        def finish(task, result):
+            results[task.label] = result
+            if on_complete:
+                on_complete(task.label, result)
+
+        def stop(future, task, result):
+            # The worker thread cannot be killed; cancelling its token stops its
+            # requests and pools, and its late result is discarded
+            future.cancel()
+            tokens[task.label].cancel()
+            finish(task, result)
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            while waiting or pending:
+                # Start every task whose active dependencies have finished
+                for task in list(waiting):
+                    deps = [dep for dep in task.depends_on if dep in active]
+                    if all(dep in results for dep in deps):
+                        waiting.remove(task)
+                        task_data = dict(data)
+                        task_data["upstream"] = {dep: results[dep] for dep in deps}
+                        task_data["cancel"] = tokens[task.label] = cancel.CancelToken()
+                        if token is not None:
+                            unregister.append(token.on_cancel(task_data["cancel"].cancel))
+                        if hasattr(data.get("reporter"), "for_task"):
+                            task_data["reporter"] = data["reporter"].for_task(task.label)
+                        future = executor.submit(self._call, task.label, task.func, task_data)
+                        pending[future] = (task, time.monotonic())
+
+                if not pending:
+                    break
+
+                now = time.monotonic()
+                next_deadline = min(
+                    [started_at + task.timeout for task, started_at in pending.values()] + [overall_deadline]
+                )
+                timeout = max(next_deadline - now, 0)
+                if on_poll or token is not None:
+                    timeout = min(timeout, poll_interval)
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if on_poll:
+                    on_poll()
+
+                for future in done:
+                    task, _ = pending.pop(future)
+                    try:
+                        finish(task, future.result())
+                    except Exception as e:
+                        # Pools torn down by a cancel fail with CancelledError; report the cause
+                        if token is not None and token.cancelled:
+                            e = cancel.Cancelled()
+                        finish(task, f"Error: {str(e)}")
+
+                if token is not None and token.cancelled:
+                    for future, (task, _) in list(pending.items()):
+                        stop(future, task, "Error: Cancelled")
+                    for task in waiting:
+                        finish(task, "Error: Cancelled")
+                    pending.clear()
+                    waiting.clear()
+                    break
+
+                now = time.monotonic()
+                if now >= overall_deadline:
+                    for future, (task, _) in list(pending.items()):
+                        stop(future, task, f"Error: Investigation deadline of {self.deadline}s exceeded")
+                    for task in waiting:
+                        finish(task, f"Error: Investigation deadline of {self.deadline}s exceeded")
+                    pending.clear()
+                    waiting.clear()
+                    break
+
+                for future, (task, started_at) in list(pending.items()):
+                    if now - started_at >= task.timeout:
+                        del pending[future]
+                        stop(future, task, f"Error: Timed out after {task.timeout}s")
+        finally:
+            for callback in unregister:
+                callback()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return results
+
+    @staticmethod
+    def _call(label, func, data):
+        # The module's own pools and requests pick the token and recorder up from this context
+        with cancel.using(data.get("cancel")), telemetry.using(data.get("telemetry"), label), \
+                telemetry.span("module") as span:
+            result = func(data)
+            if inspect.isawaitable(result):
+                # Each async module gets its own event loop in its worker thread
+                import asyncio
+                result = asyncio.run(cancel.cancellable(result))
+            span.error = telemetry.outcome(result)
+            return result
@@ -0,0 +1,84 @@
+import codecs
+from html.parser import HTMLParser
+from urllib.parse import urlsplit, parse_qs
+
+from modules import cancel, telemetry
+
+# Incremental extraction of result links from search-engine result pages
+
+# Elements that follow the organic results on Google result pages
+RESULT_END_IDS = {"botstuff", "bottomads", "foot", "footcnt"}
+CHUNK_SIZE = 8192
+
+
+def unwrap_redirect(href):
+    """Return the target of a /url?q= redirect wrapper, or href unchanged"""
+    parts = urlsplit(href)
+    if parts.path == "/url" and (not parts.netloc or parts.netloc.endswith("google.com")):
+        query = parse_qs(parts.query)
+        target = query.get("q") or query.get("url")
+        if target:
+            return target[0]
+    return href
+
+
+def host_matches(url, domain):
+    host = (urlsplit(url).hostname or "").lower()
+    return host == domain or host.endswith("." + domain)
+
+
+class ResultLinkParser(HTMLParser):
+    """Collect anchor targets on the given domain(s) until the result block ends"""
+
+    def __init__(self, domains):
+        super().__init__(convert_charrefs=True)
+        if isinstance(domains, str):
+            domains = [domains]
+        self.domains = [domain.lower() for domain in domains]
+        self.links = []
+        self.done = False
+        self._seen = set()
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if tag == "a":
+            for name, value in attrs:
+                if name == "href" and value:
+                    url = unwrap_redirect(value)
+                    if url not in self._seen and any(host_matches(url, domain) for domain in self.domains):
+                        self._seen.add(url)
+                        self.links.append(url)
+                    break
+            return
+        for name, value in attrs:
+            if name == "id" and value in RESULT_END_IDS:
+                self.done = True
+                return
+
+
+def extract_links(response, domains):
+    """Stream a result page through the parser and stop once the results are over"""
+    parser = ResultLinkParser(domains)
+    decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+    try:
+        host = urlsplit(response.url or "").hostname or ""
+        with telemetry.span("parse", host=host, status=response.status_code) as span, \
+                cancel.closing_on_cancel(response):
+            for chunk in response.iter_content(CHUNK_SIZE):
+                cancel.check()
+                span.bytes += len(chunk)
+                parser.feed(decoder.decode(chunk))
+                if parser.done:
+                    break
+            else:
+                parser.feed(decoder.decode(b"", final=True))
+    finally:
+        response.close()
+    return parser.links
+
+
+def extract_links_from_text(html, domains):
+    parser = ResultLinkParser(domains)
+    parser.feed(html)
+    return parser.links
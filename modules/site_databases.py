@@ -0,0 +1,188 @@
+import json
+import os
+import threading
+from urllib.parse import urlsplit
+
+from modules import fetch, cache
+from modules.site_registry import SITES, PLACEHOLDER, check_entry, compile_entry
+
+# Maigret's and Sherlock's site databases, turned into registry sites so the
+# username hunter probes them with its own engine. Each data file is
+# downloaded once and kept in the result cache; a file from an old tools/
+# checkout is used when the download fails. Sites already in sites.json (by
+# name or URL) keep our definition, and Sherlock's come before Maigret's.
+
+SHERLOCK_DATA = "https://raw.githubusercontent.com/sherlock-project/sherlock/master/sherlock_project/resources/data.json"
+MAIGRET_DATA = "https://raw.githubusercontent.com/soxoj/maigret/main/maigret/resources/data.json"
+# Maigret lists thousands of sites; like Maigret itself, only the most popular are checked
+MAIGRET_TOP_SITES = 500
+# Absence markers can sit anywhere in a page, so imported marker rules read further than ours
+SCAN_BYTES = 512 * 1024
+TOOLS_DIR = "tools"
+
+
+def _placeholder_in_host(url):
+    return PLACEHOLDER in url.split("://", 1)[-1].split("/", 1)[0]
+
+
+def _entry(name, url, detect, tags=(), headers=None, username_pattern=None):
+    """A sites.json-style entry, with the subdomain tag where the username is part of the host"""
+    tags = sorted({str(tag).lower() for tag in tags} | ({"subdomain"} if _placeholder_in_host(url) else set()))
+    entry = {"name": name, "url": url, "detect": detect, "tags": tags,
+             "probe": "get" if detect["type"] == "marker" else "head"}
+    if headers:
+        entry["headers"] = headers
+    if username_pattern:
+        entry["username_pattern"] = username_pattern
+    return entry
+
+
+def sherlock_entries(data):
+    """sites.json-style entries from Sherlock's data.json; sites needing another request shape are left out"""
+    entries = []
+    for name, site in data.items():
+        if not isinstance(site, dict) or "url" not in site:
+            continue
+        if site.get("urlProbe") or site.get("request_payload") or site.get("request_method", "GET") not in ("GET", "HEAD"):
+            continue
+        kinds = site.get("errorType")
+        kinds = [kinds] if isinstance(kinds, str) else list(kinds or ())
+        if "message" in kinds and site.get("errorMsg"):
+            detect = {"type": "marker", "absent": site["errorMsg"], "scan_bytes": SCAN_BYTES}
+        elif "response_url" in kinds:
+            # Not following the redirect: any redirect means there is no such user
+            detect = {"type": "redirect"}
+        elif "status_code" in kinds:
+            detect = {"type": "status"}
+        else:
+            continue
+        entries.append(_entry(name, site["url"].replace("{}", PLACEHOLDER), detect,
+                              ["nsfw"] if site.get("isNSFW") else (), site.get("headers"), site.get("regexCheck")))
+    return entries
+
+
+def maigret_entries(data, top=MAIGRET_TOP_SITES):
+    """sites.json-style entries for the top Maigret sites by rank, with engine templates filled in"""
+    engines = data.get("engines", {})
+    sites = []
+    for name, site in data.get("sites", {}).items():
+        if site.get("engine") in engines:
+            site = dict(engines[site["engine"]].get("site", {}), **site)
+        if site.get("disabled") or site.get("type", "username") != "username" or site.get("urlProbe"):
+            continue
+        if "url" not in site:
+            continue
+        sites.append((site.get("alexaRank") or float("inf"), name, site))
+    sites.sort(key=lambda ranked: ranked[0])
+
+    entries = []
+    for _, name, site in sites[:top]:
+        url = site["url"].replace("{urlMain}", site.get("urlMain", "")).replace("{urlSubpath}", site.get("urlSubpath", ""))
+        check = site.get("checkType")
+        if check == "message" and (site.get("presenseStrs") or site.get("absenceStrs")):
+            detect = {"type": "marker", "present": site.get("presenseStrs"), "absent": site.get("absenceStrs"),
+                      "scan_bytes": SCAN_BYTES}
+        elif check == "response_url":
+            detect = {"type": "redirect"}
+        elif check in ("status_code", "message"):
+            detect = {"type": "status"}
+        else:
+            continue
+        entries.append(_entry(name, url, detect, site.get("tags", ()), site.get("headers"), site.get("regexCheck")))
+    return entries
+
+
+# (name, data file URL, entry converter, the file's paths in an old tools/ checkout)
+DATABASES = (
+    ("Sherlock", SHERLOCK_DATA, sherlock_entries,
+     ("sherlock/sherlock_project/resources/data.json", "sherlock/sherlock/resources/data.json")),
+    ("Maigret", MAIGRET_DATA, maigret_entries, ("maigret/maigret/resources/data.json",)),
+)
+
+
+def download(url):
+    response = fetch.get(url)
+    response.raise_for_status()
+    return response.text
+
+
+def read_database(name, url, checkouts):
+    """The data file's text: cached, downloaded, or from a checkout when the download fails"""
+    try:
+        return cache.cached("site_databases", name, url, lambda: download(url),
+                            classify_result=lambda text: cache.OK)
+    except Exception:
+        for path in checkouts:
+            path = os.path.join(TOOLS_DIR, path)
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    return f.read()
+        raise
+
+
+def site_key(url):
+    """URL template reduced to what tells two sites apart"""
+    parts = urlsplit(url.lower())
+    host = parts.netloc[4:] if parts.netloc.startswith("www.") else parts.netloc
+    return host + parts.path.rstrip("/") + (f"?{parts.query}" if parts.query else "")
+
+
+def compile_entries(entries, names, keys):
+    """Sites for the valid entries not already known by name or URL; names and keys are updated"""
+    sites, skipped = [], 0
+    for entry in entries:
+        try:
+            check_entry(entry, entry.get("name", "?"))
+            site = compile_entry(entry)
+        except (ValueError, KeyError, TypeError, AttributeError):
+            skipped += 1
+            continue
+        key = site_key(site.url_template)
+        if site.name.lower() in names or key in keys:
+            continue
+        names.add(site.name.lower())
+        keys.add(key)
+        sites.append(site)
+    return sites, skipped
+
+
+_entries = {}  # database name -> converted entries, kept for the life of the process
+_extended = None  # extended_sites() once every database has loaded
+_lock = threading.Lock()
+
+
+def database_entries(name, url, convert, checkouts):
+    with _lock:
+        if name not in _entries:
+            _entries[name] = convert(json.loads(read_database(name, url, checkouts)))
+        return _entries[name]
+
+
+def extended_sites(databases=DATABASES):
+    """Our sites plus every database's new ones.
+
+    Returns (sites, site name -> database it came from, database -> summary);
+    a database that could not be loaded is summarized by its error and retried next time.
+    """
+    global _extended
+    if _extended is not None and databases is DATABASES:
+        return _extended
+    sites = list(SITES)
+    origins = {site.name: "PersonaX" for site in SITES}
+    summary = {"PersonaX": {"sites": len(SITES)}}
+    names = {site.name.lower() for site in SITES}
+    keys = {site_key(site.url_template) for site in SITES}
+    for name, url, convert, checkouts in databases:
+        try:
+            entries = database_entries(name, url, convert, checkouts)
+        except Exception as e:
+            summary[name] = {"error": f"Could not load the {name} site list: {e}"}
+            continue
+        added, skipped = compile_entries(entries, names, keys)
+        sites.extend(added)
+        origins.update((site.name, name) for site in added)
+        summary[name] = {"sites": len(added), "duplicates": len(entries) - len(added) - skipped, "skipped": skipped}
+    result = (tuple(sites), origins, summary)
+    if databases is DATABASES and not any("error" in entry for entry in summary.values()):
+        _extended = result
+    return result
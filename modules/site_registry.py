@@ -0,0 +1,150 @@
+import json
+import os
+import re
+from urllib.parse import urlsplit
+
+# Username sites are declared once in sites.json and compiled at import time
+
+SITES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sites.json")
+DETECTION_TYPES = ("status", "redirect", "marker")
+PROBE_METHODS = ("head", "get")
+# Bytes of body scanned for a marker unless a site overrides it
+DEFAULT_SCAN_BYTES = 16 * 1024
+PLACEHOLDER = "{username}"
+
+
+class Site:
+    """A compiled username site with its URL template and detection rule"""
+
+    __slots__ = (
+        "name", "url_template", "host", "tags", "probe", "detect", "status",
+        "target", "present", "absent", "scan_bytes", "headers", "pattern", "subdomain_of", "_parts",
+    )
+
+    def __init__(self, name, url, detect, tags=(), probe="head", headers=None, username_pattern=None):
+        self.name = name
+        self.url_template = url
+        self.host = urlsplit(url.replace(PLACEHOLDER, "x")).hostname
+        self.tags = frozenset(tags)
+        self.probe = probe
+        self.detect = detect["type"]
+        self.status = detect.get("status", 200)
+        self.target = detect.get("target")
+        # Markers may be one string or a list: any present marker counts, any absent one rules out
+        self.present = _strings(detect.get("present"))
+        self.absent = _strings(detect.get("absent"))
+        self.scan_bytes = detect.get("scan_bytes", DEFAULT_SCAN_BYTES)
+        self.headers = headers or None
+        self.pattern = re.compile(username_pattern) if username_pattern else None
+        # The platform domain profiles are subdomains of, for templates like https://{username}.example.com
+        netloc = url.split("://", 1)[-1].split("/", 1)[0]
+        self.subdomain_of = netloc[len(PLACEHOLDER) + 1:].lower() if netloc.startswith(PLACEHOLDER + ".") else None
+        self._parts = url.split(PLACEHOLDER)
+
+    def url_for(self, username):
+        return username.join(self._parts)
+
+    def accepts(self, username):
+        """Whether username is valid on this site at all; invalid ones are not probed"""
+        return self.pattern is None or self.pattern.search(username) is not None
+
+    def host_for(self, username):
+        return urlsplit(self.url_for(username)).hostname
+
+    @property
+    def follows_redirects(self):
+        # For redirect rules the redirect itself is the signal
+        return self.detect != "redirect"
+
+    @property
+    def needs_body(self):
+        return self.detect == "marker"
+
+    def markers(self):
+        return list(self.present + self.absent)
+
+    def match_body(self, text):
+        if self.present and not any(marker in text for marker in self.present):
+            return False
+        return not any(marker in text for marker in self.absent)
+
+    def is_found(self, response, body=None):
+        """Apply this site's detection rule to a response (and optionally a body prefix)"""
+        if self.detect == "redirect":
+            if response.is_redirect:
+                location = response.headers.get("Location", "")
+                return bool(self.target) and self.target not in location
+            if response.history and (not self.target or self.target in response.url):
+                return False
+            return response.status_code == self.status
+
+        if response.status_code != self.status:
+            return False
+        if self.detect == "marker":
+            return self.match_body(response.text if body is None else body)
+        return True
+
+    def __repr__(self):
+        return f"Site({self.name!r})"
+
+
+def _strings(value):
+    if not value:
+        return ()
+    return tuple(marker for marker in ([value] if isinstance(value, str) else value) if marker)
+
+
+def _validate(entries):
+    names = set()
+    templates = set()
+    for index, entry in enumerate(entries):
+        label = entry.get("name") or f"entry #{index}"
+        check_entry(entry, label)
+        if entry["name"].lower() in names:
+            raise ValueError(f"{label}: duplicate site name")
+        if entry["url"] in templates:
+            raise ValueError(f"{label}: duplicate URL template {entry['url']}")
+        names.add(entry["name"].lower())
+        templates.add(entry["url"])
+
+
+def check_entry(entry, label):
+    """Raise ValueError unless entry is a well-formed site definition"""
+    for key in ("name", "url", "detect"):
+        if key not in entry:
+            raise ValueError(f"{label}: missing '{key}'")
+    if entry["url"].count(PLACEHOLDER) != 1:
+        raise ValueError(f"{label}: URL template must contain {PLACEHOLDER} exactly once")
+    detect = entry["detect"]
+    if detect.get("type") not in DETECTION_TYPES:
+        raise ValueError(f"{label}: unknown detection type {detect.get('type')!r}")
+    if detect["type"] == "marker" and not (detect.get("present") or detect.get("absent")):
+        raise ValueError(f"{label}: marker detection needs 'present' or 'absent'")
+    if entry.get("probe", "head") not in PROBE_METHODS:
+        raise ValueError(f"{label}: unknown probe method {entry['probe']!r}")
+    if entry.get("username_pattern"):
+        try:
+            re.compile(entry["username_pattern"])
+        except re.error as e:
+            raise ValueError(f"{label}: bad username_pattern: {e}")
+
+
+def compile_entry(e):
+    return Site(e["name"], e["url"], e["detect"], e.get("tags", ()), e.get("probe", "head"),
+                e.get("headers"), e.get("username_pattern"))
+
+
+def load_sites(path=SITES_FILE):
+    """Load, validate and compile a site definition file"""
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+    _validate(entries)
+    return tuple(compile_entry(e) for e in entries)
+
+
+SITES = load_sites()
+SITES_BY_NAME = {site.name: site for site in SITES}
+
+
+def sites_with_tag(tag, sites=SITES):
+    return [site for site in sites if tag in site.tags]
@@ -1,8 +1,22 @@
 import asyncio
-import aiohttp
-from bs4 import BeautifulSoup
-from modules.advanced_social_scraper import AdvancedSocialScraper
+from modules.advanced_social_scraper import AdvancedSocialScraper, platform_records
+from modules import fetch, cache, utils, progress
 
+PLATFORMS = ['Twitter', 'Instagram', 'Reddit', 'Facebook', 'LinkedIn']
+
+def classify_platform(result):
+    if isinstance(result, dict) and result.get('error') == 'User not found':
+        return cache.NEGATIVE
+    return cache.classify(result)
+
+def ruled_out(hunted):
+    """Platforms the upstream Username Hunter checked without finding a profile"""
+    if not isinstance(hunted, dict) or 'found_profiles' not in hunted:
+        return set()
+    checked = set(PLATFORMS) - set(hunted.get('unchecked', ()))
+    return checked - set(hunted['found_profiles'])
+
+@cache.cached_run("social_scraper", "username")
 async def run(data):
     try:
         username = data.get('username')
@@ -13,25 +27,45 @@ async def run(data):
             }
 
         scraper = AdvancedSocialScraper()
+        report = progress.reporter_for(data)
+        report.expect(len(PLATFORMS))
+        # Profiles Username Hunter already found missing are not fetched again
+        skipped = ruled_out(data.get('upstream', {}).get('Username Hunter'))
+
+        async def scrape_platform(platform, scrape, session):
+            if platform in skipped:
+                report.advance()
+                return {'error': 'User not found'}
+            # Reuse cached profiles where fresh and pass findings on as each platform finishes
+            result = await cache.cached_async(
+                "social_scraper", platform, username,
+                lambda: scrape(session, username),
+                classify_result=classify_platform
+            )
+            report.advance()
+            if isinstance(result, dict):
+                report.hit(*platform_records(platform, username, result))
+            return result
         
-        # Set timeout for all requests
-        timeout = aiohttp.ClientTimeout(total=30)  # 30 seconds timeout
-        
-        # Configure session without proxy
-        connector = aiohttp.TCPConnector(ssl=False)  # Disable SSL verification for testing
-        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
-            # Create tasks for each platform
-            tasks = [
-                scraper.scrape_twitter(session, username),
-                scraper.scrape_instagram(session, username),
-                scraper.scrape_reddit(session, username),
-                scraper.scrape_facebook(session, username),
-                scraper.scrape_linkedin(session, username)
+        # Shared headers and per-host connection limits come from the fetch layer;
+        # pages are parsed in the scraper's worker pool while the lag monitor watches the loop
+        async with utils.LoopLagMonitor() as lag, fetch.create_async_session(timeout=30) as session:
+            scrapers = [
+                scraper.scrape_twitter,
+                scraper.scrape_instagram,
+                scraper.scrape_reddit,
+                scraper.scrape_facebook,
+                scraper.scrape_linkedin
             ]
+            # Create tasks for each platform
+            tasks = [scrape_platform(platform, scrape, session) for platform, scrape in zip(PLATFORMS, scrapers)]
             
             # Wait for all tasks to complete with a timeout
+            gathered = asyncio.gather(*tasks, return_exceptions=True)
+            # A cancelled investigation leaves the gather with a CancelledError nobody reads
+            gathered.add_done_callback(lambda f: f.cancelled() or f.exception())
             try:
-                results = await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), timeout=60)
+                results = await asyncio.wait_for(gathered, timeout=60)
             except asyncio.TimeoutError:
                 return {
                     'error': 'Search timed out after 60 seconds',
@@ -40,26 +74,42 @@ async def run(data):
             
             # Process results
             platforms = []
-            for platform, result in zip(['Twitter', 'Instagram', 'Reddit', 'Facebook', 'LinkedIn'], results):
+            for platform, result in zip(PLATFORMS, results):
                 if isinstance(result, Exception):
+                    result = {'error': str(result)}
+                if result.get('error') == 'User not found':
+                    platforms.append({
+                        'platform': platform,
+                        'status': 'Not found'
+                    })
+                elif 'error' in result:
+                    # Failed platforms carry an error so the whole result expires like one
                     platforms.append({
                         'platform': platform,
                         'status': 'Error',
-                        'message': str(result)
+                        'error': result['error']
                     })
                 else:
                     platforms.append({
                         'platform': platform,
                         'status': 'Success',
                         'profile': result.get('profile', {}),
-                        'posts': result.get('posts', [])
+                        'posts': result.get('posts', []),
+                        'truncated': result.get('truncated', False)
                     })
             
             return {
                 'username': username,
                 'platforms': platforms,
                 'total_platforms': len(platforms),
-                'total_posts': sum(len(p.get('posts', [])) for p in platforms if p.get('status') == 'Success')
+                'found_count': sum(1 for p in platforms if p['status'] == 'Success'),
+                'total_posts': sum(len(p.get('posts', [])) for p in platforms if p.get('status') == 'Success'),
+                'loop_lag': lag.stats(),
+                'records': [
+                    record for platform, result in zip(PLATFORMS, results)
+                    if isinstance(result, dict)
+                    for record in platform_records(platform, username, result)
+                ]
             }
             
     except Exception as e:
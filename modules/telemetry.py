@@ -0,0 +1,268 @@
+import bisect
+import contextvars
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+
+# Latency and outcome spans for every fetch, read, parse and cached lookup.
+# An investigation carries a Recorder in data["telemetry"]; the scheduler makes
+# it the current recorder of each module's context, so fetch, cache and the
+# parsers record into it without being passed anything. Every span also feeds
+# the process-wide rolling window, recorder or not.
+
+# Upper bucket bounds of the latency histograms, in milliseconds
+BUCKET_BOUNDS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+# Spans kept per investigation; the rest are only counted
+MAX_SPANS = 50000
+# Recent spans per (source, kind) kept for the rolling histograms
+ROLLING_WINDOW = 500
+# Slowest spans listed in a report
+SLOWEST = 10
+
+UNATTRIBUTED = "(unattributed)"
+
+
+@dataclass(slots=True)
+class Span:
+    """One timed step: kind is fetch, read, parse, lookup or module"""
+    kind: str
+    source: str = ""
+    host: str = ""
+    status: int = None
+    bytes: int = 0
+    cache_hit: bool = False
+    retries: int = 0
+    error: str = ""
+    started: float = 0.0
+    duration: float = 0.0
+
+
+class Histogram:
+    """Counts of latencies per fixed bucket"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+
+    def add(self, seconds):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS_MS, seconds * 1000)] += 1
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th latency, in milliseconds (None past the last bound)"""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, count in zip(BUCKET_BOUNDS_MS + (None,), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    def to_dict(self):
+        return {
+            "bounds_ms": list(BUCKET_BOUNDS_MS),
+            "counts": list(self.counts),
+            "count": self.count,
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+        }
+
+
+def histogram(durations):
+    result = Histogram()
+    for duration in durations:
+        result.add(duration)
+    return result
+
+
+def _percentile(ordered, q):
+    if not ordered:
+        return None
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+def summarize(spans):
+    """Per (source, kind) counts, outcomes and exact latency percentiles"""
+    groups = {}
+    for span in spans:
+        groups.setdefault((span.source or UNATTRIBUTED, span.kind), []).append(span)
+    rows = []
+    for (source, kind), group in sorted(groups.items()):
+        durations = sorted(span.duration for span in group)
+        statuses = {}
+        for span in group:
+            if span.status is not None:
+                statuses[str(span.status)] = statuses.get(str(span.status), 0) + 1
+        rows.append({
+            "source": source,
+            "kind": kind,
+            "calls": len(group),
+            "errors": sum(1 for span in group if span.error),
+            "cache_hits": sum(1 for span in group if span.cache_hit),
+            "bytes": sum(span.bytes for span in group),
+            # A retried request has one span per attempt, numbered by retries
+            "retries": sum(1 for span in group if span.retries),
+            "statuses": statuses,
+            "hosts": sorted({span.host for span in group if span.host}),
+            "p50_ms": _ms(_percentile(durations, 0.5)),
+            "p95_ms": _ms(_percentile(durations, 0.95)),
+            "max_ms": _ms(durations[-1]),
+            "total_s": round(sum(durations), 3),
+        })
+    return rows
+
+
+class Rolling:
+    """The most recent spans per (source, kind), across investigations"""
+
+    def __init__(self, window=ROLLING_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._spans = {}
+
+    def add(self, span):
+        key = (span.source or UNATTRIBUTED, span.kind)
+        with self._lock:
+            recent = self._spans.get(key)
+            if recent is None:
+                recent = self._spans[key] = deque(maxlen=self.window)
+            recent.append(span)
+
+    def report(self):
+        with self._lock:
+            groups = {key: list(recent) for key, recent in self._spans.items()}
+        return [
+            {"source": source, "kind": kind, "errors": sum(1 for span in spans if span.error),
+             "histogram": histogram(span.duration for span in spans).to_dict()}
+            for (source, kind), spans in sorted(groups.items())
+        ]
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+
+ROLLING = Rolling()
+
+
+class Recorder:
+    """Spans of one investigation; safe to add to from any thread"""
+
+    def __init__(self, max_spans=MAX_SPANS):
+        self.max_spans = max_spans
+        self.started = time.perf_counter()
+        self.started_at = time.time()
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._spans = []
+
+    def add(self, span):
+        with self._lock:
+            if len(self._spans) < self.max_spans:
+                self._spans.append(span)
+            else:
+                self.dropped += 1
+
+    def spans(self):
+        with self._lock:
+            return list(self._spans)
+
+    def report(self):
+        """Plain-data profile of the investigation, ready for json.dumps"""
+        spans = self.spans()
+        kinds = {}
+        for span in spans:
+            kinds.setdefault(span.kind, Histogram()).add(span.duration)
+        slowest = sorted(spans, key=lambda span: span.duration, reverse=True)[:SLOWEST]
+        return {
+            "started_at": self.started_at,
+            "elapsed_s": round(time.perf_counter() - self.started, 3),
+            "spans": len(spans),
+            "dropped": self.dropped,
+            "sources": summarize(spans),
+            "histograms": {kind: hist.to_dict() for kind, hist in sorted(kinds.items())},
+            "slowest": [
+                dict(asdict(span), started=round(span.started - self.started, 3), duration=round(span.duration, 4))
+                for span in slowest
+            ],
+            "rolling": ROLLING.report(),
+        }
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.report(), **kwargs)
+
+
+_recorder = contextvars.ContextVar("telemetry_recorder", default=None)
+_source = contextvars.ContextVar("telemetry_source", default="")
+
+
+def current():
+    """The recorder of the investigation running in this context, if any"""
+    return _recorder.get()
+
+
+def current_source():
+    return _source.get()
+
+
+@contextmanager
+def using(recorder, source=None):
+    """Record into recorder, attributing spans to source, for the duration of the block"""
+    reset = _recorder.set(recorder)
+    try:
+        if source is None:
+            yield recorder
+        else:
+            with attributed(source):
+                yield recorder
+    finally:
+        _recorder.reset(reset)
+
+
+@contextmanager
+def attributed(source):
+    """Attribute the spans of the block to source"""
+    reset = _source.set(source)
+    try:
+        yield source
+    finally:
+        _source.reset(reset)
+
+
+def record(span):
+    ROLLING.add(span)
+    recorder = current()
+    if recorder is not None:
+        recorder.add(span)
+
+
+def outcome(result):
+    """The error a module or source result reports, or ''"""
+    if isinstance(result, str) and result.startswith("Error"):
+        return result
+    if isinstance(result, dict) and result.get("error"):
+        return str(result["error"])
+    return ""
+
+
+@contextmanager
+def span(kind, **fields):
+    """Time the block as a span of kind; the block may fill in status, bytes and so on"""
+    current_span = Span(kind, source=fields.pop("source", None) or current_source(), **fields)
+    current_span.started = time.perf_counter()
+    try:
+        yield current_span
+    except BaseException as e:
+        current_span.error = current_span.error or f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current_span.duration = time.perf_counter() - current_span.started
+        record(current_span)
@@ -1,169 +1,207 @@
-import requests
-import time
-from concurrent.futures import ThreadPoolExecutor
+import sys
+import argparse
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, wait, as_completed
+from urllib.parse import urlsplit
+from modules import fetch, cache, dns_cache, progress, cancel, concurrency
+from modules.site_registry import SITES
+from modules.result_matrix import ResultMatrix
+from modules.results import Profile
+
+# Bulk scans keep at most this many checks queued per worker
+BULK_QUEUE_PER_WORKER = 4
+
+# Bodies up to this size are drained so the keep-alive connection goes back to the pool
+DRAIN_LIMIT = 16 * 1024
+PROBE_CHUNK_SIZE = 4096
+
+# Sites that answered HEAD with 405/501 during this run
+_head_unsupported = set()
+
+def release(response):
+    length = response.headers.get("Content-Length", "")
+    if length.isdigit() and int(length) <= DRAIN_LIMIT:
+        response.content
+    response.close()
+
+def probe(site, url):
+    """Check one profile URL while transferring as little of the page as possible"""
+    # Subdomain platforms without wildcard DNS reject unknown users at DNS time
+    if site.subdomain_of and dns_cache.subdomain_missing(urlsplit(url).hostname, site.subdomain_of):
+        return False
+
+    follow = site.follows_redirects
+    if site.probe == "head" and not site.needs_body and site.name not in _head_unsupported:
+        response = fetch.head(url, headers=site.headers, timeout=fetch.PROBE_TIMEOUT, allow_redirects=follow)
+        fetch.raise_for_transient(response)
+        if response.status_code not in (405, 501):
+            return site.is_found(response)
+        _head_unsupported.add(site.name)
+
+    # Stream the GET so the body is only read when the rule needs a marker
+    response = fetch.get(url, headers=site.headers, timeout=fetch.PROBE_TIMEOUT, allow_redirects=follow, stream=True)
+    fetch.raise_for_transient(response)
+    if site.needs_body and response.status_code == site.status:
+        # Read at most scan_bytes, stopping early once any marker shows up
+        text, _ = fetch.read_text(response, site.scan_bytes, site.markers(), chunk_size=PROBE_CHUNK_SIZE)
+        return site.is_found(response, text)
+    try:
+        return site.is_found(response, "")
+    finally:
+        release(response)
 
 def check_site(site_info):
-    site_name, url, headers = site_info
+    site, url = site_info
     try:
-        response = requests.get(url, headers=headers, timeout=5)
-        if response.status_code == 200:
-            return site_name, url, True
-        return site_name, url, False
-    except Exception as e:
-        return site_name, url, False
+        found = cache.cached(
+            "username_hunter", site.name, url, lambda: probe(site, url),
+            classify_result=lambda found: cache.OK if found else cache.NEGATIVE,
+        )
+        return site.name, url, found
+    except Exception:
+        # Unknown rather than "not found", and not cached, so the next run checks again
+        return site.name, url, None
+
+def site_urls(username, sites=SITES):
+    """(site, profile URL) for every site where username is valid"""
+    return [(site, site.url_for(username)) for site in sites if site.accepts(username)]
+
+def prefetch_subdomains(site_infos):
+    """Resolve all subdomain-style profile hosts concurrently before probing"""
+    dns_cache.prefetch(urlsplit(url).hostname for site, url in site_infos if "subdomain" in site.tags)
+
+def hunt(username, sites=SITES, report=progress.NULL_REPORTER):
+    """Check username on every site, reporting each profile as soon as it is found.
+
+    Returns (site name -> profile URL, names of sites that could not be checked, sites that answered).
+    """
+    site_infos = site_urls(username, sites)
+    report.expect(len(site_infos))
+    prefetch_subdomains(site_infos)
+
+    # One thread per site up to the ceiling; the adaptive limits in fetch decide
+    # how many requests are really in flight. Each site is reported as it completes
+    with cancel.Executor(max_workers=concurrency.workers(len(site_infos))) as executor:
+        futures = [executor.submit(check_site, site_info) for site_info in site_infos]
+        for future in as_completed(futures):
+            site_name, url, exists = future.result()
+            report.advance()
+            if exists:
+                report.hit(Profile(site_name, url=url, username=username))
+
+    # Process results in site order
+    checks = [future.result() for future in futures]
+    found = {site_name: url for site_name, url, exists in checks if exists}
+    unchecked = [site_name for site_name, _, exists in checks if exists is None]
+    return found, unchecked, len(site_infos) - len(unchecked)
 
+@cache.cached_run("username_hunter", "username")
 def run(data):
     username = data.get("username")
     if not username:
         return "No username provided."
 
-    sites = {
-        "GitHub": f"https://github.com/{username}",
-        "Reddit": f"https://www.reddit.com/user/{username}",
-        "Twitter": f"https://twitter.com/{username}",
-        "Instagram": f"https://instagram.com/{username}",
-        "LinkedIn": f"https://linkedin.com/in/{username}",
-        "Facebook": f"https://facebook.com/{username}",
-        "TikTok": f"https://tiktok.com/@{username}",
-        "YouTube": f"https://youtube.com/@{username}",
-        "Medium": f"https://medium.com/@{username}",
-        "Dev.to": f"https://dev.to/{username}",
-        "Pinterest": f"https://pinterest.com/{username}",
-        "Quora": f"https://quora.com/profile/{username}",
-        "Steam": f"https://steamcommunity.com/id/{username}",
-        "Spotify": f"https://open.spotify.com/user/{username}",
-        "SoundCloud": f"https://soundcloud.com/{username}",
-        "Twitch": f"https://twitch.tv/{username}",
-        "Vimeo": f"https://vimeo.com/{username}",
-        "Behance": f"https://behance.net/{username}",
-        "Dribbble": f"https://dribbble.com/{username}",
-        "Flickr": f"https://flickr.com/photos/{username}",
-        "DeviantArt": f"https://deviantart.com/{username}",
-        "GitLab": f"https://gitlab.com/{username}",
-        "Bitbucket": f"https://bitbucket.org/{username}",
-        "HackerNews": f"https://news.ycombinator.com/user?id={username}",
-        "ProductHunt": f"https://producthunt.com/@{username}",
-        "AngelList": f"https://angel.co/{username}",
-        "Crunchbase": f"https://crunchbase.com/person/{username}",
-        "About.me": f"https://about.me/{username}",
-        "Keybase": f"https://keybase.io/{username}",
-        "Slideshare": f"https://slideshare.net/{username}",
-        "SpeakerDeck": f"https://speakerdeck.com/{username}",
-        "StackOverflow": f"https://stackoverflow.com/users/{username}",
-        "CodePen": f"https://codepen.io/{username}",
-        "Replit": f"https://replit.com/@{username}",
-        "CodeSandbox": f"https://codesandbox.io/u/{username}",
-        "Glitch": f"https://glitch.com/@{username}",
-        "Kaggle": f"https://kaggle.com/{username}",
-        "ResearchGate": f"https://researchgate.net/profile/{username}",
-        "Academia.edu": f"https://academia.edu/{username}",
-        "GoogleScholar": f"https://scholar.google.com/citations?user={username}",
-        "ORCID": f"https://orcid.org/{username}",
-        "Mendeley": f"https://mendeley.com/profiles/{username}",
-        "SlideShare": f"https://slideshare.net/{username}",
-        "SpeakerDeck": f"https://speakerdeck.com/{username}",
-        "Prezi": f"https://prezi.com/u/{username}",
-        "Scribd": f"https://scribd.com/{username}",
-        "Issuu": f"https://issuu.com/{username}",
-        "Behance": f"https://behance.net/{username}",
-        "Dribbble": f"https://dribbble.com/{username}",
-        "ArtStation": f"https://artstation.com/{username}",
-        "DeviantArt": f"https://deviantart.com/{username}",
-        "Flickr": f"https://flickr.com/photos/{username}",
-        "500px": f"https://500px.com/{username}",
-        "VSCO": f"https://vsco.co/{username}",
-        "EyeEm": f"https://eyeem.com/u/{username}",
-        "Pexels": f"https://pexels.com/@{username}",
-        "Unsplash": f"https://unsplash.com/@{username}",
-        "Shutterstock": f"https://shutterstock.com/g/{username}",
-        "AdobeStock": f"https://stock.adobe.com/contributor/{username}",
-        "iStock": f"https://istockphoto.com/portfolio/{username}",
-        "Alamy": f"https://alamy.com/portfolio/{username}",
-        "GettyImages": f"https://gettyimages.com/portfolio/{username}",
-        "DepositPhotos": f"https://depositphotos.com/portfolio/{username}",
-        "123RF": f"https://123rf.com/profile_{username}",
-        "Dreamstime": f"https://dreamstime.com/{username}",
-        "Bigstock": f"https://bigstockphoto.com/portfolio/{username}",
-        "Pond5": f"https://pond5.com/artist/{username}",
-        "AudioJungle": f"https://audiojungle.net/user/{username}",
-        "Envato": f"https://envato.com/user/{username}",
-        "CreativeMarket": f"https://creativemarket.com/{username}",
-        "Gumroad": f"https://gumroad.com/{username}",
-        "Patreon": f"https://patreon.com/{username}",
-        "Ko-fi": f"https://ko-fi.com/{username}",
-        "BuyMeACoffee": f"https://buymeacoffee.com/{username}",
-        "Substack": f"https://substack.com/profile/{username}",
-        "Medium": f"https://medium.com/@{username}",
-        "WordPress": f"https://{username}.wordpress.com",
-        "Blogger": f"https://{username}.blogspot.com",
-        "Tumblr": f"https://{username}.tumblr.com",
-        "Ghost": f"https://{username}.ghost.io",
-        "Wix": f"https://{username}.wixsite.com",
-        "Squarespace": f"https://{username}.squarespace.com",
-        "Weebly": f"https://{username}.weebly.com",
-        "Shopify": f"https://{username}.myshopify.com",
-        "Etsy": f"https://etsy.com/shop/{username}",
-        "Redbubble": f"https://redbubble.com/people/{username}",
-        "Society6": f"https://society6.com/{username}",
-        "Zazzle": f"https://zazzle.com/{username}",
-        "CafePress": f"https://cafepress.com/{username}",
-        "Spreadshirt": f"https://spreadshirt.com/shop/{username}",
-        "Threadless": f"https://threadless.com/artist/{username}",
-        "DesignByHumans": f"https://designbyhumans.com/shop/{username}",
-        "Teespring": f"https://teespring.com/stores/{username}",
-        "Printful": f"https://printful.com/{username}",
-        "Printify": f"https://printify.com/{username}",
-        "CustomInk": f"https://customink.com/{username}",
-        "Vistaprint": f"https://vistaprint.com/{username}",
-        "Shutterfly": f"https://shutterfly.com/{username}",
-        "Snapfish": f"https://snapfish.com/{username}",
-        "Walgreens": f"https://walgreens.com/{username}",
-        "CVS": f"https://cvs.com/{username}",
-        "Walmart": f"https://walmart.com/{username}",
-        "Target": f"https://target.com/{username}",
-        "Amazon": f"https://amazon.com/{username}",
-        "eBay": f"https://ebay.com/usr/{username}",
-        "Etsy": f"https://etsy.com/shop/{username}",
-        "Poshmark": f"https://poshmark.com/closet/{username}",
-        "Mercari": f"https://mercari.com/u/{username}",
-        "Depop": f"https://depop.com/{username}",
-        "Grailed": f"https://grailed.com/{username}",
-        "StockX": f"https://stockx.com/{username}",
-        "GOAT": f"https://goat.com/{username}",
-        "FlightClub": f"https://flightclub.com/{username}",
-        "StadiumGoods": f"https://stadiumgoods.com/{username}",
-        "Klekt": f"https://klekt.com/{username}",
-        "Bump": f"https://bump.com/{username}",
-        "SoleSupremacy": f"https://solesupremacy.com/{username}",
-        "UrbanNecessities": f"https://urbannecessities.com/{username}",
-        "RIF": f"https://rif.la/{username}",
-        "ProjectBlitz": f"https://projectblitz.com/{username}",
-        "Kixify": f"https://kixify.com/{username}",
+    found, unchecked, checked = hunt(username, SITES, progress.reporter_for(data))
+    return {
+        "found_profiles": found,
+        "total_checked": checked,
+        # Sites that kept failing or rate limiting
+        "unchecked": unchecked,
+        "found_count": len(found),
+        "username": username,
+        "records": [Profile(site_name, url=url, username=username) for site_name, url in found.items()]
     }
 
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.5',
-        'Connection': 'keep-alive',
-        'Upgrade-Insecure-Requests': '1',
-    }
+def interleave_by_host(sites):
+    """Indexes of sites ordered round-robin across hosts so no single host hogs the workers"""
+    queues = defaultdict(deque)
+    for i, site in enumerate(sites):
+        queues[site.host].append(i)
+    rotation = deque(queues.values())
+    order = []
+    while rotation:
+        queue = rotation.popleft()
+        order.append(queue.popleft())
+        if queue:
+            rotation.append(queue)
+    return order
 
-    found = {}
-    site_infos = [(site, url, headers) for site, url in sites.items()]
+def scan_matrix(usernames, sites=SITES, max_workers=concurrency.MAX_IN_FLIGHT):
+    """Check every site for every username and return a ResultMatrix"""
+    usernames = list(dict.fromkeys(u.strip() for u in usernames if u and u.strip()))
+    matrix = ResultMatrix([site.name for site in sites], usernames)
+    order = interleave_by_host(sites)
 
-    # Use ThreadPoolExecutor for parallel requests
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        results = list(executor.map(check_site, site_infos))
+    def jobs():
+        # Generated as the window drains: one username at a time, its sites in
+        # host round-robin order, skipping sites that reject the username
+        for j, username in enumerate(usernames):
+            accepted = [i for i in order if sites[i].accepts(username)]
+            # Its subdomain hosts are resolved together just before its checks are queued
+            prefetch_subdomains((sites[i], sites[i].url_for(username)) for i in accepted)
+            for i in accepted:
+                yield i, j
 
-    # Process results
-    for site_name, url, exists in results:
-        if exists:
-            found[site_name] = url
+    def check(job):
+        i, j = job
+        _, _, exists = check_site((sites[i], sites[i].url_for(usernames[j])))
+        return i, j, exists
 
+    # Submit through a bounded window so memory stays flat for large batches
+    limit = max_workers * BULK_QUEUE_PER_WORKER
+    with cancel.Executor(max_workers=max_workers) as executor:
+        in_flight = set()
+        for job in jobs():
+            if len(in_flight) >= limit:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    matrix.set(*future.result())
+            in_flight.add(executor.submit(check, job))
+        for future in in_flight:
+            matrix.set(*future.result())
+    return matrix
+
+def run_bulk(data, sites=SITES):
+    usernames = data.get("usernames")
+    if not usernames:
+        return "No usernames provided."
+
+    matrix = scan_matrix(usernames, sites)
     return {
-        "found_profiles": found,
-        "total_checked": len(sites),
-        "found_count": len(found),
-        "username": username
-    } 
\ No newline at end of file
+        "usernames": matrix.usernames,
+        "total_checked": matrix.checked_count(),
+        # Pairs that kept failing or rate limiting
+        "unchecked_count": matrix.unchecked_count(),
+        "found_count": matrix.found_count(),
+        "sites_hit_any": matrix.sites_hit_any(),
+        "usernames_hit_all": matrix.usernames_hit_all(),
+        "hit_counts": matrix.hit_counts(),
+        "matrix": matrix
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check many username variants across every registered site")
+    parser.add_argument("usernames", nargs="*", help="usernames to check")
+    parser.add_argument("-f", "--file", help="file with one username per line ('-' for stdin)")
+    args = parser.parse_args(argv)
+
+    usernames = list(args.usernames)
+    if args.file:
+        handle = sys.stdin if args.file == "-" else open(args.file, encoding="utf-8")
+        with handle:
+            usernames.extend(line.strip() for line in handle)
+    if not usernames:
+        parser.error("no usernames given")
+
+    results = run_bulk({"usernames": usernames})
+    matrix = results["matrix"]
+    for username in matrix.usernames:
+        print(f"{username}: {', '.join(matrix.sites_for(username)) or 'no profiles found'}")
+    print(f"\nChecked {results['total_checked']} site/username pairs, {results['found_count']} hits")
+    if results["unchecked_count"]:
+        print(f"Could not check {results['unchecked_count']} pairs")
+    print(f"Sites hit by any variant: {', '.join(results['sites_hit_any']) or 'none'}")
+    print(f"Variants hit on every site: {', '.join(results['usernames_hit_all']) or 'none'}")
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,97 @@
- 
\ No newline at end of file
+import asyncio
+import time
+from concurrent.futures import wait
+
+from modules import cancel
+
+# Seconds between cancellation checks while fan_out waits
+CANCEL_POLL = 0.1
+
+
+def fan_out(func, items, deadline, max_workers=None):
+    """Call func(value) for every name -> value in items concurrently under one deadline.
+
+    Returns (completed, failed, timed_out): completed maps name -> return value,
+    failed maps name -> error message, and timed_out lists the names still running
+    when the deadline passed. Late calls are abandoned rather than awaited.
+    """
+    completed, failed, timed_out = {}, {}, []
+    if not items:
+        return completed, failed, timed_out
+
+    executor = cancel.Executor(max_workers=max_workers or len(items))
+    try:
+        futures = {executor.submit(func, value): name for name, value in items.items()}
+        if executor.token is None:
+            done, _ = wait(futures, timeout=deadline)
+        else:
+            # Wake up regularly so a cancelled investigation does not sit out the deadline
+            ends = time.monotonic() + deadline
+            while True:
+                done, not_done = wait(futures, timeout=min(CANCEL_POLL, max(ends - time.monotonic(), 0)))
+                if not not_done or executor.token.cancelled or time.monotonic() >= ends:
+                    break
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    cancel.check()
+
+    for future in done:
+        name = futures[future]
+        try:
+            completed[name] = future.result()
+        except Exception as e:
+            failed[name] = str(e)
+    # Keep the caller's ordering for the unfinished sources
+    timed_out = [name for name in items if name not in completed and name not in failed]
+    return completed, failed, timed_out
+
+
+class LoopLagMonitor:
+    """Measure how late the running event loop wakes a periodic timer.
+
+    Lag is the time a sleeping coroutine waits beyond its interval, so a
+    blocking call inside any coroutine shows up directly as a large sample.
+    """
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.samples = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+        self._task = None
+
+    async def _sample(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - started - self.interval, 0.0)
+            self.samples += 1
+            self.total_lag += lag
+            self.max_lag = max(self.max_lag, lag)
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._sample())
+        return self
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        return {
+            "samples": self.samples,
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "mean_lag_ms": round(self.total_lag / self.samples * 1000, 1) if self.samples else 0.0,
+        }
+
+    async def __aenter__(self):
+        return self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
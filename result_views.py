@@ -0,0 +1,297 @@
+import re
+import json
+from bisect import bisect_left
+from collections import Counter
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QLineEdit, QTableView, QAbstractItemView, QPushButton, QFileDialog, QMessageBox
+)
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer
+from modules.results import Hit, Profile, Post, Location, Breach, records_of, record_key
+
+# Table models and views for the result tabs. Rows are appended in batches
+# while the investigation runs; sorting and filtering happen on plain Python
+# lists of row ids so Qt only ever asks for the rows on screen.
+
+COLUMNS = ('Type', 'Source', 'Value', 'Details', 'URL')
+PROFILE_COLUMNS = ('Source', 'Kind', 'Calls', 'Errors', 'Cache hits', 'Bytes', 'Retries',
+                   'p50 ms', 'p95 ms', 'Max ms', 'Total s')
+# Quick-filter keystrokes are applied after this many milliseconds of quiet
+FILTER_DELAY_MS = 150
+
+_TOKEN = re.compile(r'\w+')
+
+
+def result_error(result):
+    if isinstance(result, str):
+        return result
+    if isinstance(result, dict):
+        return result.get('error')
+    return None
+
+
+def _join(*parts):
+    return ' · '.join(str(part) for part in parts if part)
+
+
+def record_row(record):
+    """Flatten a record into the table's columns"""
+    if isinstance(record, Profile):
+        details = _join(record.description, record.location,
+                        record.followers and f"{record.followers} followers",
+                        record.following and f"{record.following} following")
+        return ('Profile', record.source, record.name or record.username, details, record.url)
+    if isinstance(record, Post):
+        return ('Post', record.source, record.text, _join(record.date, record.likes and f"{record.likes} likes"), record.url)
+    if isinstance(record, Location):
+        coordinates = f"{record.latitude}, {record.longitude}" if record.latitude is not None else ''
+        return ('Location', record.source, record.location, coordinates, '')
+    if isinstance(record, Breach):
+        return ('Breach', record.source, record.name, _join(record.date, record.details), '')
+    if isinstance(record, Hit):
+        return ('Hit', record.source, record.title or record.query, '', record.url)
+    return (type(record).__name__, '', str(record), '', '')
+
+
+def result_rows(result, streamed=None):
+    """Rows for one module result: its message or errors, then its records.
+
+    Records counted in streamed were already shown while the module ran and are
+    consumed from the counter instead of being added twice.
+    """
+    rows = []
+    error = result_error(result)
+    if error:
+        rows.append(('Error' if error.startswith('Error') else 'Message', '', error, '', ''))
+    # Sources that failed inside an otherwise successful module
+    if isinstance(result, dict):
+        for source in result.get('results', []):
+            if isinstance(source, dict) and source.get('error'):
+                rows.append(('Error', source.get('source', 'Unknown'), source['error'], '', ''))
+    for record in records_of(result):
+        if streamed:
+            key = record_key(record)
+            if streamed[key]:
+                streamed[key] -= 1
+                continue
+        rows.append(record_row(record))
+    return rows
+
+
+def profile_rows(profile):
+    """Rows of a telemetry report, one per source and kind of step"""
+    return [
+        (row['source'], row['kind'], row['calls'], row['errors'], row['cache_hits'], row['bytes'],
+         row['retries'], row['p50_ms'], row['p95_ms'], row['max_ms'], row['total_s'])
+        for row in profile.get('sources', [])
+    ]
+
+
+class RecordTableModel(QAbstractTableModel):
+    """Append-only result rows with sorting and a token-prefix filter index"""
+
+    def __init__(self, parent=None, columns=COLUMNS):
+        super().__init__(parent)
+        self.columns = columns
+        self._rows = []
+        self._keys = []       # lowercased text or numbers, used as sort keys
+        self._index = {}      # token -> set of row ids
+        self._tokens = []     # the index's tokens, sorted for prefix lookups
+        self._visible = []    # row ids on screen, in display order
+        self._filter = ''
+        self._sort_column = None
+        self._sort_order = Qt.AscendingOrder
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._visible)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role in (Qt.DisplayRole, Qt.ToolTipRole) and index.isValid():
+            return self._rows[self._visible[index.row()]][index.column()]
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.columns[section]
+        return None
+
+    def total_rows(self):
+        return len(self._rows)
+
+    def clear(self):
+        self.beginResetModel()
+        self._rows, self._keys, self._index, self._tokens, self._visible = [], [], {}, [], []
+        self.endResetModel()
+
+    def append_rows(self, rows):
+        """Add a batch of rows with a single insert notification"""
+        if not rows:
+            return
+        start = len(self._rows)
+        new_ids = range(start, start + len(rows))
+        # Numbers sort as numbers, everything else as lowercased text
+        self._keys.extend(
+            tuple(value if isinstance(value, (int, float)) else ('' if value is None else str(value)).lower()
+                  for value in row)
+            for row in rows
+        )
+        rows = [tuple('' if value is None else str(value) for value in row) for row in rows]
+        self._rows.extend(rows)
+        new_tokens = []
+        for row_id, row in zip(new_ids, rows):
+            for token in set(_TOKEN.findall(' '.join(row).lower())):
+                if token not in self._index:
+                    self._index[token] = set()
+                    new_tokens.append(token)
+                self._index[token].add(row_id)
+        if new_tokens:
+            # Two sorted runs, so this is a linear merge
+            self._tokens.extend(sorted(new_tokens))
+            self._tokens.sort()
+
+        if self._filter:
+            matched = self._match(self._filter, new_ids)
+            new_ids = [row_id for row_id in new_ids if row_id in matched]
+        if not new_ids:
+            return
+        if self._sort_column is None:
+            first = len(self._visible)
+            self.beginInsertRows(QModelIndex(), first, first + len(new_ids) - 1)
+            self._visible.extend(new_ids)
+            self.endInsertRows()
+        else:
+            self.layoutAboutToBeChanged.emit()
+            self._visible.extend(new_ids)
+            self._sort_visible()
+            self.layoutChanged.emit()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        # A negative column restores arrival order
+        self._sort_column = column if column >= 0 else None
+        self._sort_order = order
+        self.layoutAboutToBeChanged.emit()
+        self._sort_visible()
+        self.layoutChanged.emit()
+
+    def _sort_visible(self):
+        column = self._sort_column
+        if column is None:
+            self._visible.sort()
+            return
+        self._visible.sort(key=lambda row_id: self._keys[row_id][column],
+                           reverse=self._sort_order == Qt.DescendingOrder)
+
+    def _match(self, text, candidates=None):
+        """Row ids whose tokens start with every word of text"""
+        matched = None
+        for word in _TOKEN.findall(text.lower()):
+            rows = set()
+            # Tokens starting with word are a contiguous run of the sorted list
+            for i in range(bisect_left(self._tokens, word), len(self._tokens)):
+                token = self._tokens[i]
+                if not token.startswith(word):
+                    break
+                rows |= self._index[token]
+            matched = rows if matched is None else matched & rows
+            if not matched:
+                break
+        matched = matched if matched is not None else set(range(len(self._rows)))
+        if candidates is not None:
+            matched &= set(candidates)
+        return matched
+
+    def set_filter(self, text):
+        text = text.strip()
+        if text == self._filter:
+            return
+        self.beginResetModel()
+        self._filter = text
+        if text:
+            self._visible = sorted(self._match(text))
+        else:
+            self._visible = list(range(len(self._rows)))
+        if self._sort_column is not None:
+            self._sort_visible()
+        self.endResetModel()
+
+
+class ResultView(QWidget):
+    """Quick-filter box above a sortable table of result rows"""
+
+    def __init__(self, parent=None, columns=COLUMNS):
+        super().__init__(parent)
+        self.model = RecordTableModel(self, columns)
+        self._streamed = Counter()
+
+        self.filter_input = QLineEdit()
+        self.filter_input.setPlaceholderText('Filter results')
+        self._filter_timer = QTimer(self)
+        self._filter_timer.setSingleShot(True)
+        self._filter_timer.setInterval(FILTER_DELAY_MS)
+        self._filter_timer.timeout.connect(lambda: self.model.set_filter(self.filter_input.text()))
+        self.filter_input.textChanged.connect(self._filter_timer.start)
+
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        # Rows stay in arrival order until a header is clicked
+        self.table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.table.setSortingEnabled(True)
+        self.table.setWordWrap(False)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        # Fixed row heights let the view lay out only the visible rows
+        self.table.verticalHeader().setDefaultSectionSize(24)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setStretchLastSection(True)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.filter_input)
+        layout.addWidget(self.table)
+
+    def add_records(self, records):
+        """Show records reported while their module is still running"""
+        self._streamed.update(record_key(record) for record in records)
+        self.model.append_rows([record_row(record) for record in records])
+
+    def add_result(self, result):
+        self.model.append_rows(result_rows(result, self._streamed))
+        self._streamed.clear()
+
+    def clear(self):
+        self._streamed.clear()
+        self.model.clear()
+
+
+class ProfileView(ResultView):
+    """Per-source latency and outcome table of the last investigation, with JSON export"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent, PROFILE_COLUMNS)
+        self.profile = None
+        self.export_button = QPushButton('Export JSON')
+        self.export_button.setEnabled(False)
+        self.export_button.clicked.connect(self.export)
+        self.layout().addWidget(self.export_button)
+
+    def set_profile(self, profile):
+        self.clear()
+        self.profile = profile
+        self.model.append_rows(profile_rows(profile))
+        self.export_button.setEnabled(True)
+
+    def export(self):
+        path, _ = QFileDialog.getSaveFileName(self, 'Export Profile', 'personax-profile.json', 'JSON files (*.json)')
+        if not path:
+            return
+        try:
+            with open(path, 'w', encoding='utf-8') as handle:
+                json.dump(self.profile, handle, indent=2)
+        except OSError as e:
+            QMessageBox.critical(self, 'Error', f'Could not export profile: {e}')
+
+    def clear(self):
+        super().clear()
+        self.profile = None
+        self.export_button.setEnabled(False)